@@ -0,0 +1,174 @@
+import os
+import json
+import time
+import traceback
+import contextlib
+import multiprocessing
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from FileProcessor import FileProcessor
+from FolderManager import FolderManager
+from RunSpec import RunSpec
+from TypesDefinition import ProcessType, Status
+
+# process types that never read the standardized Infor/Import data
+NO_INFOR_PROCESS = [ProcessType.pre_check]
+
+
+def warm_infor_cache():
+    """
+    Standardize (or load from the on-disk cache) Infor ContractLine and ContractLineImport once and keep
+    them in the FileProcessor class level cache, every FileProcessor of this process then reuses them
+    """
+    preprocessor = FileProcessor(FolderManager('batch', 'batch'))
+    for std_df in [preprocessor.infor_std, preprocessor.import_std]:
+        if std_df is Status.FAILED:
+            return Status.FAILED
+    return Status.SUCCESS
+
+
+def init_worker(warm: bool):
+    """
+    Pool initializer, runs once per worker process.
+    With fork the worker inherits the parent's already standardized frames (copy-on-write, nothing is
+    pickled), with spawn (windows) each worker loads them once from the Feather cache under SHARED_DATA.
+    """
+    if warm and FileProcessor._infor_std_cache is None:
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            warm_infor_cache()
+
+
+def run_job(spec: dict):
+    """
+    Run one job headless, console output goes to a log file in the project's temp folder
+    """
+    result = {'manufacturer': spec.get('manufacturer'),
+              'contract': spec.get('contract'),
+              'process_type': spec.get('process_type', 'full_process'),
+              'status': Status.FAILED,
+              'error': None,
+              'log': None,
+              'worker': os.getpid()}
+    start = time.perf_counter()
+    try:
+        run_spec = RunSpec.from_dict(spec)
+        folder_manager = FolderManager(run_spec.manufacturer, run_spec.contract)
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            folder_manager.create_folders()
+        log_path = os.path.join(folder_manager.temp_folder,
+                                f"batch_{datetime.today().strftime('%Y%m%d_%H%M%S')}_{run_spec.process_type_name}.log")
+        result['log'] = log_path
+        with open(log_path, 'w', encoding = 'utf-8') as log, contextlib.redirect_stdout(log):
+            preprocessor = FileProcessor(folder_manager,
+                                         check_mode = run_spec.check_mode,
+                                         data_caching = run_spec.data_caching,
+                                         run_spec = run_spec)
+            result['status'] = preprocessor.process_files(process_type = run_spec.process_type)
+    except Exception as e:
+        result['error'] = f"{type(e).__name__}: {e}"
+        if result['log'] is not None:
+            with open(result['log'], 'a', encoding = 'utf-8') as log:
+                log.write(traceback.format_exc())
+    result['elapsed_s'] = round(time.perf_counter() - start, 2)
+    return result
+
+
+class BatchScheduler:
+    """
+    Run a manifest of (manufacturer, contract, process type) jobs in parallel worker processes.
+    Infor/Import are standardized once in the parent before the pool starts and shared read-only with
+    the workers (see init_worker), so no job pays the full Infor standardization again.
+
+    manifest (YAML/JSON):
+        workers: 4
+        defaults:
+          process_type: full_process
+          auto_accept_reviews: true
+        jobs:
+          - manufacturer: Bard Medical Division
+            contract: L0000000000052
+          - manufacturer: Medline
+            contract: multiple
+            process_type: dup_search_and_compare
+            answers:
+              replacement_contract: L0000000000031
+    """
+
+    def __init__(self,
+                 jobs: list,
+                 max_workers: int = None):
+        self.jobs = jobs
+        self.max_workers = max_workers or max(1, min(len(jobs), (os.cpu_count() or 2) - 1))
+        self.results = []
+        projects = [(job.get('manufacturer'), job.get('contract')) for job in jobs]
+        duplicated = {p for p in projects if projects.count(p) > 1}
+        if len(duplicated) > 0:
+            raise ValueError(f"jobs {sorted(duplicated)} share the same project folder, they can not run in parallel")
+
+    @classmethod
+    def from_manifest(cls,
+                      manifest: dict,
+                      max_workers: int = None):
+        defaults = manifest.get('defaults', {})
+        jobs = []
+        for job in manifest.get('jobs', []):
+            spec = dict(defaults)
+            spec.update(job)
+            if 'answers' in defaults and 'answers' in job:
+                spec['answers'] = {**defaults['answers'], **job['answers']}
+            # fail fast on a broken job before anything runs
+            RunSpec.from_dict(spec)
+            jobs.append(spec)
+        return cls(jobs, max_workers = max_workers or manifest.get('workers'))
+
+    def run(self):
+        print(f"running {len(self.jobs)} job(s) on {self.max_workers} worker(s) .......")
+        needs_infor = any(RunSpec.from_dict(job).process_type not in NO_INFOR_PROCESS for job in self.jobs)
+        if needs_infor:
+            print("standardizing Infor contract data once for all jobs ......")
+            if warm_infor_cache() == Status.FAILED:
+                print("Infor contract data could not be loaded, jobs needing it will fail.")
+
+        # fork shares the warm cache with the workers for free, spawn workers load it from disk once
+        start_methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context('fork' if 'fork' in start_methods else 'spawn')
+        self.results = []
+        with ProcessPoolExecutor(max_workers = self.max_workers,
+                                 mp_context = context,
+                                 initializer = init_worker,
+                                 initargs = (needs_infor,)) as executor:
+            futures = {executor.submit(run_job, job): job for job in self.jobs}
+            for future in as_completed(futures):
+                job = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    # the worker itself died
+                    result = {'manufacturer': job.get('manufacturer'), 'contract': job.get('contract'),
+                              'process_type': job.get('process_type', 'full_process'),
+                              'status': Status.FAILED, 'error': f"{type(e).__name__}: {e}",
+                              'log': None, 'worker': None, 'elapsed_s': None}
+                print(f"{result['status']:<8} {result['manufacturer']} / {result['contract']} ({result['process_type']})")
+                self.results.append(result)
+        self.print_summary()
+        return self.results
+
+    def print_summary(self):
+        print("=======================================================")
+        print(f"{'status':<8} {'elapsed':>9}  {'process type':<34} project")
+        for result in self.results:
+            elapsed = f"{result['elapsed_s']:.1f} s" if result['elapsed_s'] is not None else 'n/a'
+            print(f"{result['status']:<8} {elapsed:>9}  {result['process_type']:<34} {result['manufacturer']} / {result['contract']}")
+            if result['error'] is not None:
+                print(f"{'':<8} {'':>9}  error: {result['error']}")
+            if result['log'] is not None:
+                print(f"{'':<8} {'':>9}  log: {result['log']}")
+        succeeded = sum(result['status'] == Status.SUCCESS for result in self.results)
+        print(f"{succeeded}/{len(self.results)} job(s) succeeded.")
+        return None
+
+    def write_summary(self, file_path: str):
+        with open(file_path, 'w', encoding = 'utf-8') as f:
+            json.dump(self.results, f, indent = 2)
+        print(f"batch summary saved to {file_path}")
+        return file_path
@@ -0,0 +1,113 @@
+import os
+import json
+import uuid
+import shutil
+import pandas as pd
+from datetime import datetime
+from DataCache import DataCache
+
+class CheckpointStore:
+    """
+    Stage outputs of a full_process run kept in the project's temp folder (temp/checkpoints), so a
+    run that failed or was exited half way resumes after the last stage it completed instead of
+    starting over.
+    A checkpoint is a Feather file (a frame, e.g. stacked_std) and/or values (e.g. the search scope),
+    with a json manifest carrying the inputs it was built from: fingerprints of the files read
+    (name, size, mtime), the settings that shaped it and the id of the checkpoint it was built on.
+    It is only valid as long as the inputs given when loading are exactly the ones it was saved with.
+    """
+
+    version = 1
+
+    def __init__(self,
+                 folder: str,
+                 schema_version: str):
+        self.folder = folder
+        self.schema_version = schema_version
+
+    def get_paths(self, name: str):
+        return os.path.join(self.folder, f'{name}.feather'), os.path.join(self.folder, f'{name}.json')
+
+    @staticmethod
+    def as_json(inputs: dict):
+        """
+        inputs as they read back from the manifest (tuples become lists ...)
+        """
+        return json.loads(json.dumps(inputs, default = str))
+
+    def read_manifest(self, name: str):
+        _, manifest_path = self.get_paths(name)
+        if not os.path.exists(manifest_path):
+            return None
+        try:
+            with open(manifest_path, 'r', encoding = 'utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def valid(self,
+              name: str,
+              inputs: dict):
+        """
+        Manifest of the checkpoint when it was built from inputs, None otherwise
+        """
+        manifest = self.read_manifest(name)
+        if manifest is None:
+            return None
+        if manifest.get('version') != self.version or manifest.get('schema_version') != self.schema_version:
+            return None
+        if manifest.get('inputs') != self.as_json(inputs):
+            return None
+        if manifest.get('has_frame') and not os.path.exists(self.get_paths(name)[0]):
+            return None
+        return manifest
+
+    def save(self,
+             name: str,
+             inputs: dict,
+             frame: pd.DataFrame = None,
+             values: dict = None):
+        """
+        Persist a checkpoint, the frame goes through a temp file and the manifest is written last so
+        an interrupted save never leaves a checkpoint that looks valid. Returns its id (None on failure)
+        """
+        data_path, manifest_path = self.get_paths(name)
+        manifest = {'name': name,
+                    'id': uuid.uuid4().hex,
+                    'version': self.version,
+                    'schema_version': self.schema_version,
+                    'saved': datetime.now().isoformat(timespec = 'seconds'),
+                    'inputs': self.as_json(inputs),
+                    'values': self.as_json(values or {}),
+                    'has_frame': frame is not None,
+                    'rows': None if frame is None else int(len(frame))}
+        try:
+            os.makedirs(self.folder, exist_ok = True)
+            if os.path.exists(manifest_path):
+                # the old manifest must not outlive the frame it described
+                os.remove(manifest_path)
+            if frame is not None:
+                frame.reset_index(drop = True).to_feather(data_path + '.tmp')
+                os.replace(data_path + '.tmp', data_path)
+            with open(manifest_path + '.tmp', 'w', encoding = 'utf-8') as f:
+                json.dump(manifest, f, indent = 2)
+            os.replace(manifest_path + '.tmp', manifest_path)
+        except Exception as e:
+            print(f"unable to save the {name} checkpoint ({e}), continue without it.")
+            return None
+        return manifest['id']
+
+    def load_frame(self, name: str):
+        data_path, _ = self.get_paths(name)
+        try:
+            return DataCache.read_feather(data_path)
+        except Exception as e:
+            print(f"{name} checkpoint could not be read ({e}).")
+            return None
+
+    def clear(self):
+        """
+        Remove every checkpoint of the project
+        """
+        shutil.rmtree(self.folder, ignore_errors = True)
+        return None
@@ -0,0 +1,267 @@
+import os
+import io
+import json
+import hashlib
+import pandas as pd
+import numpy as np
+import pyarrow.feather as feather
+
+class DataCache:
+    """
+    On-disk columnar cache (Feather) for the standardized Infor ContractLine / ContractLineImport
+    frames, stored under SHARED_DATA/cache.
+    Every cached frame comes with a small json manifest carrying the fingerprint of the source file
+    (size, mtime and sha256 content hash) and the schema version tag of the standardization logic.
+    The cache is valid only when both the fingerprint and the schema tag match.
+    Next to the frame a row index (hash of the raw export line and line key, see save) is kept, so
+    when a new export comes in the previous build can serve as a snapshot to apply the delta to.
+    """
+
+    hash_block_size = 8 * 1024 * 1024
+
+    def __init__(self,
+                 shared_folder: str,
+                 schema_version: str):
+        self.cache_folder = os.path.join(shared_folder, 'cache')
+        self.schema_version = schema_version
+
+    def file_hash(self, source_path: str):
+        """
+        sha256 of the file content, read in blocks so big exports never get loaded into memory
+        """
+        sha = hashlib.sha256()
+        with open(source_path, 'rb') as f:
+            for block in iter(lambda: f.read(self.hash_block_size), b''):
+                sha.update(block)
+        return sha.hexdigest()
+
+    def fingerprint(self,
+                    source_path: str,
+                    known: dict = None):
+        """
+        Build the fingerprint of a source file. Hashing a multi-GB export is not free, so if a
+        previously recorded fingerprint shows the same size and mtime we reuse its hash,
+        otherwise the content is hashed again (e.g. fresh download with the same content)
+        """
+        stat = os.stat(source_path)
+        fingerprint = {'size': stat.st_size,
+                       'mtime_ns': stat.st_mtime_ns}
+        if known is not None and \
+           known.get('size') == fingerprint['size'] and \
+           known.get('mtime_ns') == fingerprint['mtime_ns'] and \
+           known.get('sha256'):
+            fingerprint['sha256'] = known['sha256']
+        else:
+            fingerprint['sha256'] = self.file_hash(source_path)
+        return fingerprint
+
+    def get_paths(self, name: str):
+        data_path = os.path.join(self.cache_folder, f'{name}.feather')
+        manifest_path = os.path.join(self.cache_folder, f'{name}.json')
+        return data_path, manifest_path
+
+    def get_rows_path(self, name: str):
+        """
+        per row key/content hash index of the source the cached frame was built from (see save)
+        """
+        return os.path.join(self.cache_folder, f'{name}.rows.feather')
+
+    def read_manifest(self, name: str):
+        _, manifest_path = self.get_paths(name)
+        if not os.path.exists(manifest_path):
+            return None
+        try:
+            with open(manifest_path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def write_manifest(self,
+                       name: str,
+                       manifest: dict):
+        _, manifest_path = self.get_paths(name)
+        tmp_path = manifest_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f, indent = 2)
+        os.replace(tmp_path, manifest_path)
+
+    def load(self,
+             name: str,
+             source_path: str):
+        """
+        Return the cached frame for the source file, or None if there is no valid cache
+        """
+        data_path, _ = self.get_paths(name)
+        manifest = self.read_manifest(name)
+        if manifest is None or not os.path.exists(data_path):
+            return None
+        if manifest.get('schema_version') != self.schema_version:
+            return None
+
+        known = manifest.get('source', {})
+        if os.path.getsize(source_path) != known.get('size'):
+            return None
+        fingerprint = self.fingerprint(source_path, known = known)
+        if fingerprint['sha256'] != known.get('sha256'):
+            return None
+        if fingerprint['mtime_ns'] != known.get('mtime_ns'):
+            # same content but touched (e.g. re-downloaded), refresh manifest so next time we skip hashing
+            manifest['source'] = fingerprint
+            self.write_manifest(name, manifest)
+
+        return self.read_frame(name, data_path)
+
+    @staticmethod
+    def read_feather(data_path: str):
+        """
+        A Feather file as the frame that was written: arrow hands back missing strings as None,
+        they are put back as NaN the way pandas produces them
+        """
+        table = feather.read_table(data_path)
+        df = table.to_pandas()
+        for col, values in zip(table.column_names, table.columns):
+            if values.null_count > 0 and df[col].dtype == object:
+                df[col] = df[col].where(df[col].notna(), np.nan)
+        return df
+
+    def read_frame(self,
+                   name: str,
+                   data_path: str):
+        try:
+            return self.read_feather(data_path)
+        except Exception as e:
+            print(f"cached file for {name} could not be read ({e}), rebuilding ......")
+            return None
+
+    def load_snapshot(self, name: str):
+        """
+        Return (frame, row index, manifest) of the last cached build whatever the current source file is,
+        used to apply a delta when a new export comes in. None if there is no usable snapshot.
+        """
+        data_path, _ = self.get_paths(name)
+        rows_path = self.get_rows_path(name)
+        manifest = self.read_manifest(name)
+        if manifest is None or manifest.get('schema_version') != self.schema_version:
+            return None
+        if not os.path.exists(data_path) or not os.path.exists(rows_path):
+            return None
+        df = self.read_frame(name, data_path)
+        if df is None:
+            return None
+        try:
+            rows = pd.read_feather(rows_path)
+        except Exception:
+            return None
+        if len(rows) != len(df):
+            return None
+        return df, rows, manifest
+
+    def line_hashes(self,
+                    source_path: str,
+                    chunk_lines: int = 200000):
+        """
+        64 bit hash of every data line of a csv export (header excluded, blank lines skipped as
+        read_csv does), the file is streamed as raw bytes so nothing gets parsed.
+        Returns (header digest, hashes), or None if some record runs over several lines
+        (quoted line break), such a file can not be compared line by line.
+        """
+        hashes, chunk = [], []
+        with open(source_path, 'rb') as f:
+            header = f.readline()
+            for line in f:
+                if line.count(b'"') % 2 == 1:
+                    return None
+                line = line.rstrip(b'\r\n')
+                if line == b'':
+                    continue
+                chunk.append(line)
+                if len(chunk) >= chunk_lines:
+                    hashes.append(pd.util.hash_array(np.array(chunk, dtype = object), categorize = False))
+                    chunk = []
+        if len(chunk) > 0:
+            hashes.append(pd.util.hash_array(np.array(chunk, dtype = object), categorize = False))
+        header_digest = hashlib.sha256(header.rstrip(b'\r\n')).hexdigest()
+        return header_digest, np.concatenate(hashes) if len(hashes) > 0 else np.zeros(0, dtype = np.uint64)
+
+    def read_lines(self,
+                   source_path: str,
+                   line_numbers: np.ndarray):
+        """
+        Header plus the given data lines (numbered as in line_hashes) as an in-memory csv for read_csv
+        """
+        wanted = np.zeros(0, dtype = bool)
+        if len(line_numbers) > 0:
+            wanted = np.zeros(int(np.max(line_numbers)) + 1, dtype = bool)
+            wanted[line_numbers] = True
+        picked = []
+        with open(source_path, 'rb') as f:
+            picked.append(f.readline().rstrip(b'\r\n'))
+            number = 0
+            for line in f:
+                if number >= len(wanted):
+                    break
+                line = line.rstrip(b'\r\n')
+                if line == b'':
+                    continue
+                if wanted[number]:
+                    picked.append(line)
+                number += 1
+        return io.BytesIO(b'\n'.join(picked) + b'\n')
+
+    def save(self,
+             name: str,
+             source_path: str,
+             df: pd.DataFrame,
+             rows: pd.DataFrame = None,
+             extra: dict = None):
+        """
+        Persist the standardized frame and its manifest, written to temp files first so an
+        interrupted run never leaves a half written cache behind.
+        rows (optional) is the per row index of the source, aligned with df, kept for delta builds,
+        extra (optional) is merged into the manifest
+        """
+        os.makedirs(self.cache_folder, exist_ok = True)
+        data_path, _ = self.get_paths(name)
+        rows_path = self.get_rows_path(name)
+        manifest = {'name': name,
+                    'schema_version': self.schema_version,
+                    'source_file': os.path.basename(source_path),
+                    'source': self.fingerprint(source_path),
+                    'rows': int(len(df)),
+                    'columns': list(df.columns)}
+        manifest.update(extra or {})
+        outputs = [(df, data_path)]
+        if rows is not None:
+            outputs.append((rows, rows_path))
+        elif os.path.exists(rows_path):
+            # an index of an older build must never be paired with this frame
+            os.remove(rows_path)
+        for frame, path in outputs:
+            tmp_path = path + '.tmp'
+            try:
+                frame.reset_index(drop = True).to_feather(tmp_path)
+            except Exception as e:
+                print(f"unable to cache {name} ({e}), continue without cache.")
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                return False
+        # the manifest goes last, a crash in between leaves a mismatching fingerprint (=cache miss)
+        for _, path in outputs:
+            os.replace(path + '.tmp', path)
+        self.write_manifest(name, manifest)
+        return True
+
+    def clear(self, name: str = None):
+        """
+        Remove one (or all) cached frame(s)
+        """
+        if not os.path.exists(self.cache_folder):
+            return None
+        for file in os.listdir(self.cache_folder):
+            file_path = os.path.join(self.cache_folder, file)
+            if not os.path.isfile(file_path):
+                # e.g. the embeddings store
+                continue
+            if name is None or file.split('.')[0] == name:
+                os.remove(file_path)
+        return None
@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+
+class DescriptionIndex:
+    """
+    Nearest neighbour search of descriptions by embedding, to find item master items whose part
+    number was keyed differently from the TP line.
+    The distinct descriptions are kept as one float32 matrix of unit vectors (encoded through the
+    EmbeddingEngine, so they come from the embedding cache after the first run). A search is an exact
+    brute force cosine top-k done in blocks: a block of queries times a block of the index in one
+    matrix product, argpartition keeps the k best of each block, and those are merged with the best
+    so far. Memory stays at query_block x index_block scores whatever the size of the item master.
+    """
+
+    def __init__(self,
+                 descriptions: list,
+                 vectors: np.ndarray,
+                 query_block: int = 512,
+                 index_block: int = 32768):
+        self.descriptions = descriptions
+        self.vectors = np.ascontiguousarray(vectors, dtype = np.float32)
+        self.query_block = query_block
+        self.index_block = index_block
+
+    @classmethod
+    def build(cls,
+              descriptions,
+              embedding_engine):
+        """
+        Index the distinct non empty descriptions, encoded with the given EmbeddingEngine
+        """
+        descriptions = pd.Series(descriptions, dtype = object)
+        descriptions = list(descriptions[descriptions.notna() & (descriptions.astype(str).str.strip() != '')].unique())
+        vectors = embedding_engine.encode(descriptions) if len(descriptions) > 0 else np.zeros((0, 0), dtype = np.float32)
+        return cls(descriptions, vectors)
+
+    def search(self,
+               query_vectors: np.ndarray,
+               k: int = 5):
+        """
+        Top k index rows of each query vector by cosine similarity, best first.
+        Returns (positions, scores), both (queries, k), position -1 where the index has fewer rows.
+        """
+        query_vectors = np.asarray(query_vectors, dtype = np.float32)
+        n_queries, n_index = len(query_vectors), len(self.vectors)
+        positions = np.full((n_queries, k), -1, dtype = np.int64)
+        scores = np.full((n_queries, k), -np.inf, dtype = np.float32)
+        if n_queries == 0 or n_index == 0:
+            return positions, scores
+
+        for q_start in range(0, n_queries, self.query_block):
+            queries = query_vectors[q_start:q_start + self.query_block]
+            best_pos = np.full((len(queries), 0), -1, dtype = np.int64)
+            best_score = np.full((len(queries), 0), -np.inf, dtype = np.float32)
+            for i_start in range(0, n_index, self.index_block):
+                block_score = queries @ self.vectors[i_start:i_start + self.index_block].T
+                if block_score.shape[1] > k:
+                    top = np.argpartition(-block_score, k - 1, axis = 1)[:, :k]
+                    block_score = np.take_along_axis(block_score, top, axis = 1)
+                else:
+                    top = np.broadcast_to(np.arange(block_score.shape[1]), block_score.shape)
+                best_pos = np.concatenate([best_pos, top + i_start], axis = 1)
+                best_score = np.concatenate([best_score, block_score], axis = 1)
+                if best_pos.shape[1] > k:
+                    keep = np.argpartition(-best_score, k - 1, axis = 1)[:, :k]
+                    best_pos = np.take_along_axis(best_pos, keep, axis = 1)
+                    best_score = np.take_along_axis(best_score, keep, axis = 1)
+            order = np.argsort(-best_score, axis = 1, kind = 'stable')
+            found = best_pos.shape[1]
+            positions[q_start:q_start + len(queries), :found] = np.take_along_axis(best_pos, order, axis = 1)
+            scores[q_start:q_start + len(queries), :found] = np.take_along_axis(best_score, order, axis = 1)
+        return positions, np.clip(scores, -1.0, 1.0)
+
+    def match(self,
+              descriptions,
+              embedding_engine,
+              k: int = 5,
+              min_score: float = 0.0):
+        """
+        Top k indexed descriptions of each distinct query description with a cosine similarity of
+        at least min_score, one row per (description, matched description)
+        """
+        columns = ['Description', 'Matched Description', 'Description Rank', 'Description Score']
+        queries = pd.Series(descriptions, dtype = object)
+        queries = list(queries[queries.notna() & (queries.astype(str).str.strip() != '')].unique())
+        if len(queries) == 0 or len(self.descriptions) == 0:
+            return pd.DataFrame(columns = columns)
+        positions, scores = self.search(embedding_engine.encode(queries), k)
+        rows, ranks = np.nonzero((positions >= 0) & (scores >= min_score))
+        return pd.DataFrame({'Description': np.array(queries, dtype = object)[rows],
+                             'Matched Description': np.array(self.descriptions, dtype = object)[positions[rows, ranks]],
+                             'Description Rank': ranks + 1,
+                             'Description Score': scores[rows, ranks].astype(np.float64)},
+                            columns = columns)
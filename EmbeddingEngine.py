@@ -0,0 +1,369 @@
+import os
+import re
+import json
+import time
+import hashlib
+import numpy as np
+import pandas as pd
+from filelock import FileLock
+
+
+class EmbeddingStore:
+    """
+    Persistent description embedding cache shared by every run and worker process.
+    - vectors live in a memory-mapped float32 file (vectors.f32), rows are only paged in when looked up
+    - the key index is a compact array of 16 byte hashes of (model name, normalized text) (keys.npy)
+      with a last-used timestamp per row (last_used.npy) to support LRU eviction
+    - writers serialize through a file lock, the store is trimmed back to evict_ratio * max_entries
+      most recently used rows whenever it grows beyond max_entries
+    - eviction renumbers the rows, so the compacted vectors go to a file of a new generation
+      (vectors.<generation>.f32) and the generation is bumped in meta.json. Readers load the index
+      and map the vectors under the lock and reload when the generation changed, a mapping of an
+      older generation stays valid for the process holding it
+    """
+
+    version = 1
+
+    def __init__(self,
+                 store_folder: str,
+                 model_name: str,
+                 max_entries: int = 1000000,
+                 evict_ratio: float = 0.8):
+        self.model_name = model_name
+        self.folder = os.path.join(store_folder, re.sub(r'[^A-Za-z0-9_.-]+', '_', model_name))
+        self.max_entries = max_entries
+        self.evict_ratio = evict_ratio
+        self.keys_path = os.path.join(self.folder, 'keys.npy')
+        self.last_used_path = os.path.join(self.folder, 'last_used.npy')
+        self.meta_path = os.path.join(self.folder, 'meta.json')
+        os.makedirs(self.folder, exist_ok = True)
+        self.lock = FileLock(os.path.join(self.folder, 'store.lock'))
+        self.touched = {}
+        self.load_index()
+
+    @staticmethod
+    def normalize(text):
+        """
+        collapse whitespace so the same description typed with different spacing shares one vector
+        """
+        return ' '.join(str(text).split())
+
+    def make_key(self, text: str):
+        return hashlib.blake2b(f'{self.model_name}\x00{text}'.encode('utf-8'), digest_size = 16).digest()
+
+    def vectors_file(self, generation: int):
+        name = 'vectors.f32' if generation == 0 else f'vectors.{generation}.f32'
+        return os.path.join(self.folder, name)
+
+    @property
+    def vectors_path(self):
+        return self.vectors_file(self.meta.get('generation', 0))
+
+    def read_meta(self):
+        try:
+            with open(self.meta_path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def load_index(self):
+        """
+        (re)load meta data and the key index, the vectors themselves stay on disk
+        """
+        with self.lock:
+            self.meta = {'version': self.version, 'model_name': self.model_name, 'dim': 0, 'count': 0, 'capacity': 0, 'generation': 0}
+            self.keys = np.zeros(0, dtype = 'S16')
+            self.last_used = np.zeros(0, dtype = np.int64)
+            if os.path.exists(self.meta_path):
+                try:
+                    with open(self.meta_path, 'r') as f:
+                        meta = json.load(f)
+                    if meta.get('version') == self.version and meta.get('model_name') == self.model_name:
+                        self.meta = meta
+                        self.keys = np.load(self.keys_path)[:meta['count']]
+                        self.last_used = np.load(self.last_used_path)[:meta['count']]
+                except (OSError, ValueError) as e:
+                    print(f"embedding cache index could not be read ({e}), starting an empty one.")
+            self.row_of = {k: i for i, k in enumerate(self.keys.tolist())}
+            self.vectors = None
+        return None
+
+    def refresh(self):
+        """
+        Reload the index when another process evicted since it was loaded (rows were renumbered),
+        called with the lock held. Rows added meanwhile keep their numbers and are picked up by the
+        next write
+        """
+        meta = self.read_meta()
+        if meta is None or meta.get('generation', 0) == self.meta.get('generation', 0):
+            return None
+        touched = self.touched
+        self.load_index()
+        self.touched = touched
+        return None
+
+    def merge_usage(self):
+        """
+        Fold the usage timestamps of this process into the freshly loaded index, called with the lock held
+        """
+        for key, used in self.touched.items():
+            row = self.row_of.get(key)
+            if row is not None and used > self.last_used[row]:
+                self.last_used[row] = used
+        self.touched = {}
+        return None
+
+    def flush_usage(self):
+        """
+        Persist the LRU timestamps of the rows looked up by this process
+        """
+        if len(self.touched) == 0:
+            return None
+        with self.lock:
+            touched = self.touched
+            self.load_index()
+            self.touched = touched
+            self.merge_usage()
+            self.write_index()
+        return None
+
+    def open_vectors(self, mode: str = 'r'):
+        if self.meta['capacity'] == 0:
+            return None
+        return np.memmap(self.vectors_path, dtype = np.float32, mode = mode,
+                         shape = (self.meta['capacity'], self.meta['dim']))
+
+    def write_index(self):
+        for path, values in [(self.keys_path, self.keys), (self.last_used_path, self.last_used)]:
+            with open(path + '.tmp', 'wb') as f:
+                np.save(f, values)
+            os.replace(path + '.tmp', path)
+        with open(self.meta_path + '.tmp', 'w') as f:
+            json.dump(self.meta, f, indent = 2)
+        os.replace(self.meta_path + '.tmp', self.meta_path)
+        return None
+
+    def get_many(self, texts):
+        """
+        Look up normalized texts, returns (vectors, found) where vectors has one row per text
+        (zeros for the ones not found) and found is a boolean mask
+        """
+        keys = [self.make_key(t) for t in texts]
+        with self.lock:
+            self.refresh()
+            rows = np.array([self.row_of.get(k, -1) for k in keys], dtype = np.int64)
+            found = rows >= 0
+            if found.any() and self.vectors is None:
+                # mapped with the index it belongs to, the mapping outlives a later eviction
+                self.vectors = self.open_vectors('r')
+        dim = self.meta['dim']
+        vectors = np.zeros((len(texts), dim), dtype = np.float32)
+        if found.any():
+            vectors[found] = self.vectors[rows[found]]
+            # LRU book keeping, persisted with the next write
+            now = int(time.time())
+            self.last_used[rows[found]] = now
+            self.touched.update({k: now for k, hit in zip(keys, found) if hit})
+        return vectors, found
+
+    def put_many(self,
+                 texts,
+                 vectors: np.ndarray):
+        """
+        Append new (normalized text, vector) rows to the store
+        """
+        if len(texts) == 0:
+            return None
+        vectors = np.asarray(vectors, dtype = np.float32)
+        with self.lock:
+            # another process may have written since we loaded the index
+            touched = self.touched
+            self.load_index()
+            self.touched = touched
+            self.merge_usage()
+            if self.meta['dim'] == 0:
+                self.meta['dim'] = int(vectors.shape[1])
+            if vectors.shape[1] != self.meta['dim']:
+                print("embedding dimension does not match the cache, skip caching.")
+                return None
+
+            new_keys, new_rows, seen = [], [], set()
+            for i, text in enumerate(texts):
+                key = self.make_key(text)
+                if key in self.row_of or key in seen:
+                    continue
+                seen.add(key)
+                new_keys.append(key)
+                new_rows.append(i)
+            if len(new_keys) == 0:
+                self.write_index()
+                return None
+
+            count = self.meta['count']
+            needed = count + len(new_keys)
+            if needed > self.meta['capacity']:
+                self.vectors = None
+                capacity = max(needed, 2 * self.meta['capacity'], 1024)
+                with open(self.vectors_path, 'ab') as f:
+                    f.truncate(capacity * self.meta['dim'] * 4)
+                self.meta['capacity'] = capacity
+            store_vectors = self.open_vectors('r+')
+            store_vectors[count:needed] = vectors[new_rows]
+            store_vectors.flush()
+            del store_vectors
+
+            self.keys = np.concatenate([self.keys, np.array(new_keys, dtype = 'S16')])
+            self.last_used = np.concatenate([self.last_used, np.full(len(new_keys), int(time.time()), dtype = np.int64)])
+            self.row_of.update({k: count + i for i, k in enumerate(new_keys)})
+            self.meta['count'] = needed
+            if needed > self.max_entries:
+                self.evict()
+                self.write_index()
+                self.remove_old_generations()
+            else:
+                self.write_index()
+        return None
+
+    def evict(self):
+        """
+        Keep only the most recently used rows, written compactly to the vector file of the next
+        generation (the caller writes the index). Called with the lock held.
+        """
+        keep_count = int(self.max_entries * self.evict_ratio)
+        keep = np.sort(np.argsort(-self.last_used, kind = 'stable')[:keep_count])
+        generation = self.meta.get('generation', 0) + 1
+        source = self.open_vectors('r')
+        compact = np.memmap(self.vectors_file(generation), dtype = np.float32, mode = 'w+',
+                            shape = (max(keep_count, 1), self.meta['dim']))
+        for start in range(0, len(keep), 65536):
+            block = keep[start:start + 65536]
+            compact[start:start + len(block)] = source[block]
+        compact.flush()
+        del compact, source
+        self.vectors = None
+        print(f"embedding cache trimmed from {self.meta['count']} to {len(keep)} entries.")
+        self.keys = self.keys[keep]
+        self.last_used = self.last_used[keep]
+        self.row_of = {k: i for i, k in enumerate(self.keys.tolist())}
+        self.meta['count'] = len(keep)
+        self.meta['capacity'] = max(keep_count, 1)
+        self.meta['generation'] = generation
+        return None
+
+    def remove_old_generations(self):
+        """
+        Delete the vector files of earlier generations, a file still mapped by another process on
+        windows is left for the next eviction. Called with the lock held, after the index is written
+        """
+        current = os.path.basename(self.vectors_path)
+        for name in os.listdir(self.folder):
+            if name.startswith('vectors.') and name.endswith('.f32') and name != current:
+                try:
+                    os.remove(os.path.join(self.folder, name))
+                except OSError:
+                    pass
+        return None
+
+
+class EmbeddingEngine:
+    """
+    Batched description similarity.
+    Instead of encoding every (desc1, desc2) pair on its own, all distinct descriptions of both sides
+    are collected, encoded once in large batches as normalized vectors, and the pair similarities are
+    computed as a row-wise dot product over the index arrays (cosine similarity of unit vectors).
+    """
+
+    # model name -> loaded SentenceTransformer, shared by every engine of the process (batch workers run many jobs)
+    _models = {}
+
+    def __init__(self,
+                 model_name: str = 'all-MiniLM-L6-v2',
+                 batch_size: int = 256,
+                 pair_block_size: int = 65536,
+                 store: EmbeddingStore = None):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.pair_block_size = pair_block_size
+        self.store = store
+        self._model = None
+
+    @property
+    def model(self):
+        """
+        The SentenceTransformer model, loaded on first use.
+        sentence_transformers pulls in torch and transformers (seconds of import time and hundreds
+        of MB), so it is only imported when a description actually needs to be encoded.
+        """
+        if self._model is None:
+            self._model = EmbeddingEngine._models.get(self.model_name)
+        if self._model is None:
+            print(f"loading sentence transformer model '{self.model_name}' ......")
+            from sentence_transformers import SentenceTransformer
+            self._model = SentenceTransformer(self.model_name)
+            EmbeddingEngine._models[self.model_name] = self._model
+        return self._model
+
+    def encode(self, texts):
+        """
+        Encode a list of texts into an (n, dim) float32 matrix of unit length vectors,
+        texts already in the embedding store are not sent to the model again
+        """
+        texts = [EmbeddingStore.normalize(t) for t in texts]
+        if len(texts) == 0:
+            return np.zeros((0, 0), dtype = np.float32)
+        # descriptions differing only by spacing collapse to one text after normalization
+        codes, texts = pd.factorize(pd.Series(texts, dtype = object))
+        texts = list(texts)
+        if self.store is None:
+            return self.encode_with_model(texts)[codes]
+
+        embeddings, found = self.store.get_many(texts)
+        missing = np.flatnonzero(~found)
+        if len(missing) > 0:
+            if len(texts) > 1:
+                print(f'{len(texts) - len(missing)} descriptions found in embedding cache, encoding {len(missing)} new ones ......')
+            new_embeddings = self.encode_with_model([texts[i] for i in missing])
+            if embeddings.shape[1] == 0:
+                embeddings = np.zeros((len(texts), new_embeddings.shape[1]), dtype = np.float32)
+            embeddings[missing] = new_embeddings
+            self.store.put_many([texts[i] for i in missing], new_embeddings)
+        else:
+            self.store.flush_usage()
+        return embeddings[codes]
+
+    def encode_with_model(self, texts):
+        embeddings = self.model.encode(texts,
+                                       batch_size = self.batch_size,
+                                       normalize_embeddings = True,
+                                       convert_to_numpy = True,
+                                       show_progress_bar = len(texts) > 10 * self.batch_size)
+        return np.asarray(embeddings, dtype = np.float32)
+
+    def pair_similarity(self,
+                        left,
+                        right):
+        """
+        Cosine similarity of each (left[i], right[i]) description pair.
+        Pairs with a missing description get 0, nothing says they are the same product.
+        """
+        left = pd.Series(left, dtype = object).reset_index(drop = True)
+        right = pd.Series(right, dtype = object).reset_index(drop = True)
+        n_pairs = len(left)
+        sims = np.zeros(n_pairs, dtype = np.float64)
+        if n_pairs == 0:
+            return sims
+
+        # one code per distinct description over both sides, -1 for missing
+        codes, uniques = pd.factorize(pd.concat([left, right], ignore_index = True))
+        left_codes, right_codes = codes[:n_pairs], codes[n_pairs:]
+        if n_pairs > 1:
+            print(f'encoding {len(uniques)} distinct descriptions for {n_pairs} pairs ......')
+        embeddings = self.encode(list(uniques))
+
+        valid = np.flatnonzero((left_codes >= 0) & (right_codes >= 0))
+        for start in range(0, len(valid), self.pair_block_size):
+            block = valid[start:start + self.pair_block_size]
+            sims[block] = np.einsum('ij,ij->i',
+                                    embeddings[left_codes[block]],
+                                    embeddings[right_codes[block]])
+        return np.clip(sims, -1.0, 1.0)
@@ -0,0 +1,218 @@
+import os
+import zipfile
+import threading
+import multiprocessing
+import numpy as np
+import pandas as pd
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from openpyxl import load_workbook
+from openpyxl.cell.cell import TYPE_ERROR, TYPE_NUMERIC
+
+# pd.read_excel default na_values, these strings come back as NaN
+NA_STRINGS = {'', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+              '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null'}
+
+
+def cell_value(cell):
+    """
+    The value pd.read_excel takes from an openpyxl cell: '' when empty, NaN for an error, whole numbers as int
+    """
+    if cell.value is None:
+        return ''
+    if cell.data_type == TYPE_ERROR:
+        return np.nan
+    if cell.data_type == TYPE_NUMERIC:
+        value = int(cell.value)
+        return value if value == cell.value else float(cell.value)
+    return cell.value
+
+
+def sheet_rows(sheet,
+               wanted: set = None):
+    """
+    (row width, {column position: value}) per row of a read-only tab, rows missing from the file
+    come back empty. The width is up to the last non empty cell, cells outside wanted are not
+    converted and only count towards it.
+    """
+    for row in sheet.iter_rows():
+        values, width = {}, 0
+        for i, cell in enumerate(row):
+            if wanted is None or i in wanted:
+                value = cell_value(cell)
+                values[i] = value
+                if not (isinstance(value, str) and value == ''):
+                    width = i + 1
+            elif cell.value is not None and not (isinstance(cell.value, str) and cell.value == ''):
+                width = i + 1
+        yield width, values
+
+
+def read_tab(sheet,
+             usecols: list = None):
+    """
+    One tab as a DataFrame of strings, the same frame pd.read_excel(sheet_name = tab, dtype = str)
+    gives restricted to usecols (file order kept, columns not in the tab are left out).
+    """
+    # the dimensions a workbook states can be wrong, pandas resets them too
+    sheet.reset_dimensions()
+    header = None
+    for width, values in sheet_rows(sheet):
+        header = [values.get(i, '') for i in range(width)]
+        break
+    if header is None:
+        return pd.DataFrame()
+    take = None
+    rows = sheet_rows(sheet)
+    if usecols is not None:
+        take = [i for i, name in enumerate(header) if name in usecols and name not in header[:i]]
+        # only the wanted columns are converted
+        rows = sheet_rows(sheet, set(take))
+    next(rows, None)
+
+    # pandas pads every row to the widest one and drops the empty rows at the end of the tab
+    records, width, last = [], len(header), 0
+    for row_width, values in rows:
+        if row_width > 0:
+            last = len(records) + 1
+            width = max(width, row_width)
+        records.append(values)
+    records = records[:last]
+    if take is None:
+        take = list(range(width))
+    header = header + [''] * (width - len(header))
+    columns = mangle([f'Unnamed: {i}' if header[i] == '' else header[i] for i in take])
+    values = np.empty((len(records), len(take)), dtype = object)
+    for r, record in enumerate(records):
+        values[r] = [record.get(i) for i in take]
+    return pd.DataFrame({col: to_string_array(values[:, j]) for j, col in enumerate(columns)},
+                        index = pd.RangeIndex(len(records)), columns = columns)
+
+
+def mangle(columns: list):
+    """
+    Duplicated column names get .1, .2 ... like pandas does
+    """
+    seen, out = {}, []
+    for col in columns:
+        name = col
+        while name in seen:
+            seen[col] += 1
+            name = f'{col}.{seen[col]}'
+        seen.setdefault(name, 0)
+        out.append(name)
+    return out
+
+
+def to_string_array(values: np.ndarray):
+    """
+    dtype = str conversion of read_excel: empty cells and na strings to NaN, everything else through str()
+    """
+    out = np.empty(len(values), dtype = object)
+    for i, value in enumerate(values):
+        if value is None:
+            out[i] = np.nan
+        elif isinstance(value, str):
+            out[i] = np.nan if value in NA_STRINGS else value
+        elif isinstance(value, float) and np.isnan(value):
+            out[i] = np.nan
+        else:
+            out[i] = str(value)
+    return out
+
+
+def sheet_names(path: str):
+    """
+    Tab names of a workbook in workbook order, read from xl/workbook.xml without loading the workbook
+    """
+    with zipfile.ZipFile(path) as archive:
+        root = ET.fromstring(archive.read('xl/workbook.xml'))
+    return [sheet.get('name') for sheet in root.iter() if sheet.tag.endswith('}sheet')]
+
+
+def read_workbook(path: str,
+                  usecols: list = None,
+                  tabs: list = None):
+    """
+    Tabs of a workbook (names or positions, every tab when None).
+    Returns a list of (tab name, DataFrame).
+    """
+    workbook = load_workbook(path, read_only = True, data_only = True, keep_links = False)
+    try:
+        # chart sheets have no cells
+        names = [sheet.title for sheet in workbook.worksheets]
+        if tabs is not None:
+            names = [names[tab] if isinstance(tab, int) else tab for tab in tabs if isinstance(tab, int) or tab in names]
+        return [(name, read_tab(workbook[name], usecols)) for name in names]
+    finally:
+        workbook.close()
+
+
+def read_task(task: tuple):
+    path, usecols, tabs = task
+    return read_workbook(path, usecols, tabs)
+
+
+class ExcelReader:
+    """
+    Excel ingestion for pre_check and the CCX exports.
+    Tabs are streamed row by row through openpyxl's read-only mode and only the template columns
+    are converted. When there is enough to read the workbooks are parsed in parallel worker processes,
+    split by tab when there are fewer workbooks than workers. Results come back in the order
+    pd.read_excel would give them (file order, then workbook tab order).
+    Workers are started with forkserver/spawn, never fork: the reader also runs on the prefetch
+    thread (see Prefetcher), and off the main thread it reads serially.
+    """
+
+    # below this total size the pool start up costs more than it saves (every worker imports pandas)
+    parallel_min_bytes = 8 * 2**20
+
+    def __init__(self,
+                 max_workers: int = None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+
+    def read(self,
+             paths: list,
+             usecols: list = None,
+             all_tabs: bool = False):
+        """
+        Read the first tab (or every tab with all_tabs) of each workbook.
+        Returns a list of (path, tab name, DataFrame).
+        PermissionError/FileNotFoundError of a file are raised as pd.read_excel would.
+        """
+        size = sum(os.path.getsize(path) for path in paths)
+        parallel = self.max_workers > 1 and size >= self.parallel_min_bytes and \
+                   threading.current_thread() is threading.main_thread()
+        tasks = []
+        for path in paths:
+            if not all_tabs:
+                tasks.append((path, usecols, [0]))
+            elif parallel and len(paths) < self.max_workers:
+                tasks.extend([(path, usecols, [tab]) for tab in sheet_names(path)])
+            else:
+                tasks.append((path, usecols, None))
+        if parallel and len(tasks) > 1:
+            try:
+                results = self.read_parallel(tasks)
+            except (BrokenProcessPool, OSError) as e:
+                if isinstance(e, (PermissionError, FileNotFoundError)):
+                    raise
+                print(f'parallel excel read unavailable ({type(e).__name__}), reading files one by one')
+                results = [read_task(task) for task in tasks]
+        else:
+            results = [read_task(task) for task in tasks]
+        return [(task[0], tab, df) for task, tab_dfs in zip(tasks, results) for tab, df in tab_dfs]
+
+    def read_parallel(self, tasks: list):
+        # biggest workbooks first so one large file does not end up last on a worker
+        order = sorted(range(len(tasks)), key = lambda i: -os.path.getsize(tasks[i][0]))
+        start_methods = multiprocessing.get_all_start_methods()
+        # forking a process with other threads running can copy a held lock into the child
+        context = multiprocessing.get_context('forkserver' if 'forkserver' in start_methods else 'spawn')
+        results = [None] * len(tasks)
+        with ProcessPoolExecutor(max_workers = min(self.max_workers, len(tasks)), mp_context = context) as executor:
+            futures = {i: executor.submit(read_task, tasks[i]) for i in order}
+            for i, future in futures.items():
+                results[i] = future.result()
+        return results
@@ -1,13 +1,26 @@
 import os
+import shutil
 import pandas as pd
 import numpy as np
-from sentence_transformers import SentenceTransformer
-from scipy.spatial import distance
 from datetime import datetime
+from concurrent.futures import Future
 from colorama import init, Fore, Style
 from FolderManager import FolderManager
 from TypesDefinition import ProcessType, CheckMode, StandardizeTarget, Status
 from ReportFurnishing import ReportFurnishing
+from DataCache import DataCache
+from PartNumberIndex import PartNumberIndex
+from FuzzyPartIndex import FuzzyPartIndex
+from DescriptionIndex import DescriptionIndex
+from ReferenceData import ReferenceData
+from ExcelReader import ExcelReader
+from JoinEngine import JoinEngine
+from EmbeddingEngine import EmbeddingEngine, EmbeddingStore
+from TieredSimilarity import TieredSimilarity
+from Prefetcher import Prefetcher
+from CheckpointStore import CheckpointStore
+from RunSpec import RunSpec
+from Profiler import StageProfiler, profiled_stage
 import warnings
 
 # turn on colorama
@@ -25,12 +38,51 @@ class FileProcessor:
 
     _infor_std_cache = None
     _import_std_cache = None
+    # target -> (standardized frame, its PartNumberIndex)
+    _part_number_index = {}
+    # model name -> (infor frame, DescriptionIndex of its item master, item master lines)
+    _description_index = {}
+    # bump whenever standardize/standardize_helper output changes, so on-disk caches get rebuilt
+    std_schema_version = 'std-v1'
+    # a fresh Infor export is applied to the cached frame as a delta unless more than this share of lines changed
+    delta_rebuild_ratio = 0.5
+    std_cols = ['Contract Number', 'MFN', 'VN', 'IN', 'Description', 'UnitCost', 'UOM', 'QOE',
+                'Effective Date', 'Expiration Date', 'Contract Line', 'Manufacturer', 'Vendor',
+                'Contract', 'ItemType', 'OnHold', 'ActiveLine', 'ContractLineState', 'Contract.ContractStatus',
+                'ContractImport', 'FileName']
+    seq_prefix = {StandardizeTarget.INFOR: 'i',
+                  StandardizeTarget.IMPORT: 'imp'}
+    # low cardinality export columns parsed as categoricals (see read_csv_projected)
+    category_cols = ['OnHold', 'ActiveLine', 'ContractLineState', 'Contract.ContractStatus', 'ItemType',
+                     'Manufacturer', 'Vendor', 'ContractImport.Vendor']
+    # rows per chunk when reading the Infor exports, None reads the file in one go
+    csv_chunksize = None
+    # stacked_std layout (see compact_std)
+    compact_category_cols = ['Contract Number', 'UOM', 'Manufacturer', 'Vendor', 'Contract', 'ItemType',
+                             'OnHold', 'ActiveLine', 'ContractLineState', 'Contract.ContractStatus',
+                             'ContractImport', 'FileName', 'Source System', 'ExpiredFlag', 'Active Rank']
+    source_seq_prefix = {'CCX': 'ccx', 'Infor': 'i', 'Import': 'imp', 'TP': 'tp'}
+    # columns of the TP input template and the ones taken from the CCX contract exports
+    tp_template_cols = ['Mfg Part Num', 'Vendor Part Num', 'Buyer Part Num', 'Description', 'Contract Price',
+                        'UOM', 'QOE', 'Effective Date', 'Expiration Date']
+    # stacked_std columns the duplication search carries for the search set lines (review file and dedup report)
+    dup_search_cols = ['Contract Number', 'MFN', 'VN', 'IN', 'Description', 'UnitCost', 'UOM', 'QOE',
+                       'Effective Date', 'Expiration Date', 'Contract Line', 'Manufacturer', 'Vendor', 'ItemType',
+                       'FileName', 'Source System', 'seq', 'MFN RF', 'ExpiredFlag', 'Active Rank']
+    ccx_export_cols = ['Contract Number', 'Mfg Part Num', 'Vendor Part Num', 'Buyer Part Num', 'Description',
+                       'Contract Price', 'UOM', 'QOE', 'Effective Date', 'Expiration Date', 'Manufacturer', 'Vendor']
+    # full_process stages checkpointed to the temp folder, in order (see CheckpointStore)
+    checkpoint_stages = ['tp_std', 'search_scope', 'stacked_std']
 
     def __init__(self, 
                 folder_manager: FolderManager,
                 check_mode: CheckMode = CheckMode.MFN_RF,
-                data_caching = True):
+                data_caching = True,
+                run_spec: RunSpec = None,
+                profiler: StageProfiler = None):
         self.folder_manager = folder_manager
+        # when a run spec is given every prompt is answered from it (headless mode)
+        self.run_spec = run_spec
         self.check_mode = check_mode
         self.datesig = datetime.today().strftime('%Y%m%d')
         self.today = datetime.today().strftime('%Y-%m-%d')
@@ -49,28 +101,168 @@ class FileProcessor:
         self.processed_file_path = folder_manager.get_folder_path('processed')
         self.temp_file_path = folder_manager.get_folder_path('temp')
         self.search_scope = []
-        self.tp_std = None
-        self.ccx_std = None
+        self.data_caching = data_caching
+        # standardized sources are computed on first read (see the *_std properties below)
+        self._std = {}
         self.stacked_std = None
-        self.model = None
-
-        if data_caching == False:
-            self.infor_std = None
-            self.import_std = None
-        else:
-            if FileProcessor._infor_std_cache is None:
-                FileProcessor._infor_std_cache = self.standardize(StandardizeTarget.INFOR)
-            self.infor_std = FileProcessor._infor_std_cache
-
-            if FileProcessor._import_std_cache is None:
-                FileProcessor._import_std_cache = self.standardize(StandardizeTarget.IMPORT)
-            self.import_std = FileProcessor._import_std_cache
+        self.stacked_index = None
+        self.embedding_engine = None
+        # per stage timing/memory, reported to the temp folder at the end of process_files
+        self.profiler = profiler or StageProfiler(trace_memory = run_spec.profile_memory if run_spec else False,
+                                                  cprofile = run_spec.profile_cprofile if run_spec else False)
+        self.data_cache = DataCache(self.shared_file_path, self.std_schema_version)
+        self.excel_reader = ExcelReader()
+        # work of the next steps started while a review prompt is open (interactive runs, or asked by the run spec)
+        self.prefetcher = Prefetcher(enabled = run_spec.prefetch if run_spec else True)
+        # stage outputs of full_process, a failed or exited run resumes from them
+        self.checkpoints = CheckpointStore(os.path.join(self.temp_file_path, 'checkpoints'), self.std_schema_version)
+        # stage -> id of the checkpoint this run saved or resumed from
+        self.checkpoint_ids = {}
+        self.reference_data = ReferenceData(self.shared_file_path,
+                                            manufacturer_file = self.manufacturer_map_file,
+                                            vendor_file = self.vendor_map_file,
+                                            item_uom_file = self.itemUOM_file)
 
 
     @classmethod
     def reset_cache(cls):
         cls._infor_std_cache = None
         cls._import_std_cache = None
+        cls._part_number_index = {}
+        cls._description_index = {}
+
+    def lazy_standardize(self,
+                         target_file: StandardizeTarget):
+        """
+        Standardize a source the first time a stage reads it and memoize the result.
+        With data_caching on, Infor and Import frames are also shared with every other FileProcessor
+        of the process through the class level cache. A failed standardization is not memoized,
+        so the next read tries again (e.g. after the missing file is dropped in).
+        """
+        if self._std.get(target_file) is not None:
+            return self._std[target_file]
+
+        class_cache = {StandardizeTarget.INFOR: '_infor_std_cache',
+                       StandardizeTarget.IMPORT: '_import_std_cache'}.get(target_file)
+        prefetched = None
+        if self.prefetcher.has(f'standardize {target_file}'):
+            # standardized in the background during the scoping review, used if its files did not change since
+            prefetched = self.prefetcher.result(f'standardize {target_file}', stamp = self.input_stamp(target_file))
+        if self.data_caching and class_cache is not None and getattr(FileProcessor, class_cache) is not None:
+            std_df = getattr(FileProcessor, class_cache)
+        elif isinstance(prefetched, pd.DataFrame):
+            std_df = prefetched
+        elif class_cache is not None:
+            with self.profiler.stage(f'standardize {target_file}'):
+                std_df = self.standardize_cached(target_file)
+                self.profiler.rows(rows_out = len(std_df) if isinstance(std_df, pd.DataFrame) else None)
+        else:
+            with self.profiler.stage(f'standardize {target_file}'):
+                std_df = self.standardize(target_file)
+                self.profiler.rows(rows_out = len(std_df) if isinstance(std_df, pd.DataFrame) else None)
+
+        if not isinstance(std_df, pd.DataFrame):
+            return std_df
+        if self.data_caching and class_cache is not None:
+            setattr(FileProcessor, class_cache, std_df)
+        self._std[target_file] = std_df
+        return std_df
+
+    @property
+    def infor_std(self):
+        return self.lazy_standardize(StandardizeTarget.INFOR)
+
+    @infor_std.setter
+    def infor_std(self, value):
+        self._std[StandardizeTarget.INFOR] = value
+
+    @property
+    def import_std(self):
+        return self.lazy_standardize(StandardizeTarget.IMPORT)
+
+    @import_std.setter
+    def import_std(self, value):
+        self._std[StandardizeTarget.IMPORT] = value
+
+    @property
+    def ccx_std(self):
+        return self.lazy_standardize(StandardizeTarget.CCX)
+
+    @ccx_std.setter
+    def ccx_std(self, value):
+        self._std[StandardizeTarget.CCX] = value
+
+    @property
+    def tp_std(self):
+        return self.lazy_standardize(StandardizeTarget.TP)
+
+    @tp_std.setter
+    def tp_std(self, value):
+        self._std[StandardizeTarget.TP] = value
+
+    def input_stamp(self,
+                    target_file: StandardizeTarget):
+        """
+        (file name, size, mtime) of the files standardize reads for target_file, tells a result
+        prefetched in the background apart from one of files changed since
+        """
+        if target_file == StandardizeTarget.CCX:
+            return self.files_stamp(self.ccx_file_path)
+        if target_file == StandardizeTarget.INFOR:
+            return self.files_stamp(self.shared_file_path, [self.infor_contract_line_file_name])
+        if target_file == StandardizeTarget.IMPORT:
+            return self.files_stamp(self.shared_file_path, [self.infor_contract_line_import_file_name])
+        return None
+
+    def files_stamp(self,
+                    folder: str,
+                    names: list = None):
+        """
+        (file name, size, mtime) of the given files of folder, of every .xlsx file in it without names
+        """
+        if names is None:
+            names = sorted(f for f in os.listdir(folder) if f.endswith('.xlsx')) if os.path.isdir(folder) else []
+        stamp = []
+        for name in names:
+            try:
+                stat = os.stat(os.path.join(folder, name))
+            except OSError:
+                continue
+            stamp.append((name, stat.st_size, stat.st_mtime_ns))
+        return tuple(stamp)
+
+    def ask(self,
+            key: str,
+            prompt: str):
+        """
+        Prompt the analyst, or in headless mode take the answer from the run spec
+        """
+        if self.run_spec is None:
+            return input(prompt)
+        answer = self.run_spec.answer(key, prompt)
+        print(f"{prompt} {answer} [run spec]")
+        return answer
+
+    def option(self, name: str):
+        """
+        Optional feature switched on in the run spec, off in interactive runs (nothing is asked)
+        """
+        return self.run_spec is not None and bool(getattr(self.run_spec, name, False))
+
+    def accept_review(self,
+                      review_file: str,
+                      reviewed_file: str):
+        """
+        Headless runs with auto_accept_reviews take the generated review file as reviewed,
+        unless a reviewed file was already prepared
+        """
+        if self.run_spec is None or not self.run_spec.auto_accept_reviews:
+            return None
+        reviewed_path = os.path.join(self.output_file_path, reviewed_file)
+        if not os.path.exists(reviewed_path):
+            shutil.copyfile(os.path.join(self.output_file_path, review_file), reviewed_path)
+            print(f"'{review_file}' accepted as '{reviewed_file}' [run spec]")
+        return None
 
     def set_check_mode(self):
         check_mode = input("Please select the check mode for the pre-check process, key in 'MFN' or 'MFN RF': ")
@@ -96,108 +288,151 @@ class FileProcessor:
         """
         Helper function to standardize UOMs
         """
-        # read UOM.csv from infor folder and dup that into the dictionay called translation
-        uom_translation = pd.read_csv(os.path.join(self.shared_file_path, 'UOM.csv')).\
-                          set_index('see UOM').to_dict()['use UOM']
+        # UOM.csv translation is loaded once by the reference data registry
+        uom_translation = self.reference_data.uom_map()
         
         # apply the translation to the provided UOM
         return uom_translation[UOM.upper().strip()] if UOM.upper().strip() in uom_translation else 'TBD'
+
+    def UOM_helper_series(self,
+                          UOM: pd.Series):
+        """
+        Standardize a whole UOM column in one go, empty UOMs stay empty (NaN)
+        """
+        uom_std = self.reference_data.map_series(UOM.str.upper().str.strip(),
+                                                 self.reference_data.uom_map(),
+                                                 default = 'TBD')
+        return uom_std.where(~(UOM.isnull() | (UOM == '')), np.nan)
     
     
     # this is the main logic loop for all different processes
-    # Ideally I should move all the process input here as parameters
+    # every prompt goes through self.ask, so a run spec can drive the whole flow without a TTY
     def process_files(self,
                       process_type: ProcessType
                       ):
+        """
+        Run a process, then save the per stage timing/memory report to the temp folder
+        """
+        status = Status.FAILED
+        try:
+            status = self.process_files_helper(process_type)
+        finally:
+            self.prefetcher.close()
+            try:
+                self.profiler.write_report(self.temp_file_path,
+                                           {'manufacturer': self.manufacturer,
+                                            'contract': self.contract,
+                                            'process_type': str(process_type),
+                                            'status': status})
+            except OSError as e:
+                print(f"unable to save the run report ({e}).")
+        return status
+
+    def process_files_helper(self,
+                             process_type: ProcessType):
+        status = Status.FAILED
         if process_type == ProcessType.pre_check:
             print('Initiating pre-check process .......')
-            self.pre_check(check_mode = self.check_mode)
+            status = self.pre_check(check_mode = self.check_mode)
         elif process_type == ProcessType.scoping:
             print('Initiating scoping process .......')
-            self.scoping()
+            status = self.scoping()
         elif process_type == ProcessType.standardize_all_and_stack:
             print('Initiating standardize all and stack process .......')
             self.set_scope(search_term = self.manufacturer)
-            self.standardize_all_and_stack()
+            status = self.standardize_all_and_stack()
         elif process_type == ProcessType.dup_search_and_compare:
             print('Initializing search and compare process .......')
             self.set_scope(search_term = self.manufacturer)
-            self.standardize_all_and_stack()
+            self.standardize_all_and_stack(prefetch = True)
             self.set_model()
             standard_run = 'yes'
             base_set, search_set_input = 'TP', 'CCX'
-            standard_run = input('do we want to run a standard dup search between your to-be processed items Vs. CCX contract items? (Y/N)')
+            standard_run = self.ask('standard_dup_run', 'do we want to run a standard dup search between your to-be processed items Vs. CCX contract items? (Y/N)')
             if standard_run.lower() == 'no' or standard_run.lower() == 'n':
-                base_set = input('which set you would like to run as base set? (type one of TP/Infor/Import/CCX)')
-                search_set_input = input('which set you would like to run as search set? (type in TP/Infor/Import/CCX, for multiple search sets, seperate by ",")')
+                base_set = self.ask('base_set', 'which set you would like to run as base set? (type one of TP/Infor/Import/CCX)')
+                search_set_input = self.ask('search_set', 'which set you would like to run as search set? (type in TP/Infor/Import/CCX, for multiple search sets, seperate by ",")')
                 print(f'proceding with base set as {base_set}, search set as {search_set_input}')
             else:
                 print('proceeding with standard dup search sets .......')
-            self.dup_search_and_compare(check_mode = self.check_mode,
-                                        base_set = base_set,
-                                        search_set_input = search_set_input)
+            status = self.dup_search_and_compare(check_mode = self.check_mode,
+                                                 base_set = base_set,
+                                                 search_set_input = search_set_input)
         elif process_type == ProcessType.itemmast_search_and_compare:
             print('Initiating itemmast search and compare process .......')
             self.set_scope(search_term = self.manufacturer)
             self.standardize_all_and_stack()
             self.set_model()
-            self.itemmast_search_and_compare(check_mode = self.check_mode)
+            status = self.itemmast_search_and_compare(check_mode = self.check_mode)
         elif process_type == ProcessType.ccx_dup_search_and_itemmast_match:
             print('Initiating pre-processor reporting process .......')
             self.set_scope(search_term = self.manufacturer)
-            self.standardize_all_and_stack()
+            self.standardize_all_and_stack(prefetch = True)
             self.set_model()
-            self.dup_search_and_compare(check_mode = self.check_mode,
-                            base_set = 'TP',
-                            search_set_input = 'CCX')
-            self.itemmast_search_and_compare(check_mode = self.check_mode)
-            self.replacement_contract_pair_check(check_mode = CheckMode.MFN)
+            s_dup_run = self.dup_search_and_compare(check_mode = self.check_mode,
+                                                    base_set = 'TP',
+                                                    search_set_input = 'CCX',
+                                                    prefetch = True)
+            s_im_match = self.itemmast_search_and_compare(check_mode = self.check_mode)
+            s_replace = self.replacement_contract_pair_check(check_mode = CheckMode.MFN)
+            if Status.FAILED not in [s_dup_run, s_im_match, s_replace]:
+                status = Status.SUCCESS
         elif process_type == ProcessType.replacement_contract_pair_check:
             print('Initiating replacement contract pair check process .......')
             self.set_scope(search_term = self.manufacturer)
             self.standardize_all_and_stack()
-            self.replacement_contract_pair_check(check_mode = CheckMode.MFN)
+            status = self.replacement_contract_pair_check(check_mode = CheckMode.MFN)
         elif process_type == ProcessType.full_process:
             print('Initiating full process for preprocessor .......')
             s_pre_check, s_scoping, s_set_scope, s_std = Status.FAILED, Status.FAILED, Status.FAILED, Status.FAILED
             s_dup_run, s_im_match, s_replace = Status.FAILED, Status.FAILED, Status.FAILED
-            file_ready = input(f"please put your file to be processed to {self.tp_file_path}, ready to run (Y/N)?: ")
+            file_ready = self.ask('file_ready', f"please put your file to be processed to {self.tp_file_path}, ready to run (Y/N)?: ")
             if file_ready.lower() == 'yes' or file_ready.lower() == 'y' or file_ready.lower() == 'ready': 
-                s_pre_check = self.pre_check(check_mode = self.check_mode)
-                while s_pre_check == Status.FAILED: 
-                    pre_check_retry = input('Exit or Retry? (E/R)')
-                    if pre_check_retry.lower() == 'r' or pre_check_retry.lower() == 'retry':
-                        s_pre_check = self.pre_check(check_mode = self.check_mode)
-                    else:
-                        print("Exit preprocessor, bye.")
-                        break
+                # pick up after the last stage a failed or exited run of the project completed
+                resumed = self.resume_checkpoints()
+                if resumed is None:
+                    s_pre_check = self.pre_check(check_mode = self.check_mode)
+                    while s_pre_check == Status.FAILED: 
+                        pre_check_retry = self.ask('pre_check_retry', 'Exit or Retry? (E/R)')
+                        if pre_check_retry.lower() == 'r' or pre_check_retry.lower() == 'retry':
+                            s_pre_check = self.pre_check(check_mode = self.check_mode)
+                        else:
+                            print("Exit preprocessor, bye.")
+                            return Status.FAILED
+                    self.save_checkpoint('tp_std')
             else:
                 print("Exit preprocessor, bye.")
-                return None
+                return Status.FAILED
             
-            s_scoping = self.scoping()
-            while s_scoping == Status.FAILED: 
-                scoping_retry = input('Exit or Retry? (E/R)')
-                if scoping_retry.lower() == 'r' or scoping_retry.lower() == 'retry':
-                    s_scoping = self.scoping()
-                else:
+            if resumed in [None, 'tp_std']:
+                s_scoping = self.scoping(prefetch = True)
+                while s_scoping == Status.FAILED: 
+                    scoping_retry = self.ask('scoping_retry', 'Exit or Retry? (E/R)')
+                    if scoping_retry.lower() == 'r' or scoping_retry.lower() == 'retry':
+                        s_scoping = self.scoping(prefetch = True)
+                    else:
+                        print("Exit preprocessor, bye.")
+                        return Status.FAILED
+                
+                s_set_scope = self.set_scope()
+                if s_set_scope == Status.FAILED:
                     print("Exit preprocessor, bye.")
-                    break
-            
-            s_set_scope = self.set_scope()
-            if s_set_scope == Status.FAILED:
-                print("Exit preprocessor, bye.")
-                return None
+                    return Status.FAILED
+                self.save_checkpoint('search_scope')
 
-            s_std = self.standardize_all_and_stack()
-            if s_std == Status.FAILED:
-                print("Exit preprocessor, bye.")
-                return None
+            if resumed != 'stacked_std':
+                s_std = self.standardize_all_and_stack(prefetch = True)
+                if s_std == Status.FAILED:
+                    print("Exit preprocessor, bye.")
+                    return Status.FAILED
+                self.save_checkpoint('stacked_std')
             
             self.set_model()
             s_dup_run = self.dup_search_and_compare(check_mode = self.check_mode,
                                                     base_set = 'TP',
-                                                    search_set_input = 'CCX')
+                                                    search_set_input = 'CCX',
+                                                    prefetch = True,
+                                                    checkpoint = True)
             if s_dup_run == Status.FAILED:
                 print("Duplication search failed.")
                 
@@ -209,11 +444,131 @@ class FileProcessor:
             if s_replace == Status.FAILED:
                 print("Replacement contract pair check failed.")
 
+            if Status.FAILED not in [s_dup_run, s_im_match, s_replace]:
+                status = Status.SUCCESS
+                # nothing left to resume
+                self.checkpoints.clear()
+
         else:
             print(f'Invalid process type: {process_type}')
     
-        return None
+        return status
+
+    def checkpoint_inputs(self,
+                          stage: str,
+                          settings: dict = None):
+        """
+        What the checkpoint of a full_process stage is built from: the project, the files the stage read
+        (name, size, mtime), the checkpoint of the stage before it and the given settings.
+        A checkpoint is only resumed while all of it is unchanged
+        """
+        inputs = {'manufacturer': self.manufacturer,
+                  'contract': self.contract,
+                  'check_mode': str(self.check_mode),
+                  'reference': self.files_stamp(self.shared_file_path, [self.reference_data.uom_file,
+                                                                        self.manufacturer_map_file,
+                                                                        self.vendor_map_file])}
+        previous = {'search_scope': 'tp_std', 'stacked_std': 'search_scope', 'sims': 'stacked_std'}.get(stage)
+        if previous is not None:
+            inputs[previous] = self.checkpoint_ids.get(previous)
+        if stage == 'tp_std':
+            # TP_INPUT_prechecked.xlsx once pre_check passed
+            inputs['tp_files'] = self.files_stamp(self.tp_file_path)
+        elif stage == 'search_scope':
+            inputs['scoping_reviewed'] = self.files_stamp(self.output_file_path, ['scoping_manual_reviewed.xlsx'])
+            inputs['contract_organization'] = self.files_stamp(self.shared_file_path, [self.contract_organization_file])
+        elif stage == 'stacked_std':
+            inputs['sources'] = {str(target_file): self.input_stamp(target_file) for target_file in
+                                 [StandardizeTarget.INFOR, StandardizeTarget.IMPORT, StandardizeTarget.CCX]}
+        inputs.update(settings or {})
+        return inputs
+
+    def save_checkpoint(self,
+                        stage: str,
+                        frame: pd.DataFrame = None,
+                        settings: dict = None):
+        """
+        Checkpoint the output of a full_process stage to the temp folder (the sims table comes as frame)
+        """
+        values = None
+        if stage == 'tp_std':
+            frame = self.tp_std
+        elif stage == 'search_scope':
+            values = {'search_scope': list(self.search_scope)}
+        elif stage == 'stacked_std':
+            frame = self.stacked_std
+        if frame is not None and not isinstance(frame, pd.DataFrame):
+            return None
+        inputs = self.checkpoint_inputs(stage, settings)
+        with self.profiler.stage(f'checkpoint {stage}'):
+            self.checkpoint_ids[stage] = self.checkpoints.save(stage, inputs, frame = frame, values = values)
+        return self.checkpoint_ids[stage]
+
+    def resume_checkpoints(self):
+        """
+        Find the checkpoints of the last run of the project that are still valid and, when the analyst
+        wants to, restore them. Returns the last stage restored, None to start from scratch
+        """
+        self.checkpoint_ids = {}
+        valid = []
+        for stage in self.checkpoint_stages:
+            manifest = self.checkpoints.valid(stage, self.checkpoint_inputs(stage))
+            if manifest is None:
+                break
+            self.checkpoint_ids[stage] = manifest['id']
+            valid.append(manifest)
+        resume = 'n'
+        if len(valid) > 0:
+            resume = self.ask('resume', f"the last run of this project got through {valid[-1]['name']} ({valid[-1]['saved']}), resume from there? (Y/N)")
+        if resume.lower() != 'yes' and resume.lower() != 'y':
+            self.checkpoint_ids = {}
+            self.checkpoints.clear()
+            return None
+
+        resumed = None
+        with self.profiler.stage('resume'):
+            for manifest in valid:
+                stage = manifest['name']
+                if stage == 'search_scope':
+                    self.search_scope = manifest['values']['search_scope']
+                else:
+                    frame = self.checkpoints.load_frame(stage)
+                    if frame is None:
+                        break
+                    if stage == 'tp_std':
+                        self.tp_std = frame
+                    else:
+                        self.stacked_std = frame
+                        self.stacked_index = None
+                resumed = stage
+        if resumed is None:
+            self.checkpoint_ids = {}
+            return None
+        self.checkpoint_ids = {stage: self.checkpoint_ids[stage] for stage in
+                               self.checkpoint_stages[:self.checkpoint_stages.index(resumed) + 1]}
+        print(f"resuming after {resumed}" + (f", searching scope {self.search_scope}" if 'search_scope' in self.checkpoint_ids else '') + '.')
+        return resumed
+
+    def checkpoint_sims(self,
+                        dup_found: pd.DataFrame,
+                        settings: dict):
+        """
+        Description similarity table of the last run, when it was computed on the same stacked data
+        with the same settings and has every description pair of dup_found, None otherwise
+        """
+        if self.checkpoints.valid('sims', self.checkpoint_inputs('sims', settings)) is None:
+            return None
+        sims_calc_df = self.checkpoints.load_frame('sims')
+        if sims_calc_df is None:
+            return None
+        pairs = dup_found[['Description_x', 'Description_y']].drop_duplicates()
+        found = pairs.merge(sims_calc_df[['Description_x', 'Description_y']], how = 'left', indicator = True)
+        if (found['_merge'] != 'both').any():
+            return None
+        print(f"description similarity of {len(pairs)} pair(s) taken from the checkpoint of the last run.")
+        return sims_calc_df
     
+    @profiled_stage()
     def pre_check(self, check_mode:CheckMode = CheckMode.MFN_RF):
         """
         Perform pre-check operations on all files for a folder, usualy for the 'to_process' folder.
@@ -233,46 +588,34 @@ class FileProcessor:
         
         dfs = []
         checker_null_value, checker_dup_value, checker_unknwon_uom, checker_EA_QOE = False, False, False, False
+        file_paths = []
         for file in os.listdir(self.tp_file_path):
             if not file.endswith('.xlsx'):
                 print(f'ignoring {file} because it is not a .xlsx file')
                 continue
-            file_path = os.path.join(self.tp_file_path, file)
+            file_paths.append(os.path.join(self.tp_file_path, file))
+        try:
+            with self.profiler.stage('read_excel'):
+                tabs = self.excel_reader.read(file_paths, usecols = self.tp_template_cols, all_tabs = True)
+        except PermissionError as e:
+            print(f'error: {os.path.basename(e.filename or "")} is open, please close and try again.')
+            return Status.FAILED
+        for file_path, tab, df in tabs:
+            file = os.path.basename(file_path)
             try:
-                df_all = pd.read_excel(file_path, sheet_name = None, dtype = str)
-            except PermissionError as e:
-                print(f'error: {file} is open, please close and try again.')
+                df = df[self.tp_template_cols].copy()
+                assert(all(df.columns == self.tp_template_cols))
+            except (KeyError, ValueError) as e:
+                print(f'error: {file}_{tab} does not have the correct columns, please check and use template and try again.')
                 return Status.FAILED
-            for tab, df in df_all.items():
-                try:
-                    df = df[['Mfg Part Num', 
-                             'Vendor Part Num', 
-                             'Buyer Part Num', 
-                             'Description', 
-                             'Contract Price', 
-                             'UOM', 
-                             'QOE', 
-                             'Effective Date', 
-                             'Expiration Date']].copy()
-                    assert(all(df.columns == ['Mfg Part Num',
-                                            'Vendor Part Num', 
-                                            'Buyer Part Num',
-                                            'Description',
-                                            'Contract Price',
-                                            'UOM',
-                                            'QOE',
-                                            'Effective Date',
-                                            'Expiration Date']))
-                except ValueError as e:
-                    print(f'error: {file}_{tab} does not have the correct columns, please check and use template and try again.')
-                    return Status.FAILED
-                df.loc[:, 'Contract Number'] = tab.strip()
-                df.loc[:, 'File Name'] = file
-                dfs.append(df)
+            df.loc[:, 'Contract Number'] = tab.strip()
+            df.loc[:, 'File Name'] = file
+            dfs.append(df)
        
         # formamtting
         # now everything should already get combined into one dataframe
         df_combined = pd.concat(dfs, ignore_index = True)
+        self.profiler.rows(rows_in = len(df_combined))
         df_combined.loc[:, 'MFN RF'] = df_combined['Mfg Part Num'].apply(lambda x: self.MFN_reformat(x))
         for col in ['Mfg Part Num', 'Vendor Part Num', 'UOM', 'QOE', 'Description', 'Effective Date', 'Expiration Date']:
             df_combined.loc[:, col] = df_combined[col].apply(lambda x: np.nan 
@@ -283,8 +626,7 @@ class FileProcessor:
         df_combined.loc[:, 'Contract Price'] = df_combined['Contract Price'].apply(lambda x: np.nan
                                                                                    if (x == '' or pd.isnull(x))
                                                                                    else float(x.replace('$', '').replace(',','')))
-        df_combined.loc[:, 'UOM STD'] = df_combined['UOM'].apply(lambda x: np.nan if (x == '' or pd.isnull(x))
-                                                             else self.UOM_helper(x))
+        df_combined.loc[:, 'UOM STD'] = self.UOM_helper_series(df_combined['UOM'])
         df_combined.loc[:, 'Buyer Part Num'] = df_combined['Buyer Part Num'].fillna('').str.strip()
         df_combined.loc[:, 'seq'] = df_combined.groupby(['Contract Number']).cumcount('Contract Number') + 1
         
@@ -378,10 +720,13 @@ class FileProcessor:
             print("Old input file(s) are archived under 'processed' folder")
             
             # output the pre_checked file and name it as TP_INPUT_prechecked.xlsx
-            all_items.to_excel(os.path.join(self.tp_file_path, 
-                              f'TP_INPUT_prechecked.xlsx'), 
-                              index = False)
+            with self.profiler.stage('excel write'):
+                all_items.to_excel(os.path.join(self.tp_file_path, 
+                                  f'TP_INPUT_prechecked.xlsx'), 
+                                  index = False)
             print("All items to pre-process are saved as 'TP_INPUT_prechcked.xlsx' in the 'to_process' folder for further processing")
+            # the TP input just changed, standardize it again on next read
+            self.tp_std = None
             return Status.SUCCESS
         else:
             # output the pre_checked df_combined to temp folder, directly mark problems on the combined file
@@ -400,15 +745,95 @@ class FileProcessor:
         
         return Status.FAILED
     
+    def MFN_reformat_series(self, MFN: pd.Series):
+        """
+        Vectorized version of MFN_reformat over a whole column, non-string cells are mapped to ''
+        """
+        try:
+            MFN_RF = MFN.str.replace('-', '', regex = False).str.strip()
+        except AttributeError:
+            # no string in the column at all
+            return pd.Series('', index = MFN.index, dtype = object)
+        is_digit = MFN_RF.str.isdigit().fillna(False).astype(bool)
+        is_ascii_digit = MFN_RF.str.fullmatch('[0-9]+').fillna(False).astype(bool)
+        # int() on a plain digit string only drops the leading zeros
+        MFN_RF = MFN_RF.where(~is_ascii_digit, MFN_RF.str.lstrip('0').replace('', '0'))
+        # other unicode digits are rare, let python int() deal with them exactly as MFN_reformat does
+        other_digit = is_digit & ~is_ascii_digit
+        if other_digit.any():
+            MFN_RF.loc[other_digit] = MFN_RF[other_digit].apply(lambda x: str(int(x)))
+        return MFN_RF.fillna('')
+
+    def strip_series(self, values: pd.Series):
+        """
+        Strip the string cells of a column, anything else is kept as it is.
+        Export columns repeat the same few values a lot, so we strip the distinct values once
+        and broadcast them back through the factorized codes.
+        """
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            # already factorized by the reader
+            codes, uniques = values.cat.codes.to_numpy(), values.cat.categories
+        else:
+            codes, uniques = pd.factorize(values)
+        uniques = pd.Series(uniques, dtype = object)
+        try:
+            stripped = uniques.str.strip()
+        except AttributeError:
+            # no string in the column at all
+            return values.astype(object) if isinstance(values.dtype, pd.CategoricalDtype) else values
+        uniques = stripped.where(stripped.notna(), uniques).to_numpy(dtype = object)
+        result = values.to_numpy(dtype = object, copy = True)
+        has_value = codes >= 0
+        result[has_value] = uniques[codes[has_value]]
+        return pd.Series(result, index = values.index, dtype = object)
+
+    def ea_cost_diff_series(self,
+                            dup_found: pd.DataFrame):
+        """
+        Each cost ratio (UnitCost_x/QOE_x)/(UnitCost_y/QOE_y) of the joined lines, -1 when a QOE is 0
+        or the search set each cost is 0 (a search set QOE of 0 used to stop the run with a
+        ZeroDivisionError), NaN when a price or QOE is missing
+        """
+        cost_x, qoe_x = dup_found['UnitCost_x'].to_numpy(dtype = float), dup_found['QOE_x'].to_numpy(dtype = float)
+        cost_y, qoe_y = dup_found['UnitCost_y'].to_numpy(dtype = float), dup_found['QOE_y'].to_numpy(dtype = float)
+        with np.errstate(divide = 'ignore', invalid = 'ignore'):
+            each_y = cost_y / qoe_y
+            diff = (cost_x / qoe_x) / each_y
+        valid = (qoe_x != 0) & (qoe_y != 0) & (each_y != 0)
+        return pd.Series(np.where(valid, diff, -1.0), index = dup_found.index)
+
+    def round_series(self,
+                     values: pd.Series,
+                     digits: int = 2):
+        """
+        round(float(x), digits) over a whole column, NaN stays NaN.
+        np.round scales by 10**digits before rounding, so a value sitting on a half (2.675 is
+        2.67499999... in binary) can land on the other side, those few go through python round
+        """
+        index, values = values.index, values.astype(float).to_numpy()
+        with np.errstate(over = 'ignore', invalid = 'ignore'):
+            rounded = np.round(values, digits)
+            scaled = values * 10**digits
+            fraction = np.abs(scaled - np.floor(scaled) - 0.5)
+        exact = (fraction < 1e-6) | (np.abs(scaled) >= 1e9)
+        exact &= np.isfinite(values)
+        rounded[exact] = [round(value, digits) for value in values[exact].tolist()]
+        return pd.Series(rounded, index = index)
+
+    @profiled_stage('standardize_helper')
     def standardize_helper(self, 
                            std_df: pd.DataFrame):
         """
         Standardize the std_df by stripping, type-changing, and filing missing values
         """
-        # run stripping
+        self.profiler.rows(rows_in = len(std_df))
+        # run stripping, only string cells are touched
         for col in std_df.columns:
-            std_df.loc[:, col] = std_df[col].apply(lambda x: x.strip() if isinstance(x, str) else x)
-            std_df.loc[:, col] = std_df[col].apply(lambda x: '' if (isinstance(x, str) and pd.isnull(x)) else x)
+            if std_df[col].dtype == object:
+                std_df.loc[:, col] = self.strip_series(std_df[col])
+            elif isinstance(std_df[col].dtype, pd.CategoricalDtype):
+                # categorical columns from the Infor reader come back as plain object columns
+                std_df[col] = self.strip_series(std_df[col])
         # take care of nan values
         std_df.loc[:, 'OnHold'] = std_df['OnHold'].fillna('No')
         std_df.loc[:, 'ActiveLine'] = std_df['ActiveLine'].fillna('Yes')
@@ -421,72 +846,313 @@ class FileProcessor:
         std_df.loc[:, 'IN'] = std_df['IN'].fillna('')
         std_df.loc[:, 'VN'] = std_df['VN'].fillna(std_df['MFN'])
         # take care of column type
+        # astype(float) goes through python float() per cell in C, so results are exactly the ones
+        # float(str(x)) gives (pd.to_numeric uses its own parser and can be off by one ulp)
         for col in ['UnitCost', 'QOE']:
-            std_df.loc[:, col] = std_df[col].apply(lambda x: float(str(x).replace('$','').replace(',','')))
+            values = std_df[col]
+            values = values.where(values.notna(), 'nan').astype(str)
+            std_df.loc[:, col] = values.str.replace('$', '', regex = False).\
+                                        str.replace(',', '', regex = False).astype(float)
         for col in ['Effective Date', 'Expiration Date']:
-            std_df.loc[:, col] = pd.to_datetime(std_df[col], errors = 'coerce')
-            std_df.loc[:, col] = std_df[col].apply(lambda x: x.strftime('%Y-%m-%d') if not pd.isnull(x) else '1900-01-01')
+            dates = pd.to_datetime(std_df[col], errors = 'coerce')
+            std_df.loc[:, col] = dates.dt.strftime('%Y-%m-%d').fillna('1900-01-01')
         std_df.loc[:, 'Contract Line'] = std_df['Contract Line'].astype(str)
         # make upper case for all contract number
-        std_df.loc[:, 'Contract Number'] = std_df['Contract Number'].apply(lambda x: str(x).upper() if not pd.isnull(x) else '')
+        std_df.loc[:, 'Contract Number'] = std_df['Contract Number'].fillna('').astype(str).str.upper()
         # add reduced manufacturer number
-        std_df.loc[:, 'MFN RF'] = std_df['MFN'].apply(lambda x: self.MFN_reformat(x) if isinstance(x, str) else '')
+        std_df.loc[:, 'MFN RF'] = self.MFN_reformat_series(std_df['MFN'])
         # add countS
         std_df.loc[:, 'count'] = 1
-        # compute expiration flag
-        std_df.loc[:, 'ExpiredFlag'] = std_df['Expiration Date'].apply(lambda x: 'Expired' if x < self.today
-                                                                       else 'Non Expired')
-        # compute overall active rank (1 as active overall, 2 hit some type of deactivation flag)
-        ind_active = \
-        std_df[(std_df['OnHold'] == 'No') &
-                (std_df['ActiveLine'] == 'Yes') &
-                (std_df['ContractLineState'] == 'Active') &
-                (std_df['Contract.ContractStatus'] == 'Active') &
-                (std_df['ExpiredFlag'] == 'Non Expired')].index
-        std_df.loc[ind_active, 'Active Rank'] = '1'
-        std_df.loc[:, 'Active Rank'] = std_df['Active Rank'].fillna('2')
+        std_df = self.flag_helper(std_df)
                 
         return std_df
 
+    def flag_helper(self,
+                    std_df: pd.DataFrame):
+        """
+        Compute the flags that depend on today's date (ExpiredFlag and Active Rank), kept apart from
+        standardize_helper so frames loaded from the on-disk cache can be re-flagged for the current day
+        """
+        # compute expiration flag (dates are 'YYYY-MM-DD' strings, so string order is date order)
+        expired = (std_df['Expiration Date'] < self.today).to_numpy()
+        std_df.loc[:, 'ExpiredFlag'] = pd.Series(np.where(expired, 'Expired', 'Non Expired'),
+                                                 index = std_df.index, dtype = object)
+        # compute overall active rank (1 as active overall, 2 hit some type of deactivation flag)
+        if 'Active Rank' in std_df.columns:
+            std_df = std_df.drop(columns = ['Active Rank'])
+        is_active = ((std_df['OnHold'] == 'No') &
+                     (std_df['ActiveLine'] == 'Yes') &
+                     (std_df['ContractLineState'] == 'Active') &
+                     (std_df['Contract.ContractStatus'] == 'Active') &
+                     (std_df['ExpiredFlag'] == 'Non Expired')).to_numpy()
+        std_df.loc[:, 'Active Rank'] = pd.Series(np.where(is_active, '1', '2'),
+                                                 index = std_df.index, dtype = object)
+
+        return std_df
+
+    def standardize_cached(self,
+                           target_file: StandardizeTarget):
+        """
+        Standardize Infor or Import files through the on-disk cache under SHARED_DATA/cache.
+        The cache is rebuilt once whenever a fresh ContractLine/ContractLineImport download shows up,
+        every later run (in any process) loads the standardized frame straight from disk.
+        """
+        source_files = {StandardizeTarget.INFOR: self.infor_contract_line_file_name,
+                        StandardizeTarget.IMPORT: self.infor_contract_line_import_file_name}
+        if target_file not in source_files:
+            return self.standardize(target_file)
+        source_path = os.path.join(self.shared_file_path, source_files[target_file])
+        if not os.path.exists(source_path):
+            # let standardize report the missing file the usual way
+            return self.standardize(target_file)
+
+        cache_name = os.path.splitext(source_files[target_file])[0]
+        std_df = self.data_cache.load(cache_name, source_path)
+        if std_df is not None:
+            print(f"{target_file} files loaded from standardized cache ({len(std_df)} records)")
+            return self.flag_helper(std_df)
+
+        print(f"standardizing {target_file} files ......")
+        line_index = self.data_cache.line_hashes(source_path)
+        delta = self.standardize_delta(target_file, cache_name, source_path, line_index)
+        if delta is not None:
+            std_df, rows = delta
+        else:
+            raw_std = self.read_contract_lines(target_file)
+            if not isinstance(raw_std, pd.DataFrame):
+                return raw_std
+            keys = self.contract_line_keys(raw_std)
+            prefix = self.seq_prefix[target_file]
+            raw_std.loc[:, 'seq'] = [prefix + str(i) for i in range(len(raw_std))]
+            std_df = self.standardize_helper(raw_std)
+            rows = None
+            if line_index is not None and len(line_index[1]) == len(std_df):
+                rows = pd.DataFrame({'line_hash': line_index[1], 'key': keys})
+        print(f'{target_file} files standardized successfully')
+        self.data_cache.save(cache_name, source_path, std_df, rows = rows,
+                             extra = {'source_header': line_index[0] if line_index is not None else None})
+        return std_df
+
+    def part_number_index(self,
+                          target_file: StandardizeTarget):
+        """
+        PartNumberIndex over infor_std / import_std. Saved next to the standardized cache and tagged with
+        the cache fingerprint, so it is built once after every data refresh and loaded afterwards.
+        """
+        std_df = self.lazy_standardize(target_file)
+        if not isinstance(std_df, pd.DataFrame):
+            return None
+        known = FileProcessor._part_number_index.get(target_file)
+        if known is not None and known[0] is std_df:
+            return known[1]
+
+        source_files = {StandardizeTarget.INFOR: self.infor_contract_line_file_name,
+                        StandardizeTarget.IMPORT: self.infor_contract_line_import_file_name}
+        cache_name = os.path.splitext(source_files[target_file])[0]
+        manifest = self.data_cache.read_manifest(cache_name)
+        fingerprint = None
+        index_path = os.path.join(self.data_cache.cache_folder, f'{cache_name}.pnidx.npz')
+        if manifest is not None and manifest.get('rows') == len(std_df):
+            fingerprint = f"{manifest['schema_version']}:{manifest['source']['sha256']}:{manifest['rows']}"
+            index = PartNumberIndex.load(index_path, fingerprint)
+        else:
+            index = None
+        if index is None:
+            print(f"building {target_file} part number index ......")
+            index = PartNumberIndex.build(std_df, fingerprint = fingerprint)
+            if fingerprint is not None:
+                index.save(index_path)
+        FileProcessor._part_number_index[target_file] = (std_df, index)
+        return index
+
+    def get_stacked_index(self):
+        """
+        In memory PartNumberIndex over stacked_std, rebuilt whenever stacked_std is replaced
+        """
+        if self.stacked_index is None or self.stacked_index[0] is not self.stacked_std:
+            self.stacked_index = (self.stacked_std, PartNumberIndex.build(self.stacked_std, fields = ['MFN', 'MFN RF']))
+        return self.stacked_index[1]
+
+    def contract_line_keys(self,
+                           raw_std: pd.DataFrame):
+        """
+        Contract Number + Contract Line of every raw export line, identifies a line across exports
+        """
+        keys = raw_std['Contract Number'].fillna('').astype(str) + '|' + raw_std['Contract Line'].fillna('').astype(str)
+        return keys.to_numpy(dtype = object)
+
+    def standardize_delta(self,
+                          target_file: StandardizeTarget,
+                          cache_name: str,
+                          source_path: str,
+                          line_index: tuple):
+        """
+        Apply a new Infor export to the previously standardized snapshot instead of a full rebuild.
+        Lines of the export are compared to the snapshot by the hash of their raw text, unchanged lines
+        are taken from the snapshot and only added and changed lines are parsed and standardized.
+        Lines keep their seq across exports (matched on Contract Number + Contract Line), added lines
+        are numbered after the highest seq so far.
+        Returns (frame, row index), or None when a full rebuild is needed (no snapshot, header changed,
+        duplicated lines or keys, too many changes).
+        """
+        if line_index is None:
+            return None
+        snapshot = self.data_cache.load_snapshot(cache_name)
+        if snapshot is None:
+            return None
+        old_std, old_rows, manifest = snapshot
+        header_digest, line_hashes = line_index
+        if manifest.get('source_header') != header_digest:
+            return None
+        old_hashes = pd.Index(old_rows['line_hash'].to_numpy())
+        if not old_hashes.is_unique or pd.Index(line_hashes).has_duplicates:
+            return None
+
+        old_pos = old_hashes.get_indexer(line_hashes)
+        unchanged = old_pos >= 0
+        changed = np.flatnonzero(~unchanged)
+        if len(changed) > self.delta_rebuild_ratio * len(line_hashes):
+            return None
+
+        keys = np.empty(len(line_hashes), dtype = object)
+        keys[unchanged] = old_rows['key'].to_numpy(dtype = object)[old_pos[unchanged]]
+        seq = np.empty(len(line_hashes), dtype = object)
+        seq[unchanged] = old_std['seq'].to_numpy(dtype = object)[old_pos[unchanged]]
+        n_added = 0
+        new_std = None
+        if len(changed) > 0:
+            new_std = self.read_contract_lines(target_file, csv_source = self.data_cache.read_lines(source_path, changed))
+            if not isinstance(new_std, pd.DataFrame) or len(new_std) != len(changed):
+                return None
+            keys[changed] = self.contract_line_keys(new_std)
+            if pd.Index(keys).has_duplicates:
+                print(f"{target_file} export has duplicated Contract Number + Contract Line keys, full rebuild ......")
+                return None
+            # a changed line keeps the seq of its previous version
+            prev_pos = pd.Index(old_rows['key'].to_numpy(dtype = object)).get_indexer(keys[changed])
+            has_prev = prev_pos >= 0
+            prefix = self.seq_prefix[target_file]
+            old_seq = old_std['seq'].to_numpy(dtype = object)
+            next_seq = int(pd.Series(old_seq, dtype = object).str[len(prefix):].astype(int).max()) + 1 if len(old_seq) > 0 else 0
+            n_added = int((~has_prev).sum())
+            changed_seq = np.empty(len(changed), dtype = object)
+            changed_seq[has_prev] = old_seq[prev_pos[has_prev]]
+            changed_seq[~has_prev] = [prefix + str(next_seq + i) for i in range(n_added)]
+            seq[changed] = changed_seq
+            new_std.loc[:, 'seq'] = changed_seq
+            new_std = self.standardize_helper(new_std)
+            if list(new_std.columns) != list(old_std.columns):
+                return None
+
+        # one take over snapshot + new rows puts every line back in export order
+        take = np.empty(len(line_hashes), dtype = np.int64)
+        take[unchanged] = old_pos[unchanged]
+        take[changed] = len(old_std) + np.arange(len(changed))
+        if new_std is not None:
+            std_df = pd.concat([old_std, new_std], ignore_index = True).take(take).reset_index(drop = True)
+        else:
+            std_df = old_std.take(take).reset_index(drop = True)
+        # every snapshot line not carried over as unchanged or as the previous version of a changed line
+        n_removed = len(old_std) - int(unchanged.sum()) - (len(changed) - n_added)
+        print(f"{target_file} delta applied: {n_added} added, {len(changed) - n_added} changed, "
+              f"{n_removed} removed, {int(unchanged.sum())} unchanged lines")
+        rows = pd.DataFrame({'line_hash': line_hashes, 'key': keys})
+        return self.flag_helper(std_df), rows
+
     def split_manufacturerinformation(self, 
                                       import_df: pd.DataFrame):
         """
         Split ManufacturerInformation column into Manufacturer and ManufacturerNumber
         """
-        import_df.loc[:, 'Manufacturer'] = import_df['ManufacturerInformation'].apply(lambda x: str(x)[:4])
-        import_df.loc[:, 'ManufacturerNumber'] = import_df['ManufacturerInformation'].apply(lambda x: str(x)[4:])
+        # astype(str) turns missing values into 'nan', same as str(x) cell by cell
+        information = import_df['ManufacturerInformation'].astype(str)
+        import_df.loc[:, 'Manufacturer'] = information.str[:4]
+        import_df.loc[:, 'ManufacturerNumber'] = information.str[4:]
         return import_df
     
-    def standardize(self, 
-                    target_file: StandardizeTarget,
-                    vendor_name: str = 'TBD'):
+    @profiled_stage('read_csv')
+    def read_csv_projected(self,
+                           csv_source,
+                           usecols: list):
         """
-        Standardize all files for a specific input type, we offer the following options:
-        1. Infor: standardize Infor files
-        2. Import: standardize Import files
-        3. CCX: standardize CCX files
-        4. TP: standardize files to pre-process
+        read_csv of only the columns we use, all as strings (dtype = str) except the low cardinality
+        ones in category_cols which are parsed as categoricals, so memory follows the projected
+        columns and not the width of the export. With csv_chunksize set the file is parsed chunk by
+        chunk and every chunk is released as soon as it is taken apart: text columns keep their
+        arrays (the strings themselves are not copied again when the arrays are joined), categorical
+        ones their codes re-coded against the categories seen so far (as union_categoricals would).
+        """
+        dtype = {col: 'category' if col in self.category_cols else str for col in usecols}
+        if self.csv_chunksize is None:
+            return pd.read_csv(csv_source, usecols = usecols, dtype = dtype)
+        parts, categories, columns = {}, {}, None
+        for chunk in pd.read_csv(csv_source, usecols = usecols, dtype = dtype, chunksize = self.csv_chunksize):
+            if columns is None:
+                columns = list(chunk.columns)
+                parts = {col: [] for col in columns}
+            for col in columns:
+                values = chunk[col]
+                if not isinstance(values.dtype, pd.CategoricalDtype):
+                    parts[col].append(values.to_numpy())
+                    continue
+                chunk_categories = values.cat.categories
+                known = categories.get(col)
+                known = chunk_categories if known is None else known.append(chunk_categories[~chunk_categories.isin(known)])
+                categories[col] = known
+                # missing values (code -1) stay missing
+                recode = np.append(known.get_indexer(chunk_categories), -1)
+                parts[col].append(recode[values.cat.codes.to_numpy()])
+            del chunk
+        if columns is None:
+            return pd.read_csv(csv_source, usecols = usecols, dtype = dtype)
+        df = pd.DataFrame(index = pd.RangeIndex(sum(len(part) for part in parts[columns[0]])))
+        for col in columns:
+            values = np.concatenate(parts.pop(col))
+            df[col] = pd.Categorical.from_codes(values, categories[col]) if col in categories else values
+        return df
+
+    def fillna_series(self,
+                      values: pd.Series,
+                      fill: str):
+        """
+        fillna that also works on categorical columns (the fill value is added as a category first)
+        """
+        if isinstance(values.dtype, pd.CategoricalDtype) and fill not in values.cat.categories:
+            values = values.cat.add_categories([fill])
+        return values.fillna(fill)
+
+    def read_contract_lines(self,
+                            target_file: StandardizeTarget,
+                            csv_source = None):
+        """
+        Read the Infor ContractLine or ContractLineImport export and project it onto the standard
+        columns (plus Source System), values are still the raw strings, standardize_helper not applied.
+        csv_source (optional) reads part of the export instead (see DataCache.read_lines)
         """
-        std_cols = ['Contract Number', 'MFN', 'VN', 'IN', 'Description', 'UnitCost', 'UOM', 'QOE',
-            'Effective Date', 'Expiration Date', 'Contract Line', 'Manufacturer', 'Vendor',
-            'Contract', 'ItemType', 'OnHold', 'ActiveLine', 'ContractLineState', 'Contract.ContractStatus',
-            'ContractImport', 'FileName']
-        
-        
         if target_file == StandardizeTarget.INFOR:
-            print("standardizing Infor files ......")
             file_path = self.shared_file_path
             file_name = self.infor_contract_line_file_name
             if not os.path.exists(file_path):
                 print(f"Folder '{file_path}' does not exist, please check the folder path")
                 return Status.FAILED
+            infor_cols_to_read = ['Contract.WorkingContractID',
+                                  'ManufacturerNumber', 'VendorItem', 'ItemNumber',
+                                  'ItemDescription', 'BaseCost', 'UOM', 'DerivedUOMConversion',
+                                  'EffectiveDate', 'ExpirationDate', 'ContractLine',
+                                  'Manufacturer', 'Vendor',
+                                  'Contract', 'ItemType', 'OnHold', 'ActiveLine', 
+                                  'ContractLineState', 'Contract.ContractStatus']
             try:
-                infor_df = pd.read_csv(os.path.join(file_path, file_name), dtype = str)
+                infor_df = self.read_csv_projected(os.path.join(file_path, file_name) if csv_source is None else csv_source,
+                                                   infor_cols_to_read)
             except FileNotFoundError as e:
                 print(f"File '{file_name}' does not exist, check infor contract line download and try again")
                 return Status.FAILED
+            except ValueError as e:
+                print(f"File '{file_name}' is missing expected column(s) ({e}), check infor contract line download and try again")
+                return Status.FAILED
             for col in ['Vendor','Manufacturer', 'ManufacturerNumber', 'VendorItem']:
-                infor_df.loc[:, col] = infor_df[col].fillna('unknown')
+                infor_df[col] = self.fillna_series(infor_df[col], 'unknown')
             for col in ['Contract Import', 'File Name']:
                 infor_df.loc[:, col] = np.nan
             infor_cols_to_take = ['Contract.WorkingContractID',
@@ -498,28 +1164,33 @@ class FileProcessor:
                                   'ContractLineState', 'Contract.ContractStatus',
                                   'Contract Import', 'File Name']
             infor_std = infor_df[infor_cols_to_take].copy()
-            infor_std.columns = std_cols
+            infor_std.columns = self.std_cols
             infor_std.loc[:, 'Source System'] = 'Infor'
-            infor_std.loc[:, 'seq'] = ['i' + str(i) for i in range(len(infor_std))]
-            infor_std = self.standardize_helper(infor_std)
-            print('Infor files standardized successfully')
             return infor_std
 
         elif target_file == StandardizeTarget.IMPORT:
-            print("standardizing Import files ......")
             file_path = self.shared_file_path
             file_name = self.infor_contract_line_import_file_name
             if not os.path.exists(file_path):
                 print(f"Folder '{file_path}' does not exist, please check the folder path")
                 return Status.FAILED
+            import_cols_to_read = ['ContractImport.WorkingContractID',
+                                   'ManufacturerInformation', 'VendorItem', 'ItemNumber',
+                                   'ItemDescription', 'BaseCost', 'UOM', 'UOMConversion',
+                                   'EffectiveDate', 'ExpirationDate', 'ContractLineImport',
+                                   'ContractImport.Vendor', 'ContractRel.Contract', 'ContractImport']
             try:
-                import_df = pd.read_csv(os.path.join(file_path, file_name), dtype = str)
+                import_df = self.read_csv_projected(os.path.join(file_path, file_name) if csv_source is None else csv_source,
+                                                    import_cols_to_read)
             except FileNotFoundError as e:
                 print(f"File '{file_name}' does not exist, check infor contract line import download and try again")
                 return Status.FAILED
+            except ValueError as e:
+                print(f"File '{file_name}' is missing expected column(s) ({e}), check infor contract line import download and try again")
+                return Status.FAILED
             import_df = self.split_manufacturerinformation(import_df)
             for col in ['ContractImport.Vendor', 'VendorItem']:
-                import_df.loc[:, col] = import_df[col].fillna('unknown')
+                import_df[col] = self.fillna_series(import_df[col], 'unknown')
             for col in ['ItemType', 'OnHold', 'ActiveLine', 'ContractLineState', 'Contract.ContractStatus',
                         'File Name']:
                 import_df.loc[:, col] = np.nan
@@ -532,8 +1203,40 @@ class FileProcessor:
                                    'ContractLineState', 'Contract.ContractStatus',
                                    'ContractImport', 'File Name']
             import_std = import_df[import_cols_to_take].copy()
-            import_std.columns = std_cols
+            import_std.columns = self.std_cols
             import_std.loc[:, 'Source System'] = 'Import'
+            return import_std
+
+        print("only Infor and Import contract lines can be read here")
+        return Status.FAILED
+
+    def standardize(self, 
+                    target_file: StandardizeTarget,
+                    vendor_name: str = 'TBD'):
+        """
+        Standardize all files for a specific input type, we offer the following options:
+        1. Infor: standardize Infor files
+        2. Import: standardize Import files
+        3. CCX: standardize CCX files
+        4. TP: standardize files to pre-process
+        """
+        std_cols = self.std_cols
+        
+        if target_file == StandardizeTarget.INFOR:
+            print("standardizing Infor files ......")
+            infor_std = self.read_contract_lines(target_file)
+            if not isinstance(infor_std, pd.DataFrame):
+                return infor_std
+            infor_std.loc[:, 'seq'] = ['i' + str(i) for i in range(len(infor_std))]
+            infor_std = self.standardize_helper(infor_std)
+            print('Infor files standardized successfully')
+            return infor_std
+
+        elif target_file == StandardizeTarget.IMPORT:
+            print("standardizing Import files ......")
+            import_std = self.read_contract_lines(target_file)
+            if not isinstance(import_std, pd.DataFrame):
+                return import_std
             import_std.loc[:, 'seq'] = ['imp' + str(i) for i in range(len(import_std))]
             import_std = self.standardize_helper(import_std)
             print('Import files standardized successfully')
@@ -546,17 +1249,21 @@ class FileProcessor:
             if not os.path.exists(file_path):
                 print(f"Folder '{file_path}' does not exist, please check the folder path")
                 return Status.FAILED
+            file_paths = []
             for file in os.listdir(file_path):
                 if not file.endswith('.xlsx'):
                     print(f'ignoring {file} because it is not a .xlsx file')
                     continue
-                try:
-                    ccx_df = pd.read_excel(os.path.join(file_path, file), dtype = str)
-                    ccx_df.loc[:, 'ContractLine'] = [str(i+1) for i in range(len(ccx_df))]
-                    ccx_dfs.append(ccx_df)
-                except FileNotFoundError as e:
-                    print(f"File '{file}' does not exist, check CCX contract download and try again")
-                    return Status.FAILED
+                file_paths.append(os.path.join(file_path, file))
+            try:
+                with self.profiler.stage('read_excel'):
+                    tabs = self.excel_reader.read(file_paths, usecols = self.ccx_export_cols)
+            except FileNotFoundError as e:
+                print(f"File '{os.path.basename(e.filename or '')}' does not exist, check CCX contract download and try again")
+                return Status.FAILED
+            for _, _, ccx_df in tabs:
+                ccx_df.loc[:, 'ContractLine'] = [str(i+1) for i in range(len(ccx_df))]
+                ccx_dfs.append(ccx_df)
             ccx_df = pd.concat(ccx_dfs, ignore_index = True)
             for cols in ['Contract', 'ItemType', 'OnHold', 'ActiveLine', 
                          'ContractLineState', 'Contract.ContractStatus','ContractImport',
@@ -586,7 +1293,8 @@ class FileProcessor:
                 print(f"Folder '{file_path}' does not exist, please check the folder path")
                 return Status.FAILED
             try:
-                tp_df = pd.read_excel(os.path.join(file_path, file_name), dtype = str)
+                with self.profiler.stage('read_excel'):
+                    tp_df = pd.read_excel(os.path.join(file_path, file_name), dtype = str)
             except FileNotFoundError as e:
                 print(f"File '{file_name}' does not exist, check the output from pre_check process and try again")
                 return Status.FAILED
@@ -619,31 +1327,23 @@ class FileProcessor:
     
     def manufacturer_map(self, mfn: str):
         """
-        Import the manufacturer map file and return a DataFrame containing manufacturer and manufacturer name
+        Look up the manufacturer name of a manufacturer (map is loaded once by the reference data registry)
         """
-        mfn_map_df = pd.read_csv(os.path.join(self.shared_file_path, self.manufacturer_map_file),
-                                 dtype = str)
-        mfn_map_df = mfn_map_df[['Manufacturer', 'Description']].copy()
-        mfn_map = mfn_map_df.set_index('Manufacturer')['Description'].to_dict()
+        mfn_map = self.reference_data.manufacturer_map()
         
         return mfn_map.get(mfn, 'TBD')
     
     def vendor_map(self, vendor: str):
         """
-        Import the vendor map file and return a DataFrame containing vendor and vendor name
+        Look up [vendor name, representative text] of a vendor (map is loaded once by the reference data registry)
+        the key is "Vendor", values are ["Vendor.VendorName", "Representative Text"]
         """
-        vendor_map_df = pd.read_csv(os.path.join(self.shared_file_path, self.vendor_map_file),
-                                      dtype = str)
-        # change the import to dictionary so that the key is "Vendor", values are ["Vendor.VendorName", "Representative Text"]
-        vendor_map_df = vendor_map_df[['Vendor', 'Vendor.VendorName', 'RepresentativeText']].copy()
-        vendor_map_df.loc[:, 'Vendor'] = vendor_map_df['Vendor'].fillna('unknown_vendorID')
-        vendor_map = {k: [v, r] for k, v, r in zip(vendor_map_df['Vendor'], 
-                                                   vendor_map_df['Vendor.VendorName'],
-                                                   vendor_map_df['RepresentativeText'])}
+        vendor_map = self.reference_data.vendor_map()
         
         return vendor_map.get(vendor, ['TBD', 'TBD'])
     
-    def scoping(self):
+    @profiled_stage()
+    def scoping(self, prefetch: bool = False):
         """
         Define the searching space for downstream contract line comparesions.
         Steps:
@@ -660,36 +1360,42 @@ class FileProcessor:
         'ContractImport', 'FileName', 'ExpirationFlag', 'Active Rank']
 
         the scoping method will always take the reduced format of manufacturer as the join key
+        with prefetch on, the Import/CCX standardization, the model load and the encoding of the likely
+        compared descriptions start in the background while the scoping file is reviewed
         """
-        if self.tp_std is None:
-            tp_std = self.standardize(StandardizeTarget.TP)
-        else:
-            tp_std = self.tp_std
-        
-        if self.infor_std is None:
-            infor_std = self.standardize(StandardizeTarget.INFOR)
-        else:
-            infor_std = self.infor_std
+        tp_std = self.tp_std
+        infor_std = self.infor_std
+        if not isinstance(tp_std, pd.DataFrame) or not isinstance(infor_std, pd.DataFrame):
+            return Status.FAILED
         
         tp_mini = tp_std[['Contract Number', 'seq', 'MFN', 'VN', 'Description', 'UnitCost', 'MFN RF']].copy()
         mfn_to_check = set(tp_mini['MFN'])
         mfn_rf_to_check = set(tp_mini['MFN RF'])
         infor_cols_to_take = ['Description', 'UnitCost', 'MFN', 'MFN RF', 'VN', 'Contract Number',
                               'Manufacturer', 'Vendor']
-        infor_interferring = infor_std[(infor_std['MFN'].isin(mfn_to_check) | 
-                                       infor_std['MFN RF'].isin(mfn_rf_to_check) |
-                                       infor_std['VN'].isin(mfn_to_check) |
-                                       infor_std['VN'].isin(mfn_rf_to_check)) & 
-                                       (infor_std['Active Rank'] == '1')][infor_cols_to_take].copy()
+        # Infor lines sharing a part number with TP, looked up in the part number index
+        index = self.part_number_index(StandardizeTarget.INFOR)
+        candidate_rows = index.lookup_any(infor_std, [('MFN', mfn_to_check),
+                                                      ('MFN RF', mfn_rf_to_check),
+                                                      ('VN', mfn_to_check | mfn_rf_to_check)])
+        candidates = infor_std.iloc[candidate_rows]
+        infor_interferring = candidates[candidates['Active Rank'] == '1'][infor_cols_to_take].copy()
         
-        infor_interferring.loc[:, 'VendorName'] = infor_interferring['Vendor'].apply(lambda x: self.vendor_map(x)[0])
-        infor_interferring.loc[:, 'Supplier'] = infor_interferring['Vendor'].apply(lambda x: self.vendor_map(x)[-1])
-        infor_interferring.loc[:, 'ManufacturerName'] = infor_interferring['Manufacturer'].apply(lambda x: self.manufacturer_map(x))
+        # bulk lookups, every reference file is read once
+        reference_data = self.reference_data
+        infor_interferring.loc[:, 'VendorName'] = reference_data.map_series(infor_interferring['Vendor'],
+                                                                            reference_data.vendor_name_map())
+        infor_interferring.loc[:, 'Supplier'] = reference_data.map_series(infor_interferring['Vendor'],
+                                                                          reference_data.supplier_map())
+        infor_interferring.loc[:, 'ManufacturerName'] = reference_data.map_series(infor_interferring['Manufacturer'],
+                                                                                  reference_data.manufacturer_map())
         tp_mini.loc[:, 'Take'] = ''
-        scoping_df = tp_mini.merge(infor_interferring,
-                                   on = ['MFN RF'], 
-                                   how = 'inner',
-                                   suffixes=('_ccx', '_infor'))
+        with self.profiler.stage('merge'):
+            scoping_df = tp_mini.merge(infor_interferring,
+                                       on = ['MFN RF'], 
+                                       how = 'inner',
+                                       suffixes=('_ccx', '_infor'))
+            self.profiler.rows(len(tp_mini) + len(infor_interferring), len(scoping_df))
         scoping_df.loc[:, 'Same MFN'] = scoping_df['MFN_ccx'] == scoping_df['MFN_infor']
         scoping_df_colarrg = ['Contract Number_ccx', 'seq',
                               'MFN_ccx', 'VN_ccx', 'Description_ccx', 'UnitCost_ccx', 
@@ -702,7 +1408,9 @@ class FileProcessor:
         scoping_df = scoping_df[scoping_df_colarrg].copy()
         scoping_df.sort_values(by = ['Supplier', 'Contract Number_infor'], inplace = True)
         
-        with pd.ExcelWriter(os.path.join(self.output_file_path,
+        self.profiler.rows(len(tp_std), len(scoping_df))
+        with self.profiler.stage('excel write'), \
+             pd.ExcelWriter(os.path.join(self.output_file_path,
                                          f'scoping_manual_review_{self.datesig}.xlsx')) as writer:
             scoping_df.to_excel(writer, sheet_name = 'ToReview', index = False)
             headers = ['Contract Number_infor', 'Supplier']
@@ -714,7 +1422,10 @@ output folder for manual review. Once reviewed, copy and paste infor contract(s)
 contain duplicates to tab 'ContractToTake', and rename the file 
 to {Fore.LIGHTGREEN_EX}'scoping_manual_reviewed.xlsx'{Style.RESET_ALL}""".replace("\n", ""))
         
-        scoping_reviewed = input("Have you reviewed the scoping file and identified the contract we want to include in subsequent steps? (Y/N)").lower()    
+        self.accept_review(f'scoping_manual_review_{self.datesig}.xlsx', 'scoping_manual_reviewed.xlsx')
+        if prefetch:
+            self.prefetch_next_steps()
+        scoping_reviewed = self.ask('scoping_reviewed', "Have you reviewed the scoping file and identified the contract we want to include in subsequent steps? (Y/N)").lower()    
         if scoping_reviewed == 'yes' or scoping_reviewed == 'y':
             try:
                 scoping_df = pd.read_excel(os.path.join(self.output_file_path, 
@@ -728,28 +1439,32 @@ to {Fore.LIGHTGREEN_EX}'scoping_manual_reviewed.xlsx'{Style.RESET_ALL}""".replac
         return Status.FAILED
     
     
-    def set_scope(self):
+    @profiled_stage()
+    def set_scope(self, search_term: str = None):
         """True function to set scope
         1. use the set_scope_helper to get and display the contract we will download from CCX
         2. if we don't like the results we could retry until we are satisfied
-        the function will eventually set the searching scope to the object"""
+        the function will eventually set the searching scope to the object
+        a search_term given up front is used for the first round without asking"""
         
-        search_scope = self.set_scope_helper()
+        search_scope = self.set_scope_helper(search_term = search_term)
         
         # if user is not satisfied with the search scope, we will retry differernt search term
         # until the re_scoping input is set to 'N'
         re_scoping = 'Y'
-        re_scoping = input("Want to try different search term(s)? (Y/N)")
+        re_scoping = self.ask('re_scoping', "Want to try different search term(s)? (Y/N)")
         while re_scoping.lower() in ['yes', 'y']:
             search_scope = self.set_scope_helper()
-            re_scoping = input("Want to try different search term(s)? (Y/N)")
+            re_scoping = self.ask('re_scoping', "Want to try different search term(s)? (Y/N)")
             if re_scoping.lower() in ['no', 'n']:
                 break
       
         if len(search_scope) > 0 and search_scope is not None:  
             self.search_scope = search_scope
-            ccx_downlaod = input("Contract(s) listed above are downloaded from CCX? (Y/N)")
+            ccx_downlaod = self.ask('ccx_downloaded', "Contract(s) listed above are downloaded from CCX? (Y/N)")
             if ccx_downlaod.lower() in ['yes', 'y']:
+                # freshly downloaded CCX contracts, standardize them again on next read
+                self.ccx_std = None
                 print(f"searching scope is set to {search_scope}")
                 return Status.SUCCESS          
         
@@ -781,14 +1496,15 @@ to {Fore.LIGHTGREEN_EX}'scoping_manual_reviewed.xlsx'{Style.RESET_ALL}""".replac
             contract_organization_df.loc[:, col] = contract_organization_df[col].fillna('')
         
         # make selections based on our search criteria
-        search_term_set_up = input(f"Default scope to current manufacturer '{self.manufacturer}'? (Y/N)")
-        if search_term_set_up.lower() == 'yes' or search_term_set_up.lower() == 'y':
-            search_term = self.manufacturer
-        elif search_term_set_up.lower() == 'no' or search_term_set_up.lower() == 'n':
-            search_term = input("Enter the manufacturer name (if more than one, using pipe '|' to separate):")
-        else:
-            print(f"invalid input. Defaulted to current manufacturer '{self.manufacturer}'.")
-            search_term = self.manufacturer
+        if search_term is None:
+            search_term_set_up = self.ask('default_search_term', f"Default scope to current manufacturer '{self.manufacturer}'? (Y/N)")
+            if search_term_set_up.lower() == 'yes' or search_term_set_up.lower() == 'y':
+                search_term = self.manufacturer
+            elif search_term_set_up.lower() == 'no' or search_term_set_up.lower() == 'n':
+                search_term = self.ask('search_term', "Enter the manufacturer name (if more than one, using pipe '|' to separate):")
+            else:
+                print(f"invalid input. Defaulted to current manufacturer '{self.manufacturer}'.")
+                search_term = self.manufacturer
 
         manufacturer_to_look = contract_organization_df['Manufacturer'].str.contains(search_term, 
                                                                                      case = False)
@@ -812,30 +1528,24 @@ to {Fore.LIGHTGREEN_EX}'scoping_manual_reviewed.xlsx'{Style.RESET_ALL}""".replac
         
         return all_contracts_to_look
     
-    def standardize_all_and_stack(self):
+    @profiled_stage()
+    def standardize_all_and_stack(self, prefetch: bool = False):
         """Standardize all four major sources of input tables
         1. to process (the user submission)
         2. Infor ContractLine daily output
         3. Infor ContratLineImport daily output
         4. CCX downloaded contract
         when all files output to temp foloder, many subsequent comparisons can be made in 
-        various flexible ways"""
-        if self.tp_std is None:
-            tp_std = self.standardize(StandardizeTarget.TP)
-        else:
-            tp_std = self.tp_std
-        if self.infor_std is None:
-            infor_std = self.standardize(StandardizeTarget.INFOR)
-        else:
-            infor_std = self.infor_std
-        if self.import_std is None:
-            import_std = self.standardize(StandardizeTarget.IMPORT)
-        else:
-            import_std = self.import_std
-        if self.ccx_std is None:
-            ccx_std = self.standardize(StandardizeTarget.CCX)
-        else:
-            ccx_std = self.ccx_std
+        various flexible ways
+        with prefetch on, the model load and the encoding of the duplication search descriptions
+        start in the background while the data dump question is open"""
+        tp_std = self.tp_std
+        infor_std = self.infor_std
+        import_std = self.import_std
+        ccx_std = self.ccx_std
+        for std_df in [tp_std, infor_std, import_std, ccx_std]:
+            if not isinstance(std_df, pd.DataFrame):
+                return Status.FAILED
         
         if self.search_scope is None:
             print("searching scope not set, please run set_scope() function first and try again")
@@ -849,110 +1559,367 @@ to {Fore.LIGHTGREEN_EX}'scoping_manual_reviewed.xlsx'{Style.RESET_ALL}""".replac
         ccx_std = ccx_std[ccx_std['Contract Number'].isin(search_scope)].copy()
 
         stacked_std = pd.concat([ccx_std, infor_std, import_std, tp_std], ignore_index = True)
-        self.stacked_std = stacked_std
-        print(f"all file sources standardized, we have {len(stacked_std)} records in total.")
-        print(stacked_std.groupby(['Source System', 'Active Rank']).size().unstack())
+        legacy_usage = stacked_std.memory_usage(index = False, deep = True)
+        self.stacked_std = self.compact_std(stacked_std)
+        del stacked_std
+        self.profiler.rows(rows_out = len(self.stacked_std))
+        print(f"all file sources standardized, we have {len(self.stacked_std)} records in total.")
+        print(self.stacked_std.groupby(['Source System', 'Active Rank'], observed = True).size().unstack())
+        self.memory_report(self.stacked_std, legacy_usage)
 
-        proof = input("do you want to create a data dump for the standardized data used in the project? (Y/N)")
+        if prefetch:
+            self.prefetch_next_steps(ccx_std)
+        proof = self.ask('data_dump', "do you want to create a data dump for the standardized data used in the project? (Y/N)")
         if proof.lower() == 'yes' or proof.lower() == 'y':
             print(f"""file sources are standardized and stacked togather, 
 a hard copy will be created and stored under {self.temp_file_path}. 
 This will take a while.""".replace("\n", ""))
-            stacked_std.to_csv(os.path.join(self.temp_file_path, 
+            self.stacked_slice().to_csv(os.path.join(self.temp_file_path, 
                                             f'stacked_std_{self.manufacturer}_{self.contract}_{self.datesig}.csv'),
                                             index = False)
         else:
             pass
         return Status.SUCCESS
     
+    def compact_std(self,
+                    std_df: pd.DataFrame):
+        """
+        Compact layout of a standardized frame (used for stacked_std):
+        - repetitive text columns become categoricals
+        - 'YYYY-MM-DD' date strings become datetime64
+        - UnitCost/QOE become float32 when every value survives the round trip, float64 otherwise
+        - seq 'i123'/'imp123'/'ccx123'/'tp123' becomes the integer 123, the prefix is given by Source System
+        expand_std turns it back into the usual layout
+        """
+        compact = std_df.copy()
+        for col in self.compact_category_cols:
+            if col in compact.columns:
+                compact[col] = compact[col].astype('category')
+        for col in ['Effective Date', 'Expiration Date']:
+            dates = pd.to_datetime(compact[col], format = '%Y-%m-%d', errors = 'coerce')
+            if dates.notna().sum() == compact[col].notna().sum():
+                compact[col] = dates
+        for col in ['UnitCost', 'QOE']:
+            values = compact[col].astype(float)
+            narrow = values.astype(np.float32)
+            # float32 keeps about 7 significant digits, only narrow when the shortest text of every
+            # float32 value reads back as exactly the original number
+            if np.array_equal(narrow.astype(str).astype(float).to_numpy(), values.to_numpy(), equal_nan = True):
+                compact[col] = narrow
+            else:
+                compact[col] = values
+        compact['count'] = compact['count'].astype(np.int8)
+        prefix = compact['Source System'].astype(object).map(self.source_seq_prefix)
+        numbers = compact['seq'].astype(str).str.extract(r'^([a-z]+)(\d+)$')
+        if numbers[0].eq(prefix).all():
+            compact['seq'] = numbers[1].astype(np.int64)
+        return compact
+
+    def expand_std(self,
+                   compact: pd.DataFrame):
+        """
+        Back from compact_std to the usual layout (object text, date strings, float64 prices,
+        prefixed seq) for the stages and reports working on it
+        """
+        std_df = compact.copy()
+        for col in std_df.columns:
+            if isinstance(std_df[col].dtype, pd.CategoricalDtype):
+                std_df[col] = std_df[col].astype(object)
+        for col in ['Effective Date', 'Expiration Date']:
+            if col in std_df.columns and pd.api.types.is_datetime64_any_dtype(std_df[col]):
+                std_df[col] = std_df[col].dt.strftime('%Y-%m-%d').astype(object)
+        for col in ['UnitCost', 'QOE']:
+            if col in std_df.columns and std_df[col].dtype == np.float32:
+                std_df[col] = std_df[col].astype(str).astype(float)
+        if 'count' in std_df.columns:
+            std_df['count'] = std_df['count'].astype(np.int64)
+        if 'seq' in std_df.columns and pd.api.types.is_integer_dtype(std_df['seq']):
+            std_df['seq'] = std_df['Source System'].map(self.source_seq_prefix) + std_df['seq'].astype(str)
+        return std_df
+
+    def stacked_slice(self,
+                      mask: pd.Series = None,
+                      columns: list = None):
+        """
+        Rows of stacked_std (all of them without a mask) in the usual layout, see compact_std.
+        With columns only those are taken (in stacked_std order)
+        """
+        compact = self.stacked_std if mask is None else self.stacked_std[mask]
+        if columns is not None:
+            compact = compact[[col for col in compact.columns if col in columns]]
+        return self.expand_std(compact)
+
+    def memory_report(self,
+                      compact: pd.DataFrame,
+                      legacy_usage: pd.Series = None):
+        """
+        Print the memory taken by stacked_std per source and per column
+        (next to what the all object layout took, when given)
+        """
+        usage = compact.memory_usage(index = False, deep = True)
+        total = usage.sum()
+        print(f"stacked_std memory: {total/2**20:,.1f} MB", end = '')
+        if legacy_usage is not None:
+            print(f" (object layout {legacy_usage.sum()/2**20:,.1f} MB)", end = '')
+        print()
+        per_source = {source: compact[compact['Source System'] == source].memory_usage(index = False, deep = True).sum()
+                      for source in compact['Source System'].cat.categories}
+        print('  per source: ' + ', '.join(f"{k} {v/2**20:,.1f} MB" for k, v in per_source.items()))
+        print(f"  {'column':<26}{'dtype':<12}{'MB':>8}" + (f"{'object MB':>11}" if legacy_usage is not None else ''))
+        for col in compact.columns:
+            line = f"  {col:<26}{str(compact[col].dtype):<12}{usage[col]/2**20:>8.2f}"
+            if legacy_usage is not None and col in legacy_usage.index:
+                line += f"{legacy_usage[col]/2**20:>11.2f}"
+            print(line)
+        return None
+
+    @profiled_stage()
     def set_model(self, model_name:str = 'all-MiniLM-L6-v2'):
-        self.model = SentenceTransformer(model_name)
+        # wait for a model load / encoding running in the background, the store then has what it encoded
+        self.prefetcher.result(f'model {model_name}')
+        self.prefetcher.result(f'encode {model_name}', stamp = self.input_stamp(StandardizeTarget.CCX))
+        # description embeddings are cached on disk per model under SHARED_DATA/cache/embeddings
+        embedding_store = EmbeddingStore(os.path.join(self.data_cache.cache_folder, 'embeddings'), model_name)
+        # the model itself (and torch) is only loaded once a description has to be encoded
+        self.embedding_engine = EmbeddingEngine(model_name, store = embedding_store)
         return Status.SUCCESS
+
+    def prefetch_next_steps(self,
+                            ccx_std: pd.DataFrame = None,
+                            model_name: str = 'all-MiniLM-L6-v2'):
+        """
+        Start in the background (see Prefetcher) what the steps after a review prompt wait for:
+        the Import and CCX standardization when not done yet, the model load and the encoding of the
+        descriptions the duplication search and the item master match will most likely compare
+        """
+        ccx_stamp = self.input_stamp(StandardizeTarget.CCX)
+        if ccx_std is None:
+            import_done = self._std.get(StandardizeTarget.IMPORT) is not None or \
+                          (self.data_caching and FileProcessor._import_std_cache is not None)
+            if not import_done:
+                self.prefetcher.submit(f'standardize {StandardizeTarget.IMPORT}', self.prefetch_standardize,
+                                       StandardizeTarget.IMPORT, stamp = self.input_stamp(StandardizeTarget.IMPORT))
+            ccx_std = self._std.get(StandardizeTarget.CCX)
+            if ccx_std is None:
+                ccx_std = self.prefetcher.submit(f'standardize {StandardizeTarget.CCX}', self.prefetch_standardize,
+                                                 StandardizeTarget.CCX, stamp = ccx_stamp)
+        self.prefetcher.submit(f'model {model_name}', self.prefetch_model, model_name)
+        self.prefetcher.submit(f'encode {model_name}', self.prefetch_encode, ccx_std, model_name, stamp = ccx_stamp)
+        return None
+
+    def prefetch_standardize(self,
+                             target_file: StandardizeTarget):
+        with self.profiler.stage(f'prefetch standardize {target_file}'):
+            std_df = self.standardize_cached(target_file)
+            self.profiler.rows(rows_out = len(std_df) if isinstance(std_df, pd.DataFrame) else None)
+        if isinstance(std_df, pd.DataFrame):
+            self.prefetcher.log(f"{target_file} files standardized in the background ({len(std_df)} records).")
+        else:
+            self.prefetcher.log(f"background standardization of the {target_file} files returned {std_df}.")
+        return std_df
+
+    def prefetch_model(self,
+                       model_name: str):
+        with self.profiler.stage('prefetch model'):
+            model = EmbeddingEngine(model_name).model
+        self.prefetcher.log(f"model '{model_name}' loaded in the background.")
+        return model
+
+    def prefetch_encode(self,
+                        ccx_std,
+                        model_name: str):
+        """
+        Encode the TP descriptions and those of the CCX and item master lines sharing a part number
+        with TP into the embedding store, the similarities computed later find them there
+        """
+        with self.profiler.stage('prefetch encode'):
+            tp_std = self._std.get(StandardizeTarget.TP)
+            if not isinstance(tp_std, pd.DataFrame):
+                return None
+            if isinstance(ccx_std, Future):
+                # the CCX standardization submitted before this task
+                try:
+                    ccx_std = ccx_std.result()
+                except Exception:
+                    ccx_std = None
+            join_key = {CheckMode.MFN_RF: 'MFN RF', CheckMode.MFN: 'MFN'}.get(self.check_mode, 'MFN RF')
+            descriptions = [tp_std['Description']]
+            if isinstance(ccx_std, pd.DataFrame):
+                descriptions.append(ccx_std.loc[ccx_std[join_key].isin(tp_std[join_key]), 'Description'])
+            infor_std = self._std.get(StandardizeTarget.INFOR)
+            if isinstance(infor_std, pd.DataFrame):
+                item_master = (infor_std['ItemType'] == 'Itemmast') & (infor_std['Active Rank'] == '1') & \
+                              infor_std['MFN RF'].isin(tp_std['MFN RF'])
+                descriptions.append(infor_std.loc[item_master, 'Description'])
+            texts = pd.concat(descriptions, ignore_index = True).astype(object).dropna().unique()
+            store = EmbeddingStore(os.path.join(self.data_cache.cache_folder, 'embeddings'), model_name)
+            EmbeddingEngine(model_name, store = store).encode(list(texts))
+            self.profiler.rows(rows_out = len(texts))
+        self.prefetcher.log(f"{len(texts)} descriptions encoded in the background.")
+        return len(texts)
+
+    def prefetch_item_uom_index(self):
+        with self.profiler.stage('prefetch item uom'):
+            item_uom_index = self.reference_data.item_uom_index()
+        self.prefetcher.log("ItemUOM index built in the background.")
+        return item_uom_index
     
     def calc_similarity(self, 
                         desc1: str, 
                         desc2: str):
-        similarity = 0
-        embeddings = self.model.encode([desc1, desc2])
-        cosine_distance = distance.cosine(embeddings[0], embeddings[1])
-        similarity = 1 - cosine_distance
+        if self.embedding_engine is None:
+            self.set_model()
+        similarity = self.embedding_engine.pair_similarity([desc1], [desc2])[0]
         return similarity
     
+    @profiled_stage('embedding')
     def compute_sims_df(self, 
                         to_emb: pd.DataFrame):
         """compute cosine similarity between descriptions in the dataframe
-        and create a new column to store the results"""
+        and create a new column to store the results.
+        descriptions are encoded once per distinct text in batches, then similarities are
+        computed for all pairs at once"""
         if len(to_emb) == 0:
             print("there is no similarity to compute")
             return Status.FAILED
-        sims = []
-        to_emb.loc[:, 'ref'] = [str(i) for i in range(len(to_emb))]
-        total_records_to_process = len(to_emb)
-        for i, val in enumerate(to_emb.values):
-            s = self.calc_similarity(val[0], val[1])
-            sims.append([val[2], s])
-            if i%100 == 0:
-                print(f'processed {i}/{total_records_to_process} records.', end = "\r")
-        print(f'processed {i+1}/{total_records_to_process} records for description similarity.')
-        sims_df = pd.DataFrame(sims, columns = ['ref', 'Description Similarity'])
-        sims_calc_df = to_emb.merge(sims_df, on = ['ref'], how = 'left')
-        sims_calc_df.drop('ref', axis = 1, inplace = True)
+        if self.embedding_engine is None:
+            self.set_model()
+        sims_calc_df = to_emb.reset_index(drop = True).copy()
+        sims_calc_df.loc[:, 'Description Similarity'] = \
+            self.embedding_engine.pair_similarity(sims_calc_df.iloc[:, 0], sims_calc_df.iloc[:, 1])
+        print(f'processed {len(sims_calc_df)}/{len(sims_calc_df)} records for description similarity.')
         return sims_calc_df
 
+    @profiled_stage('embedding')
+    def compute_sims_tiered(self,
+                            dup_found: pd.DataFrame):
+        """
+        Description similarity per distinct description pair through TieredSimilarity, a pair is
+        only scored lexically when all of its lines come from the target manufacturer
+        """
+        if self.embedding_engine is None:
+            self.set_model()
+        target = dup_found['Manufacturer'] == self.manufacturer
+        sims_calc_df = target.groupby([dup_found['Description_x'], dup_found['Description_y']],
+                                      dropna = False, sort = False).all().reset_index(name = 'Target Manufacturer')
+        sims, tiers = TieredSimilarity(self.embedding_engine).score(sims_calc_df['Description_x'],
+                                                                    sims_calc_df['Description_y'],
+                                                                    lexical_ok = sims_calc_df['Target Manufacturer'])
+        sims_calc_df.loc[:, 'Description Similarity'] = sims
+        sims_calc_df.loc[:, 'Similarity Tier'] = tiers
+        self.profiler.rows(len(sims_calc_df), (tiers == 'model').sum())
+        return sims_calc_df.drop(columns = ['Target Manufacturer'])
+
+    @profiled_stage()
     def dup_search_and_compare(self, 
                                check_mode: CheckMode = CheckMode.MFN_RF,
                                base_set: str = 'TP', 
-                               search_set_input: str = 'CCX'):
+                               search_set_input: str = 'CCX',
+                               fuzzy_match: bool = None,
+                               efficient_mode: bool = None,
+                               prefetch: bool = False,
+                               checkpoint: bool = False):
         """a function compares the left and right dataframe and match the items
         based on match mode.
         1. left_df usually should be the tp_std (to process file)
         2. right_df usually will be ccx_std (ccx files to compare and find duplicates)
         But since the function is general, it can be adapted to any combination of interest
+        With fuzzy_match on (run spec option when not given, off by default), near-miss part numbers found by FuzzyPartIndex
+        are added as extra candidates, flagged with 'Match Type' = 'fuzzy' and always sent to review.
+        The join runs through JoinEngine: blank/too short keys and keys joining too many lines are
+        listed in a workbook of their own, their lines are joined and flagged 'Hot Key' for review, or,
+        when asked to, left out and listed in the review file as quarantined. Keys over the join budget
+        are always left out, whatever the answer (see JoinEngine).
+        With efficient_mode on (run spec option efficient_similarity when not given, off by default) descriptions are scored by TieredSimilarity,
+        only the pairs it can not settle lexically go to the model ('Similarity Tier' tells which)
+        With prefetch on, the ItemUOM index of the item master match is built while the results are reviewed.
+        With checkpoint on, the similarity table is checkpointed and the one of the last run is reused
+        when it still applies (see checkpoint_sims)
         """
         print("searching for duplication items ......")
         # if we run to here, we need to make sure we already have everything run up to scope
         # the search set can be have more than one searching data group, just separate the input by comma
         search_set = search_set_input.split(',')
-        left_df = self.stacked_std[self.stacked_std['Source System'] == base_set].copy()
-        right_df = self.stacked_std[self.stacked_std['Source System'].isin(search_set)].copy()
-
+        base_mask = self.stacked_std['Source System'] == base_set
+        search_set_mask = self.stacked_std['Source System'].isin(search_set).to_numpy()
+        search_mask = search_set_mask
+        join_key = {CheckMode.MFN_RF: 'MFN RF', CheckMode.MFN: 'MFN'}.get(self.check_mode)
+        if join_key is None:
+            print("Invalid check mode. Please use CheckMode.MFN_RF or CheckMode.MFN.")
+            return Status.FAILED
+        # only lines sharing the join key with the base set can match, take them from the index
+        index = self.get_stacked_index()
+        search_mask = search_mask & index.mask(index.lookup(self.stacked_std, join_key,
+                                                            self.stacked_std.loc[base_mask, join_key]))
         left_cols = ['Source System', 'Contract Number', 
                      'MFN', 'VN', 'IN', 'Description',
                      'UnitCost', 'UOM', 'QOE', 
                      'Effective Date', 'Expiration Date', 
                      'seq', 'MFN RF']
-        left_df = left_df[left_cols].copy()
+        left_df = self.stacked_slice(base_mask, columns = left_cols)[left_cols]
+        right_df = self.stacked_slice(search_mask, columns = self.dup_search_cols)
 
-        if self.check_mode == CheckMode.MFN_RF:
-            dup_found = left_df.merge(right_df, on = ['MFN RF'])
-        elif self.check_mode == CheckMode.MFN:
-            dup_found = left_df.merge(right_df, on = ['MFN'])
-        else:
-            print("Invalid check mode. Please use CheckMode.MFN_RF or CheckMode.MFN.")
-            return Status.FAILED
+        join_engine = JoinEngine()
+        estimate = join_engine.estimate(left_df[join_key], right_df[join_key])
+        print(f"{estimate['Estimated Pairs'].sum():,} candidate line pair(s) over {len(estimate):,} {join_key} key(s)")
+        hot_keys = estimate[estimate['Hot Key']]
+        over_budget = hot_keys.loc[hot_keys['Over Budget'], 'Key'].tolist()
+        quarantine = list(over_budget)
+        quarantine_hot = False
+        if len(hot_keys) > 0:
+            hot_keys.to_excel(os.path.join(self.output_file_path, f'dup_search_hot_keys_{self.datesig}.xlsx'), index = False)
+            print(f"""{Fore.LIGHTRED_EX}{len(hot_keys)} {join_key} key(s) are blank, too short or join too many lines 
+({hot_keys['Estimated Pairs'].sum():,} line pairs), they are listed in 
+'dup_search_hot_keys_{self.datesig}.xlsx'{Style.RESET_ALL} in the output folder.""".replace("\n", ""))
+        if len(over_budget) > 0:
+            print(f"""{Fore.LIGHTRED_EX}{len(over_budget)} of them ({hot_keys.loc[hot_keys['Over Budget'], 'Estimated Pairs'].sum():,} line pairs) 
+are over the join budget, their lines are left out of the duplication search to be checked by 
+hand.{Style.RESET_ALL}""".replace("\n", ""))
+        if len(over_budget) < len(hot_keys):
+            quarantine_hot_keys = self.ask('quarantine_hot_keys', 'do we want to leave the other hot keys out of the duplication search and check them by hand too (N: join them and flag them for review)? (Y/N)')
+            quarantine_hot = quarantine_hot_keys.lower() == 'yes' or quarantine_hot_keys.lower() == 'y'
+            if quarantine_hot:
+                quarantine = hot_keys['Key'].tolist()
+
+        with self.profiler.stage('merge'):
+            dup_found = join_engine.join(left_df, right_df, join_key, exclude = quarantine)
+            self.profiler.rows(len(left_df) + len(right_df), len(dup_found))
+
+        if fuzzy_match is None:
+            fuzzy_match = self.option('fuzzy_match')
+        if fuzzy_match:
+            dup_found = self.fuzzy_dup_search(left_df, dup_found, search_set_mask, join_key, quarantine_hot = quarantine_hot)
+        if len(hot_keys) > 0:
+            dup_found.loc[:, 'Hot Key'] = np.where(dup_found[join_key].isin(hot_keys['Key']), 'x', '')
         
+        self.profiler.rows(len(left_df), len(dup_found))
         if len(dup_found) == 0:
+            if len(quarantine) > 0:
+                print(f"""{Fore.LIGHTRED_EX}no duplication found apart from the quarantined key(s), their lines were not searched 
+(see 'dup_search_hot_keys_{self.datesig}.xlsx').{Style.RESET_ALL}""".replace("\n", ""))
+                return Status.SUCCESS
             print("no duplication found in the search set. All good now.")
-            return Status.PASS
+            return Status.SUCCESS
        
         dup_found.loc[:, 'Same QOE'] = dup_found['QOE_x'] == dup_found['QOE_y']
         dup_found.loc[:, 'Same UOM'] = dup_found['UOM_x'] == dup_found['UOM_y']
-        dup_found.loc[:, 'EACostDiff'] = dup_found.apply(lambda x: (x['UnitCost_x']/x['QOE_x'])/(x['UnitCost_y']/x['QOE_y'])
-                                                           if ((x['UnitCost_y']/x['QOE_y']) != 0 and x['QOE_x'] != 0)
-                                                           else -1, axis = 1)
-
-        # the long way of compute text similarity
-        # this can be optimized by only computing the text similarity for contracts that are
-        # not exactly coming from the target manufactuer
-        # can save a lot of time if the joined dup_found becomes too long
-        efficient_mode = False
-        if efficient_mode is True:
-            # to be implemented
+        dup_found.loc[:, 'EACostDiff'] = self.ea_cost_diff_series(dup_found)
+
+        # the long way of compute text similarity sends every distinct description pair to the model,
+        # efficient mode settles identical descriptions and close ones of the target manufacturer lexically
+        if efficient_mode is None:
+            efficient_mode = self.option('efficient_similarity')
+        sims_settings = {'base_set': base_set, 'search_set': search_set_input, 'efficient_mode': efficient_mode}
+        sims_calc_df = self.checkpoint_sims(dup_found, sims_settings) if checkpoint else None
+        if sims_calc_df is not None:
             pass
+        elif efficient_mode is True:
+            sims_calc_df = self.compute_sims_tiered(dup_found)
         else:
             to_emb = dup_found[['Description_x', 'Description_y']].drop_duplicates()
-        
-        sims_calc_df = self.compute_sims_df(to_emb)
+            sims_calc_df = self.compute_sims_df(to_emb)
+        if checkpoint and isinstance(sims_calc_df, pd.DataFrame):
+            self.save_checkpoint('sims', frame = sims_calc_df, settings = sims_settings)
         if sims_calc_df is None:
             dup_found_m = dup_found.copy()
             dup_found_m.loc[:, 'Description Similarity'] = np.nan
@@ -963,16 +1930,27 @@ This will take a while.""".replace("\n", ""))
         dup_found_m.loc[:, 'Description Similarity'] = dup_found_m['Description Similarity'].fillna(1)
         dup_found_m.loc[:, 'Drop'] = ''
         dup_found_m.sort_values(by = ['Description Similarity'], inplace = True)
-        dup_found_m.to_excel(os.path.join(self.output_file_path, 
-                                          f'dup_search_review_{self.datesig}.xlsx'),
-                                          index = False)
+        if len(quarantine) > 0:
+            # the base lines left out are listed at the bottom, already dropped, so the review shows them
+            quarantined = left_df[left_df[join_key].isin(quarantine)].merge(right_df.iloc[:0], on = join_key, how = 'left')
+            quarantined.loc[:, 'Hot Key'] = np.where(quarantined[join_key].isin(over_budget), 'over budget', 'quarantined')
+            quarantined.loc[:, 'Drop'] = 'quarantined'
+            dup_found_m = pd.concat([dup_found_m, quarantined[[col for col in dup_found_m.columns if col in quarantined.columns]]],
+                                    ignore_index = True)
+        with self.profiler.stage('excel write'):
+            dup_found_m.to_excel(os.path.join(self.output_file_path, 
+                                              f'dup_search_review_{self.datesig}.xlsx'),
+                                              index = False)
         print(f"""Initial search for duplication items completed, results are saved as 
 {Fore.LIGHTGREEN_EX}'dup_search_review_{self.datesig}.xlsx'{Style.RESET_ALL} in the temp folder. Please review 
 and mark false positive matches under columns 'Drop' with 'x' and rename the 
 reviewed file to {Fore.LIGHTGREEN_EX}'dup_search_reviewed.xlsx{Style.RESET_ALL}'""".replace("\n", ""))
         
+        self.accept_review(f'dup_search_review_{self.datesig}.xlsx', 'dup_search_reviewed.xlsx')
+        if prefetch:
+            self.prefetcher.submit('item uom index', self.prefetch_item_uom_index)
         duplication_review_completed = "no"
-        duplication_review_completed = input("Have we reviewed the duplication search results and rename the file? (Y/N): ")
+        duplication_review_completed = self.ask('dup_review_completed', "Have we reviewed the duplication search results and rename the file? (Y/N): ")
         if duplication_review_completed.lower() == "yes" or duplication_review_completed.lower() == "y":
             dup_found_reviewed = pd.read_excel(os.path.join(self.output_file_path, 
                                                             'dup_search_reviewed.xlsx'),
@@ -982,9 +1960,9 @@ reviewed file to {Fore.LIGHTGREEN_EX}'dup_search_reviewed.xlsx{Style.RESET_ALL}'
             dup_found_clean = dup_found_clean.reset_index(drop = True)
             # mark the lines for review
             for col in ['EACostDiff', 'UnitCost_x', 'UnitCost_y', 'Description Similarity']:
-                dup_found_clean.loc[:, col] = dup_found_clean[col].apply(lambda x: round(float(x),2) if not pd.isnull(x) else np.nan)
+                dup_found_clean.loc[:, col] = self.round_series(dup_found_clean[col])
             for col in ['QOE_x', 'QOE_y']:
-                dup_found_clean.loc[:, col] = dup_found_clean[col].apply(lambda x: int(x) if not pd.isnull(x) else 0)
+                dup_found_clean.loc[:, col] = dup_found_clean[col].fillna(0).astype(np.int64)
             
             dups_review1 = dup_found_clean['Same UOM'] == "False"
             dups_review2 = dup_found_clean['Same QOE'] == "False"
@@ -993,8 +1971,14 @@ reviewed file to {Fore.LIGHTGREEN_EX}'dup_search_reviewed.xlsx{Style.RESET_ALL}'
             dups_review4 = ((dup_found_clean['EACostDiff'] > 1.5) | (dup_found_clean['EACostDiff'] < 0.65)) & \
                            (dup_found_clean['Manufacturer'] == self.manufacturer)
             dups_review5 = (dup_found_clean['UOM_x'] == 'EA') & (dup_found_clean['QOE_x'] != 1)
+            # a near-miss part number is never deactivated without a look
+            dups_review6 = dup_found_clean.get('Match Type', pd.Series('', index = dup_found_clean.index)) == 'fuzzy'
+            # neither are lines joined on a key that can not tell products apart
+            dups_review7 = dup_found_clean.get('Hot Key', pd.Series('', index = dup_found_clean.index)) == 'x'
+            # nor lines with no description to compare on either side
+            dups_review8 = dup_found_clean['Description_x'].isna() | dup_found_clean['Description_y'].isna()
 
-            dup_review_ind = dup_found_clean[dups_review1 | dups_review2 | dups_review3 | dups_review4 | dups_review5].index
+            dup_review_ind = dup_found_clean[dups_review1 | dups_review2 | dups_review3 | dups_review4 | dups_review5 | dups_review6 | dups_review7 | dups_review8].index
             dup_found_clean.loc[:, 'Action'] = 'Deactivate'
             dup_found_clean.loc[dup_review_ind, 'Action'] = 'Review'
 
@@ -1009,19 +1993,18 @@ reviewed file to {Fore.LIGHTGREEN_EX}'dup_search_reviewed.xlsx{Style.RESET_ALL}'
                             'MFN_x', 'VN_x',
                             'Description_x', 'UnitCost_x', 'UOM_x', 'QOE_x',
                             'Contract Number_x',
-                            'Same UOM', 'Same QOE', 'EACostDiff', 'Description Similarity']].copy()
+                            'Same UOM', 'Same QOE', 'EACostDiff', 'Description Similarity'] + 
+                            [col for col in ['Match Type', 'Match Score', 'Similarity Tier', 'Hot Key'] if col in dup_found_clean.columns]].copy()
             
             # in theory, if later we decide to output in same tab, we can use this format
             # dup_found_clean.to_excel(os.path.join(self.temp_file_path, "just a dummy file.xlsx"))
             print(pre_output.shape)
 
-            # prepare to output the data into different tabs
-            to_output = {}
+            # one tab per contract, split by the report writer
             for contract in pre_output['Contract Number_y'].unique():
                 print(contract)
-                to_output[contract] = pre_output[pre_output['Contract Number_y'] == contract]
             # output summary information so we know initially how many items on per contract inscope
-            to_count_df = self.stacked_std[self.stacked_std['Source System'].isin(search_set + [base_set])].copy()
+            to_count_df = self.stacked_slice(self.stacked_std['Source System'].isin(search_set + [base_set]))
             
             count_summary = to_count_df[to_count_df['Active Rank'] == '1'].groupby(['Source System', 
                                                                                     'Contract Number',
@@ -1040,9 +2023,10 @@ reviewed file to {Fore.LIGHTGREEN_EX}'dup_search_reviewed.xlsx{Style.RESET_ALL}'
                                 how = 'left')
             
             report_to_write = ReportFurnishing(self.folder_manager)
-            report_to_write.make_dedup_report(to_output,
-                                              count_summary_to_output,
-                                              dup_found_clean)
+            with self.profiler.stage('excel write'):
+                report_to_write.make_dedup_report(pre_output,
+                                                  count_summary_to_output,
+                                                  dup_found_clean)
             return Status.SUCCESS
 
         else:
@@ -1050,85 +2034,206 @@ reviewed file to {Fore.LIGHTGREEN_EX}'dup_search_reviewed.xlsx{Style.RESET_ALL}'
 
         return Status.FAILED
     
+    @profiled_stage('fuzzy search')
+    def fuzzy_dup_search(self,
+                         left_df: pd.DataFrame,
+                         dup_found: pd.DataFrame,
+                         search_set_mask: np.ndarray,
+                         join_key: str,
+                         quarantine_hot: bool = False):
+        """
+        Add the near-miss matches of the base set part numbers in the search set to the exact ones.
+        Fuzzy rows carry both sides' join key (join_key / 'Matched <join_key>'), exact rows the same
+        value twice, so both kinds stack in one frame.
+        The fuzzy pairs are joined through JoinEngine on the matched fuzzy key, its hot keys are
+        handled as the exact ones: over the join budget always left out, the others only with
+        quarantine_hot on, all listed in a workbook of their own.
+        """
+        matched_key = f'Matched {join_key}'
+        # assign, not .loc, as every exact match may have been quarantined
+        dup_found = dup_found.assign(**{matched_key: dup_found[join_key], 'Match Type': 'exact', 'Match Score': 1.0})
+
+        search_mfn = self.stacked_std.loc[search_set_mask, 'MFN']
+        fuzzy_index = FuzzyPartIndex.build(search_mfn)
+        matches = fuzzy_index.match(left_df['MFN'])
+        print(f"fuzzy part number search: {len(matches)} near-miss key pair(s) against {len(fuzzy_index.keys)} search set part numbers")
+        if len(matches) == 0:
+            return dup_found
+
+        left_fuzzy = left_df.assign(**{'Fuzzy Key': FuzzyPartIndex.fuzzy_key_series(left_df['MFN']).to_numpy()})
+        search_keys = FuzzyPartIndex.fuzzy_key_series(search_mfn)
+        right_mask = search_set_mask.copy()
+        right_mask[search_set_mask] = search_keys.isin(matches['Matched Fuzzy Key']).to_numpy()
+        right_fuzzy = self.stacked_slice(right_mask)
+        right_fuzzy.loc[:, 'Matched Fuzzy Key'] = FuzzyPartIndex.fuzzy_key_series(right_fuzzy['MFN']).to_numpy()
+
+        left_pairs = left_fuzzy.merge(matches, on = ['Fuzzy Key'])
+        join_engine = JoinEngine()
+        estimate = join_engine.estimate(left_pairs['Matched Fuzzy Key'], right_fuzzy['Matched Fuzzy Key'])
+        hot_keys = estimate[estimate['Hot Key']]
+        exclude = hot_keys.loc[hot_keys['Over Budget'] | quarantine_hot, 'Key'].tolist()
+        if len(hot_keys) > 0:
+            hot_keys.to_excel(os.path.join(self.output_file_path, f'dup_search_fuzzy_hot_keys_{self.datesig}.xlsx'), index = False)
+            print(f"""{Fore.LIGHTRED_EX}{len(hot_keys)} near-miss key(s) are too short or join too many lines, {len(exclude)} of them 
+left out of the fuzzy search, they are listed in 'dup_search_fuzzy_hot_keys_{self.datesig}.xlsx'{Style.RESET_ALL} 
+in the output folder.""".replace("\n", ""))
+        fuzzy_found = join_engine.join(left_pairs, right_fuzzy, 'Matched Fuzzy Key', exclude = exclude)
+        fuzzy_found.rename(columns = {f'{join_key}_x': join_key, f'{join_key}_y': matched_key}, inplace = True)
+        # pairs sharing the join key are already in the exact matches
+        fuzzy_found = fuzzy_found[fuzzy_found[join_key] != fuzzy_found[matched_key]].copy()
+        if len(fuzzy_found) == 0:
+            print("no fuzzy match line added to the exact match lines")
+            return dup_found
+        fuzzy_found.loc[:, 'Match Type'] = 'fuzzy'
+        print(f"{len(fuzzy_found)} fuzzy match line(s) added to {len(dup_found)} exact match line(s)")
+        return pd.concat([dup_found, fuzzy_found[dup_found.columns]], ignore_index = True)
+
+    def description_index(self):
+        """
+        DescriptionIndex over the active item master lines of the whole Infor catalog (not only the
+        contracts in scope), built once per process and model, returns (index, item master lines)
+        """
+        infor_std = self.infor_std
+        if not isinstance(infor_std, pd.DataFrame):
+            return None, None
+        if self.embedding_engine is None:
+            self.set_model()
+        model_name = self.embedding_engine.model_name
+        cached = FileProcessor._description_index.get(model_name)
+        if cached is not None and cached[0] is infor_std:
+            return cached[1], cached[2]
+        im_lines = infor_std.loc[(infor_std['ItemType'] == 'Itemmast') & (infor_std['Active Rank'] == '1') & infor_std['IN'].notna(),
+                                 ['MFN RF', 'Contract Number', 'MFN', 'VN', 'IN', 'Description', 'UnitCost', 'UOM', 'QOE', 'ItemType']]
+        print(f"building description index over {len(im_lines)} active item master lines ......")
+        index = DescriptionIndex.build(im_lines['Description'], self.embedding_engine)
+        FileProcessor._description_index[model_name] = (infor_std, index, im_lines)
+        return index, im_lines
+
+    @profiled_stage('description search')
+    def description_search(self,
+                           tp_side: pd.DataFrame,
+                           tp_im: pd.DataFrame,
+                           k: int = 3,
+                           min_score: float = 0.85):
+        """
+        Item master lines whose description is among the k nearest of a TP line's description
+        (cosine similarity >= min_score), for the TP line/item pairs the MFN RF join did not find
+        """
+        index, im_lines = self.description_index()
+        if index is None:
+            return tp_im
+        matches = index.match(tp_side['Description'], self.embedding_engine, k = k, min_score = min_score)
+        print(f"description search: {len(matches)} description match(es) in the item master for {tp_side['Description'].nunique()} TP descriptions")
+        desc_found = tp_side.merge(matches[['Description', 'Matched Description']], on = ['Description']).\
+                             merge(im_lines.rename(columns = {'Description': 'Matched Description'}), on = ['Matched Description'])
+        desc_found.rename(columns = {'Description': 'Description_x', 'Matched Description': 'Description_y',
+                                     'MFN RF_x': 'MFN RF', 'MFN RF_y': 'Matched MFN RF'}, inplace = True)
+        # pairs already joined on MFN RF stay as they are
+        found = pd.MultiIndex.from_frame(tp_im[['seq', 'IN_y']].astype(str))
+        desc_found = desc_found[~pd.MultiIndex.from_arrays([desc_found['seq'].astype(str), desc_found['IN_y'].astype(str)]).isin(found)].copy()
+        tp_im = tp_im.copy()
+        tp_im.loc[:, 'Matched MFN RF'] = tp_im['MFN RF']
+        tp_im.loc[:, 'Match Type'] = 'MFN RF'
+        desc_found.loc[:, 'Match Type'] = 'description'
+        print(f"{len(desc_found)} description-first item master line(s) added to {len(tp_im)} MFN RF match(es)")
+        return pd.concat([tp_im, desc_found[tp_im.columns]], ignore_index = True)
+
+    @profiled_stage()
     def itemmast_search_and_compare(self,
-                                    check_mode: CheckMode = CheckMode.MFN_RF):
+                                    check_mode: CheckMode = CheckMode.MFN_RF,
+                                    description_match: bool = None):
+        """
+        Match TP lines to active item master items on MFN RF. With description_match on (run spec option
+        when not given, off by default), item master items whose description is among the nearest of a TP line's are added
+        as well, flagged with 'Match Type' = 'description'
+        """
         
         print("Try matching item master items ......")
-        im_df = self.stacked_std[(self.stacked_std['Source System'] == 'Infor') & 
-                                 (self.stacked_std['ItemType'] == 'Itemmast') &
-                                 (self.stacked_std['Active Rank'] == '1')].copy()
-        tp_df = self.stacked_std[self.stacked_std['Source System'] == 'TP']
+        tp_mask = self.stacked_std['Source System'] == 'TP'
+        index = self.get_stacked_index()
+        # item master lines sharing a MFN RF with TP, from the index
+        candidate_mask = index.mask(index.lookup(self.stacked_std, 'MFN RF', self.stacked_std.loc[tp_mask, 'MFN RF']))
+        im_df = self.stacked_slice((self.stacked_std['Source System'] == 'Infor') & 
+                                   (self.stacked_std['ItemType'] == 'Itemmast') &
+                                   (self.stacked_std['Active Rank'] == '1') &
+                                   candidate_mask)
+        tp_df = self.stacked_slice(tp_mask)
         tp_cols_to_take = ['Contract Number', 'MFN', 'VN', 'IN', 'Description', 'UnitCost', 'UOM', 'QOE', 
                            'Effective Date', 'Expiration Date', 'seq', 'MFN RF']
         infor_cols_to_take = ['MFN RF', 'Contract Number', 'MFN', 'VN', 'IN', 'Description', 'UnitCost', 'UOM', 'QOE', 'ItemType']
         tp_side = tp_df[tp_cols_to_take].copy()
         im_side = im_df[infor_cols_to_take].copy()
 
-        tp_im = tp_side.merge(im_side, on = ['MFN RF'], how = 'inner')
+        with self.profiler.stage('merge'):
+            tp_im = tp_side.merge(im_side, on = ['MFN RF'], how = 'inner')
+            self.profiler.rows(len(tp_side) + len(im_side), len(tp_im))
 
         # need implementation -- we also have a subset of item master items that are not in im_side (not backed up by contract)
         # in this case, we need to import the VendorItem class and select on items with no contract references and do the
         # second pass of screening
+        if description_match is None:
+            description_match = self.option('description_match')
+        if description_match:
+            tp_im = self.description_search(tp_side, tp_im)
         
-        # since im item usually should be relatively small, directly call similarity function instead of 
-        # generating the sims_df (this will help us monitor the progress)
         print(f'found {tp_im.shape[0]} of potential item master item.')
         if len(tp_im) == 0:
             print("No Item master item hit, nothing need to be done.")
             return Status.SUCCESS
-        tp_im.loc[:, 'Description Similarity'] = tp_im.apply(lambda x: 
-                                                             self.calc_similarity(x['Description_x'], 
-                                                                                  x['Description_y']),
-                                                                                  axis = 1)
+        if self.embedding_engine is None:
+            self.set_model()
+        with self.profiler.stage('embedding'):
+            tp_im.loc[:, 'Description Similarity'] = self.embedding_engine.pair_similarity(tp_im['Description_x'],
+                                                                                           tp_im['Description_y'])
         tp_im.rename(columns = {'UOM_x': 'UOM',
                                 'IN_y': 'Item'}, inplace = True)
-        # read in ItemUOM
-        itemUOM = pd.read_csv(os.path.join(self.shared_file_path, self.itemUOM_file), dtype = str)
-        itemUOM_cols_to_take = ['Item', 'UnitOfMeasure', 'UOMConversion', 'ValidForBuying', 'Item.Active']
-        itemUOM = itemUOM[itemUOM_cols_to_take].copy()
-        itemUOM.loc[:, 'UOMConversion'] = itemUOM['UOMConversion'].apply(lambda x: int(float(x.replace(',',''))) if not pd.isnull(x) else 0)
-        itemUOM.rename(columns = {'UnitOfMeasure': 'UOM'}, inplace = True)
-        valid_buyuom = itemUOM[itemUOM['ValidForBuying'] != 'Not Valid'].copy()
-        valid_buyuom.loc[:, 'AllValidBuyUOMandCF'] = valid_buyuom['UOM'].astype(str) + '*' + valid_buyuom['UOMConversion'].astype(int).astype(str)
-        all_buyuom = valid_buyuom.groupby(['Item'])['AllValidBuyUOMandCF'].apply(lambda x: ','.join(x)).to_frame().reset_index()
-        # merge to tp_im
-        im_label = tp_im.merge(valid_buyuom, on = ['Item', 'UOM'], how = 'left').\
-                         merge(all_buyuom, on = ['Item'], how = 'left')
-        im_label.loc[:, 'IM_check'] = im_label['ValidForBuying'].apply(lambda x: 'Failed' if pd.isnull(x) else 'Passed')
-        im_label.loc[:, 'IM_check'] = im_label.apply(lambda x: 'Failed' 
-                                                     if x['QOE_x'] != x['UOMConversion'] 
-                                                     else x['IM_check'], axis = 1)
+        # valid buying UOMs of the matched items, from the ItemUOM index (built once per ItemUOM.csv download)
+        with self.profiler.stage('item uom'):
+            # built in the background during the duplication review, wait for it
+            self.prefetcher.result('item uom index')
+            item_uom_index = self.reference_data.item_uom_index()
+            im_label = item_uom_index.label(tp_im, item_col = 'Item', uom_col = 'UOM')
+        # not a valid buying UOM of the item, or not the conversion factor of the TP QOE
+        im_label.loc[:, 'IM_check'] = np.where(im_label['ValidForBuying'].isna() |
+                                               (im_label['QOE_x'] != im_label['UOMConversion']), 'Failed', 'Passed')
         # drop by seq_x and contract to make the output simple
         im_label_simple = \
         im_label[['Contract Number_x', 'MFN_x', 'VN_x', 
                   'Description_x', 'UnitCost_x', 'UOM', 'QOE_x', 'seq',
                   'Effective Date', 'Expiration Date', 'MFN RF', 'Description_y', 'Description Similarity',
                   'MFN_y', 'Item', 'ItemType', 'UOMConversion', 'ValidForBuying',
-                  'AllValidBuyUOMandCF_y', 'IM_check']].copy()
+                  'AllValidBuyUOMandCF', 'IM_check']].copy()
+        # the report header as the two merges named it
+        im_label_simple.rename(columns = {'AllValidBuyUOMandCF': 'AllValidBuyUOMandCF_y'}, inplace = True)
         im_label_simple.sort_values(by = ['IM_check'], ascending = [True], inplace = True)
 
         im_label_simple = im_label_simple.drop_duplicates(subset = ['seq', 'Item'])
         im_label_simple.loc[:, 'Numbers of Item Matched'] = im_label_simple.groupby(['seq'])['Item'].transform('count')
+        if 'Match Type' in im_label.columns:
+            im_label_simple.loc[:, 'Match Type'] = im_label.loc[im_label_simple.index, 'Match Type']
         
+        self.profiler.rows(len(tp_df), len(im_label_simple))
         report_to_write = ReportFurnishing(self.folder_manager)
-        report_to_write.make_itemmast_report(im_label_simple)
+        with self.profiler.stage('excel write'):
+            report_to_write.make_itemmast_report(im_label_simple)
         print('item master matching completed successfully, results are saved to output folder.')
         
         return Status.SUCCESS
     
+    @profiled_stage()
     def replacement_contract_pair_check(self,
                                         check_mode: CheckMode = CheckMode.MFN_RF):
         """compare two contracts: TP - new, replacement ccx - old contract to be replaced to identify
         1. items only lives on old contract
         2. items only lives on old contract and marked as itemmast on Infor (if none, type in 'nan')"""
-        replaced_contract = input("please enter the replacement contract number: ")
+        replaced_contract = self.ask('replacement_contract', "please enter the replacement contract number: ")
         replaced_contract = replaced_contract.strip().upper()
-        replacement_ccx_df = self.stacked_std[(self.stacked_std['Source System'] == 'CCX') & 
-                                              (self.stacked_std['Contract Number'] == replaced_contract)].copy()
-        replacement_infor_df = self.stacked_std[(self.stacked_std['Source System'] == 'Infor') &
-                                                (self.stacked_std['Contract Number'] == replaced_contract) &
-                                                (self.stacked_std['Active Rank'] == '1')][[check_mode, 'ItemType']].copy()
-        tp_df = self.stacked_std[self.stacked_std['Source System'] == 'TP'].copy()
+        replacement_ccx_df = self.stacked_slice((self.stacked_std['Source System'] == 'CCX') & 
+                                                (self.stacked_std['Contract Number'] == replaced_contract))
+        replacement_infor_df = self.stacked_slice((self.stacked_std['Source System'] == 'Infor') &
+                                                  (self.stacked_std['Contract Number'] == replaced_contract) &
+                                                  (self.stacked_std['Active Rank'] == '1'))[[check_mode, 'ItemType']].copy()
+        tp_df = self.stacked_slice(self.stacked_std['Source System'] == 'TP')
         on_infor_flag = True
         if len(replacement_ccx_df) == 0:
             print(f"Contract {replaced_contract} not found in CCX, please check the contract number and try again.")
@@ -1160,8 +2265,10 @@ reviewed file to {Fore.LIGHTGREEN_EX}'dup_search_reviewed.xlsx{Style.RESET_ALL}'
             return Status.SUCCESS
         else:
             replacement_leftover_df.sort_values(by = ['ItemType'], ascending = [True], inplace = True)
+            self.profiler.rows(len(replacement_ccx_df), len(replacement_leftover_df))
             report_to_write = ReportFurnishing(self.folder_manager)
-            report_to_write.make_replacement_report(replacement_leftover_df)
+            with self.profiler.stage('excel write'):
+                report_to_write.make_replace_report(replacement_leftover_df)
             print(f"replacement contract pair check completed, results are saved to output folder.")
         return Status.SUCCESS
     
@@ -0,0 +1,174 @@
+import numpy as np
+import pandas as pd
+
+class FuzzyPartIndex:
+    """
+    Near-miss lookup of part numbers, for the ones MFN_reformat can not bring together:
+    a slash or a dot, a trailing revision letter, a transposed or mistyped character.
+
+    Part numbers are first reduced to a fuzzy key (upper case, letters and digits only, no leading
+    zeros), so punctuation differences already meet at distance 0. The distinct keys are then
+    indexed by their character 3-grams (padded, so short keys get enough grams). A query only looks
+    at the keys sharing enough 3-grams with it (an edit touches at most q+1 grams, a transposition
+    included) and of about the same length, and verifies those few with a bounded edit distance
+    (Levenshtein plus adjacent transpositions). Keys shorter than min_length only match at distance 0,
+    one edit away from a 4 character part number is usually another product.
+    """
+
+    q = 3
+    pad_start = '^'
+    pad_end = '$'
+    alphabet = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ' + pad_start + pad_end
+    # keys per block while building, bounds the gram matrices on big catalogs
+    block_size = 200000
+
+    def __init__(self,
+                 keys: np.ndarray,
+                 offsets: np.ndarray,
+                 postings: np.ndarray,
+                 gram_counts: np.ndarray,
+                 max_distance: int = 1,
+                 min_length: int = 5):
+        # keys are sorted distinct fuzzy keys, postings[offsets[g]:offsets[g+1]] the keys holding gram g
+        self.keys = keys
+        self.lengths = np.array([len(key) for key in keys], dtype = np.int32)
+        self.offsets = offsets
+        self.postings = postings
+        self.gram_counts = gram_counts
+        self.max_distance = max_distance
+        self.min_length = min_length
+
+    @staticmethod
+    def fuzzy_key_series(MFN: pd.Series):
+        """
+        Fuzzy key of every part number of a column, '' for anything that is not a part number
+        """
+        try:
+            keys = MFN.astype(str).where(MFN.notna(), '').str.upper().str.replace('[^0-9A-Z]', '', regex = True)
+        except AttributeError:
+            return pd.Series('', index = MFN.index, dtype = object)
+        return keys.str.lstrip('0').fillna('')
+
+    @classmethod
+    def gram_matrix(cls, keys: np.ndarray):
+        """
+        Distinct gram codes of each key as a (keys, grams) matrix, -1 where there is none
+        """
+        padded = [cls.pad_start * (cls.q - 1) + key + cls.pad_end * (cls.q - 1) for key in keys]
+        width = max(len(key) for key in padded)
+        chars = np.array(padded, dtype = f'S{width}').view(np.uint8).reshape(len(padded), width)
+        lut = np.full(256, -1, dtype = np.int32)
+        lut[np.frombuffer(cls.alphabet.encode(), dtype = np.uint8)] = np.arange(len(cls.alphabet))
+        codes = lut[chars]
+        base = len(cls.alphabet)
+        grams = np.zeros((len(padded), width - cls.q + 1), dtype = np.int32)
+        valid = np.ones(grams.shape, dtype = bool)
+        for i in range(cls.q):
+            part = codes[:, i:i + grams.shape[1]]
+            grams = grams * base + part
+            valid &= part >= 0
+        grams[~valid] = -1
+        # a gram repeated within a key counts once
+        grams.sort(axis = 1)
+        grams[:, 1:][grams[:, 1:] == grams[:, :-1]] = -1
+        return grams
+
+    @classmethod
+    def build(cls,
+              part_numbers,
+              max_distance: int = 1,
+              min_length: int = 5):
+        """
+        Index the distinct fuzzy keys of the given part numbers (a column of MFN)
+        """
+        keys = cls.fuzzy_key_series(pd.Series(part_numbers, dtype = object))
+        keys = np.sort(keys[keys != ''].unique()).astype(object)
+        n_grams = len(cls.alphabet) ** cls.q
+        gram_ids, key_ids, gram_counts = [], [], []
+        for start in range(0, len(keys), cls.block_size):
+            grams = cls.gram_matrix(keys[start:start + cls.block_size])
+            valid = grams >= 0
+            gram_counts.append(valid.sum(axis = 1).astype(np.int32))
+            gram_ids.append(grams[valid])
+            key_ids.append((np.nonzero(valid)[0] + start).astype(np.int32))
+        if len(keys) == 0:
+            gram_ids, key_ids, gram_counts = [np.zeros(0, dtype = np.int32)] * 3
+        gram_ids, key_ids = np.concatenate(gram_ids), np.concatenate(key_ids)
+        order = np.argsort(gram_ids, kind = 'stable')
+        offsets = np.zeros(n_grams + 1, dtype = np.int64)
+        offsets[1:] = np.cumsum(np.bincount(gram_ids, minlength = n_grams))
+        return cls(keys, offsets, key_ids[order], np.concatenate(gram_counts),
+                   max_distance = max_distance, min_length = min_length)
+
+    def allowed_distance(self, key: str):
+        return 0 if len(key) < self.min_length else self.max_distance
+
+    @staticmethod
+    def edit_distance(a: str,
+                      b: str,
+                      bound: int):
+        """
+        Edit distance with adjacent transpositions (optimal string alignment), or bound + 1
+        as soon as it is known to be over bound
+        """
+        if abs(len(a) - len(b)) > bound:
+            return bound + 1
+        previous2, previous = None, list(range(len(b) + 1))
+        for i in range(1, len(a) + 1):
+            current = [i] + [0] * len(b)
+            for j in range(1, len(b) + 1):
+                cost = 0 if a[i - 1] == b[j - 1] else 1
+                current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+                if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                    current[j] = min(current[j], previous2[j - 2] + 1)
+            if min(current) > bound:
+                return bound + 1
+            previous2, previous = previous, current
+        return previous[-1]
+
+    def candidates(self, key: str):
+        """
+        Positions of the indexed keys that can be within the allowed distance of key
+        """
+        distance = self.allowed_distance(key)
+        grams = self.gram_matrix(np.array([key], dtype = object))[0]
+        grams = grams[grams >= 0]
+        if len(grams) == 0 or len(self.keys) == 0:
+            return np.zeros(0, dtype = np.int64)
+        postings = np.concatenate([self.postings[self.offsets[g]:self.offsets[g + 1]] for g in grams])
+        found, shared = np.unique(postings, return_counts = True)
+        # keys within distance d share at least max(grams) - (q+1)*d of their distinct grams
+        needed = np.maximum(np.maximum(self.gram_counts[found], len(grams)) - (self.q + 1) * distance, 1)
+        keep = (shared >= needed) & (np.abs(self.lengths[found] - len(key)) <= distance)
+        return found[keep]
+
+    def search(self, part_number: str):
+        """
+        Indexed keys close to one part number, as a list of (key, distance)
+        """
+        key = self.fuzzy_key_series(pd.Series([part_number], dtype = object)).iloc[0]
+        if key == '':
+            return []
+        return self.search_key(key)
+
+    def search_key(self, key: str):
+        distance = self.allowed_distance(key)
+        matches = []
+        for position in self.candidates(key):
+            match = self.keys[position]
+            d = 0 if match == key else self.edit_distance(key, match, distance)
+            if d <= distance:
+                matches.append((match, d))
+        return matches
+
+    def match(self, part_numbers):
+        """
+        Near-miss matches of a column of part numbers, one row per (query key, matched key) with
+        the edit distance and a score (1 - distance / longer key length)
+        """
+        queries = self.fuzzy_key_series(pd.Series(part_numbers, dtype = object))
+        rows = []
+        for key in queries[queries != ''].unique():
+            for match, distance in self.search_key(key):
+                rows.append((key, match, distance, 1 - distance / max(len(key), len(match))))
+        return pd.DataFrame(rows, columns = ['Fuzzy Key', 'Matched Fuzzy Key', 'Edit Distance', 'Match Score'])
@@ -0,0 +1,166 @@
+import os
+import numpy as np
+import pandas as pd
+
+class ItemUOMIndex:
+    """
+    Valid buying units of measure of every item master item, from ItemUOM.csv.
+    Every (Item, UOM) row not marked 'Not Valid' is kept with its conversion factor, sorted by
+    Item + UOM text so the rows of thousands of (Item, UOM) queries are found with one vectorized
+    binary search. Each item also keeps the list of its valid buying units ('BX*10,EA*1').
+    The index is saved next to ItemUOM.csv (*.uomidx.npz), tagged with the size and mtime of the
+    csv, so the csv is only parsed again after a new download (see ReferenceData.item_uom_index).
+    """
+
+    version = 1
+    # missing Item/UOM values get this key, merge matches a missing value with a missing value
+    null_key = '\x02null'
+    separator = '\x01'
+
+    def __init__(self,
+                 pair_keys: np.ndarray,
+                 conversions: np.ndarray,
+                 valid_for_buying: np.ndarray,
+                 item_keys: np.ndarray,
+                 buy_uoms: np.ndarray,
+                 fingerprint: str = None):
+        # (Item, UOM) rows sorted by key, file order kept within a key
+        self.pair_keys = pair_keys
+        self.conversions = conversions
+        # ValidForBuying text, null_key where the csv has none
+        self.valid_for_buying = valid_for_buying
+        # sorted items with their valid buying units list
+        self.item_keys = item_keys
+        self.buy_uoms = buy_uoms
+        self.fingerprint = fingerprint
+
+    @classmethod
+    def keys(cls, values: pd.Series):
+        return values.astype(str).where(values.notna(), cls.null_key)
+
+    @classmethod
+    def make_pair_keys(cls,
+                       items: pd.Series,
+                       uoms: pd.Series):
+        items = pd.Series(items, dtype = object).reset_index(drop = True)
+        uoms = pd.Series(uoms, dtype = object).reset_index(drop = True)
+        return (cls.keys(items) + cls.separator + cls.keys(uoms)).to_numpy(dtype = str)
+
+    @staticmethod
+    def parse_conversion(values: pd.Series):
+        """
+        int(float(x.replace(',', ''))) of every conversion factor, 0 when missing
+        """
+        numbers = values.str.replace(',', '', regex = False).astype(float)
+        return np.trunc(numbers.fillna(0).to_numpy()).astype(np.int64)
+
+    @classmethod
+    def build(cls,
+              item_uom: pd.DataFrame,
+              fingerprint: str = None):
+        """
+        From the ItemUOM.csv frame (read with dtype = str)
+        """
+        valid = item_uom[item_uom['ValidForBuying'] != 'Not Valid'].reset_index(drop = True)
+        conversions = cls.parse_conversion(valid['UOMConversion'])
+        pair_keys = cls.make_pair_keys(valid['Item'], valid['UnitOfMeasure'])
+        order = np.argsort(pair_keys, kind = 'stable')
+
+        # 'UOM*CF' of the valid rows joined per item in file order (no list for a missing item)
+        has_item = valid['Item'].notna().to_numpy()
+        buy_uom = (valid['UnitOfMeasure'].astype(str) + '*' + pd.Series(conversions).astype(str)).to_numpy()[has_item]
+        items = valid['Item'].to_numpy(dtype = str)[has_item]
+        by_item = np.argsort(items, kind = 'stable')
+        items, buy_uom = items[by_item], buy_uom[by_item].tolist()
+        starts = np.flatnonzero(np.r_[True, items[1:] != items[:-1]]) if len(items) > 0 else np.array([], dtype = np.int64)
+        ends = np.r_[starts[1:], len(items)].astype(np.int64)
+        buy_uoms = np.array([','.join(buy_uom[start:end]) for start, end in zip(starts, ends)], dtype = str)
+
+        return cls(pair_keys[order],
+                   conversions[order],
+                   cls.keys(valid['ValidForBuying']).to_numpy(dtype = str)[order],
+                   items[starts],
+                   buy_uoms,
+                   fingerprint)
+
+    def save(self, file_path: str):
+        arrays = {'meta': np.array([self.version], dtype = np.int64),
+                  'fingerprint': np.array([self.fingerprint or '']),
+                  'pair_keys': self.pair_keys,
+                  'conversions': self.conversions,
+                  'valid_for_buying': self.valid_for_buying,
+                  'item_keys': self.item_keys,
+                  'buy_uoms': self.buy_uoms}
+        tmp_path = file_path + '.tmp.npz'
+        try:
+            np.savez(tmp_path, **arrays)
+            os.replace(tmp_path, file_path)
+        except OSError as e:
+            print(f"unable to save item UOM index ({e}), continue without it.")
+            return False
+        return True
+
+    @classmethod
+    def load(cls,
+             file_path: str,
+             fingerprint: str):
+        """
+        The saved index, or None when there is none or it was built from another ItemUOM.csv
+        """
+        if not os.path.exists(file_path):
+            return None
+        try:
+            with np.load(file_path) as saved:
+                if int(saved['meta'][0]) != cls.version or str(saved['fingerprint'][0]) != fingerprint:
+                    return None
+                return cls(saved['pair_keys'], saved['conversions'], saved['valid_for_buying'],
+                           saved['item_keys'], saved['buy_uoms'], fingerprint)
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def match(self,
+              items: pd.Series,
+              uoms: pd.Series):
+        """
+        (query position, row position) of every valid row with the query's Item and UOM, in the
+        order of a left merge: queries in order, their rows in file order, row -1 where none
+        """
+        query = self.make_pair_keys(items, uoms)
+        starts = np.searchsorted(self.pair_keys, query, side = 'left')
+        counts = np.searchsorted(self.pair_keys, query, side = 'right') - starts
+        repeats = np.maximum(counts, 1)
+        positions = np.repeat(np.arange(len(query)), repeats)
+        # offset of each output row within its query
+        within = np.arange(len(positions)) - np.repeat(np.cumsum(repeats) - repeats, repeats)
+        rows = np.where(np.repeat(counts, repeats) > 0, np.repeat(starts, repeats) + within, -1)
+        return positions, rows
+
+    def label(self,
+              frame: pd.DataFrame,
+              item_col: str = 'Item',
+              uom_col: str = 'UOM'):
+        """
+        frame with UOMConversion, ValidForBuying and AllValidBuyUOMandCF of its (Item, UOM) added,
+        the same rows as left merging the valid ItemUOM rows and then the per item lists on it
+        """
+        positions, rows = self.match(frame[item_col], frame[uom_col])
+        labeled = frame.iloc[positions].reset_index(drop = True)
+        found = rows >= 0
+        # python ints and NaN, as the csv text column held them after parsing
+        conversions = np.full(len(rows), np.nan, dtype = object)
+        conversions[found] = self.conversions[rows[found]].astype(object)
+        labeled.loc[:, 'UOMConversion'] = conversions
+        valid_for_buying = np.full(len(rows), np.nan, dtype = object)
+        valid_for_buying[found] = self.valid_for_buying[rows[found]]
+        valid_for_buying[valid_for_buying == self.null_key] = np.nan
+        labeled.loc[:, 'ValidForBuying'] = valid_for_buying
+
+        items = labeled[item_col]
+        item_keys = items.astype(str).to_numpy(dtype = str)
+        at = np.minimum(np.searchsorted(self.item_keys, item_keys), max(len(self.item_keys) - 1, 0))
+        listed = items.notna().to_numpy() & (len(self.item_keys) > 0)
+        listed[listed] = self.item_keys[at[listed]] == item_keys[listed]
+        buy_uoms = np.full(len(items), np.nan, dtype = object)
+        buy_uoms[listed] = self.buy_uoms[at[listed]]
+        labeled.loc[:, 'AllValidBuyUOMandCF'] = buy_uoms
+        return labeled
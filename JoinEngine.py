@@ -0,0 +1,123 @@
+import numpy as np
+import pandas as pd
+
+class JoinEngine:
+    """
+    Inner join of two line sets on a part number key, guarded against keys that blow up the output.
+
+    Before anything is joined the output is estimated per key from the value counts of both sides
+    (left lines x right lines). Keys that can not tell products apart are flagged as hot:
+    - degenerate keys, blank or shorter than min_key_length once reduced (MFN_reformat turns
+      '0-0', '001' or '1' into '0'/'1')
+    - keys joining hot_key_pairs line pairs or more
+    Hot keys over the memory budget are flagged 'Over Budget' as well: a key joining more than
+    max_key_pairs line pairs, and the biggest keys until what is left joins max_total_pairs line
+    pairs at most. Those are always quarantined (left out of the join and checked by hand), the
+    caller decides whether the other hot keys are quarantined or joined anyway.
+
+    The join itself runs over the left lines grouped by key, cut into chunks of about chunk_rows
+    line pairs (a key is split between chunks when it is bigger than that). Every chunk is merged
+    on its own, so the merge temporaries never exceed one chunk, and the chunks are concatenated in
+    memory: the result itself is as big as the join output, the budget keeps that bounded. The rows come in the order left.merge(right, on = key) gives them.
+    """
+
+    # line pairs per join chunk
+    chunk_rows = 500000
+    # a key joining this many line pairs or more is hot
+    hot_key_pairs = 50000
+    # a key joining more line pairs than this is never joined
+    max_key_pairs = 500000
+    # line pairs the whole join may give, the biggest keys are left out until it fits
+    max_total_pairs = 5000000
+    # reduced part numbers shorter than this do not identify a product
+    min_key_length = 2
+
+    def __init__(self,
+                 chunk_rows: int = None,
+                 hot_key_pairs: int = None,
+                 max_key_pairs: int = None,
+                 max_total_pairs: int = None):
+        self.chunk_rows = chunk_rows or self.chunk_rows
+        self.hot_key_pairs = hot_key_pairs or self.hot_key_pairs
+        self.max_key_pairs = max_key_pairs or self.max_key_pairs
+        self.max_total_pairs = max_total_pairs or self.max_total_pairs
+
+    @staticmethod
+    def key_codes(left_keys: pd.Series,
+                  right_keys: pd.Series):
+        """
+        Integer code per key of both sides (missing keys share one code, as they match in a merge),
+        codes are given in order of first appearance on the left
+        """
+        codes, uniques = pd.factorize(pd.concat([left_keys, right_keys], ignore_index = True),
+                                      use_na_sentinel = False)
+        return codes[:len(left_keys)], codes[len(left_keys):], uniques
+
+    def estimate(self,
+                 left_keys: pd.Series,
+                 right_keys: pd.Series):
+        """
+        Per key found on both sides: line counts, estimated output rows, the hot key and the over
+        budget flags, biggest keys first
+        """
+        left_codes, right_codes, uniques = self.key_codes(left_keys, right_keys)
+        left_counts = np.bincount(left_codes, minlength = len(uniques)).astype(np.int64)
+        right_counts = np.bincount(right_codes, minlength = len(uniques)).astype(np.int64)
+        pairs = left_counts * right_counts
+        joined = np.flatnonzero(pairs > 0)
+        keys = pd.Series(uniques, dtype = object).iloc[joined].reset_index(drop = True)
+        text = keys.astype(str).str.strip().where(keys.notna(), '')
+        estimate = pd.DataFrame({'Key': keys,
+                                 'Left Lines': left_counts[joined],
+                                 'Right Lines': right_counts[joined],
+                                 'Estimated Pairs': pairs[joined]})
+        estimate.loc[:, 'Degenerate Key'] = text.str.len() < self.min_key_length
+        estimate = estimate.sort_values(by = ['Estimated Pairs'], ascending = False, kind = 'stable').reset_index(drop = True)
+        # pairs of the key and of all the smaller ones, over the budget the key is left out
+        remaining = estimate['Estimated Pairs'][::-1].cumsum()[::-1]
+        estimate.loc[:, 'Over Budget'] = (estimate['Estimated Pairs'] > self.max_key_pairs) | (remaining > self.max_total_pairs)
+        estimate.loc[:, 'Hot Key'] = estimate['Degenerate Key'] | (estimate['Estimated Pairs'] >= self.hot_key_pairs) | \
+                                     estimate['Over Budget']
+        return estimate[['Key', 'Left Lines', 'Right Lines', 'Estimated Pairs', 'Degenerate Key', 'Hot Key', 'Over Budget']]
+
+    def join(self,
+             left: pd.DataFrame,
+             right: pd.DataFrame,
+             on: str,
+             exclude: list = None):
+        """
+        left.merge(right, on = on) without the keys in exclude, run in chunks
+        """
+        left_codes, right_codes, uniques = self.key_codes(left[on], right[on])
+        right_counts = np.bincount(right_codes, minlength = len(uniques)).astype(np.int64)
+        excluded = np.zeros(len(uniques), dtype = bool)
+        if exclude is not None and len(exclude) > 0:
+            excluded = pd.Series(uniques, dtype = object).isin(pd.Series(exclude, dtype = object)).to_numpy()
+
+        # left lines that join, grouped by key in order of first appearance (the merge output order)
+        weights = right_counts[left_codes]
+        left_rows = np.flatnonzero((weights > 0) & ~excluded[left_codes])
+        left_rows = left_rows[np.argsort(left_codes[left_rows], kind = 'stable')]
+        right_rows = np.argsort(right_codes, kind = 'stable')
+        right_sorted = right_codes[right_rows]
+        cumulative = np.cumsum(weights[left_rows])
+
+        bounds, start = [], 0
+        while start < len(left_rows):
+            done = cumulative[start - 1] if start > 0 else 0
+            end = max(int(np.searchsorted(cumulative, done + self.chunk_rows, side = 'right')), start + 1)
+            bounds.append((start, end))
+            start = end
+        if len(bounds) == 0:
+            return left.iloc[:0].merge(right.iloc[:0], on = on)
+
+        chunks = []
+        for start, end in bounds:
+            first, last = left_codes[left_rows[start]], left_codes[left_rows[end - 1]]
+            take = right_rows[np.searchsorted(right_sorted, first, side = 'left'):
+                              np.searchsorted(right_sorted, last, side = 'right')]
+            chunks.append(left.iloc[left_rows[start:end]].merge(right.iloc[take], on = on))
+        if len(chunks) == 1:
+            return chunks[0]
+        print(f"joined in {len(bounds)} chunks of up to {self.chunk_rows:,} line pairs")
+        return pd.concat(chunks, ignore_index = True)
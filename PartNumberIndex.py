@@ -0,0 +1,139 @@
+import os
+import numpy as np
+import pandas as pd
+
+class PartNumberIndex:
+    """
+    Inverted index from part numbers (MFN, MFN RF, VN) to the row positions of a standardized frame.
+    Per field the distinct keys are kept as sorted 64 bit hashes with offsets into an array of row
+    positions (CSR layout), so finding the lines of k part numbers is k binary searches instead of
+    isin scans over millions of lines. Candidate rows are checked against the real values, so a hash
+    collision can never produce a false match.
+    Every line is indexed (not only the active ones), Active Rank changes day by day as lines expire,
+    callers filter the few candidates they get back instead.
+    The index of infor_std/import_std is saved next to the standardized cache, tagged with the cache
+    fingerprint, so it is built once per data refresh (see FileProcessor.part_number_index).
+    """
+
+    version = 1
+    fields = ['MFN', 'MFN RF', 'VN']
+    # missing part numbers are indexed under this key (isin matches NaN with NaN, so does the index)
+    null_key = '\x00null'
+
+    def __init__(self,
+                 tables: dict,
+                 n_rows: int,
+                 fingerprint: str = None):
+        # field -> (sorted key hashes, offsets, row positions)
+        self.tables = tables
+        self.n_rows = n_rows
+        self.fingerprint = fingerprint
+
+    @classmethod
+    def hash_keys(cls, values):
+        values = pd.Series(values, dtype = object)
+        values = values.where(values.notna(), cls.null_key)
+        return pd.util.hash_array(values.to_numpy(dtype = object), categorize = False)
+
+    @classmethod
+    def build(cls,
+              frame: pd.DataFrame,
+              fields: list = None,
+              fingerprint: str = None):
+        tables = {}
+        position_type = np.int32 if len(frame) < 2**31 else np.int64
+        for field in fields or cls.fields:
+            hashes = cls.hash_keys(frame[field])
+            order = np.argsort(hashes, kind = 'stable')
+            sorted_hashes = hashes[order]
+            keys, starts = np.unique(sorted_hashes, return_index = True)
+            offsets = np.append(starts, len(sorted_hashes)).astype(position_type)
+            tables[field] = (keys, offsets, order.astype(position_type))
+        return cls(tables, len(frame), fingerprint)
+
+    def save(self, file_path: str):
+        arrays = {'meta': np.array([self.version, self.n_rows], dtype = np.int64),
+                  'fingerprint': np.array([self.fingerprint or ''])}
+        for i, (field, (keys, offsets, rows)) in enumerate(self.tables.items()):
+            arrays[f'field_{i}'] = np.array([field])
+            arrays[f'keys_{i}'] = keys
+            arrays[f'offsets_{i}'] = offsets
+            arrays[f'rows_{i}'] = rows
+        tmp_path = file_path + '.tmp.npz'
+        try:
+            np.savez(tmp_path, **arrays)
+            os.replace(tmp_path, file_path)
+        except OSError as e:
+            print(f"unable to save part number index ({e}), continue without it.")
+            return False
+        return True
+
+    @classmethod
+    def load(cls,
+             file_path: str,
+             fingerprint: str):
+        """
+        The saved index, or None when there is none or it belongs to another build of the data
+        """
+        if not os.path.exists(file_path):
+            return None
+        try:
+            with np.load(file_path) as saved:
+                version, n_rows = saved['meta'].tolist()
+                if version != cls.version or str(saved['fingerprint'][0]) != fingerprint:
+                    return None
+                tables = {}
+                i = 0
+                while f'field_{i}' in saved.files:
+                    tables[str(saved[f'field_{i}'][0])] = (saved[f'keys_{i}'], saved[f'offsets_{i}'], saved[f'rows_{i}'])
+                    i += 1
+        except (OSError, ValueError, KeyError):
+            return None
+        return cls(tables, n_rows, fingerprint)
+
+    def lookup(self,
+               frame: pd.DataFrame,
+               field: str,
+               keys):
+        """
+        Sorted positions of the rows of frame whose field is one of keys (same as frame[field].isin(keys))
+        """
+        keys = pd.unique(pd.Series(list(keys), dtype = object))
+        if len(keys) == 0:
+            return np.zeros(0, dtype = np.int64)
+        table_keys, offsets, rows = self.tables[field]
+        query = self.hash_keys(keys)
+        found = np.searchsorted(table_keys, query)
+        hit = found < len(table_keys)
+        hit[hit] = table_keys[found[hit]] == query[hit]
+        found = found[hit]
+        starts, ends = offsets[found].astype(np.int64), offsets[found + 1].astype(np.int64)
+        lengths = ends - starts
+        total = int(lengths.sum())
+        if total == 0:
+            return np.zeros(0, dtype = np.int64)
+        # positions of every [start, end) range, concatenated
+        shift = np.repeat(starts - np.concatenate([[0], np.cumsum(lengths)[:-1]]), lengths)
+        candidates = np.unique(rows[np.arange(total) + shift]).astype(np.int64)
+        # rule out hash collisions
+        keep = frame[field].iloc[candidates].isin(keys).to_numpy()
+        return candidates[keep]
+
+    def lookup_any(self,
+                   frame: pd.DataFrame,
+                   queries: list):
+        """
+        Sorted positions of the rows matching any of the (field, keys) queries
+        """
+        found = [self.lookup(frame, field, keys) for field, keys in queries]
+        if len(found) == 0:
+            return np.zeros(0, dtype = np.int64)
+        return np.unique(np.concatenate(found))
+
+    def mask(self, positions: np.ndarray):
+        """
+        Boolean row mask of the frame for the given positions
+        """
+        row_mask = np.zeros(self.n_rows, dtype = bool)
+        row_mask[positions] = True
+        return row_mask
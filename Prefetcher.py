@@ -0,0 +1,137 @@
+import io
+import threading
+from concurrent.futures import ThreadPoolExecutor, CancelledError
+
+class Prefetcher:
+    """
+    Background executor for the heavy work of the next steps, started while the analyst is busy with
+    a review prompt (the main thread sits idle in input() meanwhile).
+    Every task has a name and a stamp of its inputs (e.g. the name, size and mtime of the files it
+    read). The step needing the result takes it with result(name, stamp): it waits for a task still
+    running and gets None when there is no task, it failed or its inputs changed since it was
+    submitted, in which case the step does the work itself as it always did.
+    Tasks run one after the other on a single worker thread (submission order). A task reports
+    through log(), which writes to a buffer of its own: the buffer is printed when the result is
+    taken, and on close() for the tasks whose result never was, so nothing lands in the middle of a
+    prompt and nothing is lost. sys.stdout is left alone, what the work itself prints goes straight
+    to the console.
+    """
+
+    def __init__(self,
+                 enabled: bool = True,
+                 max_workers: int = 1):
+        self.enabled = enabled
+        self.max_workers = max_workers
+        self.executor = None
+        self.local = threading.local()
+        # name -> (stamp, future, task log)
+        self.tasks = {}
+        # logs of the tasks dropped before their result was taken, printed on close
+        self.unreleased = []
+
+    def submit(self,
+               name: str,
+               function,
+               *args,
+               stamp = None):
+        """
+        Start function(*args) in the background, a task of that name with the same stamp is kept as is.
+        Returns the future (None when prefetching is off)
+        """
+        if not self.enabled:
+            return None
+        task = self.tasks.get(name)
+        if task is not None and task[0] == stamp and not self.failed(task[1]):
+            return task[1]
+        if task is not None:
+            task[1].cancel()
+            self.unreleased.append((name, task[2]))
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers = self.max_workers, thread_name_prefix = 'prefetch')
+        held = io.StringIO()
+        future = self.executor.submit(self.run, held, name, function, *args)
+        self.tasks[name] = (stamp, future, held)
+        return future
+
+    def run(self,
+            held: io.StringIO,
+            name: str,
+            function,
+            *args):
+        self.local.log = held
+        try:
+            return function(*args)
+        except Exception as e:
+            held.write(f"background {name} failed ({e}).\n")
+            raise
+        finally:
+            self.local.log = None
+
+    def log(self, text: str):
+        """
+        Report from a task into its own log, printed right away when not called from a task
+        """
+        held = getattr(self.local, 'log', None)
+        if held is None:
+            print(text)
+        else:
+            held.write(text + '\n')
+        return None
+
+    @staticmethod
+    def failed(future):
+        return future.cancelled() or (future.done() and future.exception() is not None)
+
+    def has(self, name: str):
+        return name in self.tasks
+
+    def result(self,
+               name: str,
+               stamp = None):
+        """
+        Result of the task (waiting for it if needed), None when there is none to use
+        """
+        task = self.tasks.pop(name, None)
+        if task is None:
+            return None
+        submitted_stamp, future, held = task
+        if submitted_stamp != stamp:
+            # inputs changed since, do not wait for work that is thrown away
+            future.cancel()
+            self.unreleased.append((name, held))
+            print(f"inputs of the background {name} changed, running it again.")
+            return None
+        try:
+            value = future.result()
+        except CancelledError:
+            return None
+        except Exception:
+            self.release(held)
+            print(f"running {name} again.")
+            return None
+        self.release(held)
+        return value
+
+    def release(self, held: io.StringIO):
+        text = held.getvalue()
+        if len(text) > 0:
+            print(text, end = '')
+        return None
+
+    def close(self):
+        """
+        Stop the executor, tasks not started are dropped and running ones finished, then print what
+        the tasks whose result was never taken reported
+        """
+        if self.executor is not None:
+            self.executor.shutdown(wait = True, cancel_futures = True)
+            self.executor = None
+        for name, task in self.tasks.items():
+            self.unreleased.append((name, task[2]))
+        for name, held in self.unreleased:
+            if len(held.getvalue()) > 0:
+                print(f"background {name}:")
+                self.release(held)
+        self.unreleased = []
+        self.tasks = {}
+        return None
@@ -0,0 +1,228 @@
+import os
+import sys
+import json
+import time
+import functools
+import platform
+import threading
+import tracemalloc
+import contextlib
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:
+    # windows
+    resource = None
+
+
+def memory_status():
+    """
+    (current RSS, peak RSS) of the process in bytes, None where the platform does not tell
+    """
+    try:
+        with open('/proc/self/status') as f:
+            status = {line.split(':')[0]: int(line.split()[1]) * 1024 for line in f if line.startswith(('VmRSS', 'VmHWM'))}
+        return status.get('VmRSS'), status.get('VmHWM')
+    except OSError:
+        pass
+    try:
+        # psutil is not a requirement, when it is there it gives the peak working set on windows
+        import psutil
+        info = psutil.Process().memory_info()
+        return info.rss, getattr(info, 'peak_wset', None)
+    except ImportError:
+        pass
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return None, peak if sys.platform == 'darwin' else peak * 1024
+    return None, None
+
+
+class StageRecord:
+    """
+    Metrics of one stage or sub-step, filled in by StageProfiler.stage
+    """
+
+    def __init__(self,
+                 name: str,
+                 path: str,
+                 depth: int):
+        self.name = name
+        self.path = path
+        self.depth = depth
+        self.status = None
+        self.wall_s = None
+        self.cpu_s = None
+        self.rss_start = None
+        self.rss_end = None
+        self.peak_rss = None
+        self.tracemalloc_peak = None
+        self.rows_in = None
+        self.rows_out = None
+        self.cprofile = None
+
+    def to_dict(self):
+        return dict(self.__dict__)
+
+
+class StageProfiler:
+    """
+    Per stage timing and memory of a FileProcessor run, written as a JSON report to the project's
+    temp folder at the end of process_files.
+    Every stage and sub-step records wall time, CPU time, RSS at start/end, the process peak RSS
+    so far and, when given, input/output row counts. Sub-steps nest under the running stage
+    (e.g. 'dup_search_and_compare/merge').
+    trace_memory adds the tracemalloc peak of each step (python allocations, numpy/pandas buffers
+    included), it slows a run down noticeably so it is off by default.
+    cprofile dumps a cProfile .prof per top level stage next to the report (snakeviz / pstats).
+    Each thread nests its own stages, so work started in the background (see Prefetcher) shows up
+    as top level stages of its own; tracemalloc peaks are only taken on the main thread.
+    """
+
+    def __init__(self,
+                 enabled: bool = True,
+                 trace_memory: bool = False,
+                 cprofile: bool = False):
+        self.enabled = enabled
+        self.trace_memory = trace_memory
+        self.cprofile = cprofile
+        self.records = []
+        self.local = threading.local()
+        self.started = datetime.now()
+
+    @property
+    def stack(self):
+        """
+        Running stages of the calling thread, innermost last
+        """
+        if not hasattr(self.local, 'stack'):
+            self.local.stack = []
+        return self.local.stack
+
+    @property
+    def peaks(self):
+        if not hasattr(self.local, 'peaks'):
+            self.local.peaks = []
+        return self.local.peaks
+
+    @contextlib.contextmanager
+    def stage(self, name: str):
+        """
+        Time the block as a stage, nested blocks become its sub-steps
+        """
+        if not self.enabled:
+            yield None
+            return
+        path = '/'.join([record.name for record in self.stack] + [name])
+        record = StageRecord(name, path, len(self.stack))
+        self.records.append(record)
+        # tracemalloc peaks are process wide, a background thread would mix its allocations in
+        trace_memory = self.trace_memory and threading.current_thread() is threading.main_thread()
+        if trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            # the running stages keep their peak so far, the tracemalloc peak is reset for this step
+            if len(self.peaks) > 0:
+                self.peaks[-1] = max(self.peaks[-1], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+            self.peaks.append(0)
+        profile = None
+        if self.cprofile and record.depth == 0:
+            import cProfile
+            profile = cProfile.Profile()
+        self.stack.append(record)
+        record.rss_start = memory_status()[0]
+        wall, cpu = time.perf_counter(), time.process_time()
+        if profile is not None:
+            profile.enable()
+        try:
+            yield record
+        except BaseException:
+            record.status = 'ERROR'
+            raise
+        finally:
+            if profile is not None:
+                profile.disable()
+            record.wall_s = round(time.perf_counter() - wall, 4)
+            record.cpu_s = round(time.process_time() - cpu, 4)
+            record.rss_end, record.peak_rss = memory_status()
+            if trace_memory:
+                record.tracemalloc_peak = max(self.peaks.pop(), tracemalloc.get_traced_memory()[1])
+                if len(self.peaks) > 0:
+                    self.peaks[-1] = max(self.peaks[-1], record.tracemalloc_peak)
+            self.stack.pop()
+            if profile is not None:
+                record.cprofile = profile
+        return None
+
+    def rows(self,
+             rows_in: int = None,
+             rows_out: int = None):
+        """
+        Row counts of the innermost running stage
+        """
+        if self.enabled and len(self.stack) > 0:
+            if rows_in is not None:
+                self.stack[-1].rows_in = int(rows_in)
+            if rows_out is not None:
+                self.stack[-1].rows_out = int(rows_out)
+        return None
+
+    def write_report(self,
+                     folder: str,
+                     extra: dict = None):
+        """
+        Save the JSON run report (and the cProfile dumps) into folder, returns the report path
+        """
+        if not self.enabled or len(self.records) == 0:
+            return None
+        stamp = self.started.strftime('%Y%m%d_%H%M%S')
+        stages = []
+        for i, record in enumerate(self.records):
+            if record.cprofile is not None:
+                prof_path = os.path.join(folder, f"profile_{stamp}_{i:02d}_{record.name}.prof")
+                record.cprofile.dump_stats(prof_path)
+                record.cprofile = prof_path
+            stages.append(record.to_dict())
+        report = {'started': self.started.isoformat(timespec = 'seconds'),
+                  'python': platform.python_version(),
+                  'platform': platform.platform(),
+                  'trace_memory': self.trace_memory,
+                  'stages': stages}
+        report.update(extra or {})
+        report_path = os.path.join(folder, f"run_report_{stamp}.json")
+        with open(report_path, 'w', encoding = 'utf-8') as f:
+            json.dump(report, f, indent = 2, default = str)
+        self.print_summary()
+        print(f"run report saved to {report_path}")
+        return report_path
+
+    def print_summary(self):
+        print(f"{'stage':<44}{'wall':>9}{'cpu':>9}{'peak RSS':>11}{'rows in':>10}{'rows out':>10}")
+        for record in self.records:
+            if record.depth > 0:
+                continue
+            peak = f"{record.peak_rss/2**20:,.0f} MB" if record.peak_rss is not None else 'n/a'
+            rows_in = '' if record.rows_in is None else f"{record.rows_in:,}"
+            rows_out = '' if record.rows_out is None else f"{record.rows_out:,}"
+            print(f"{record.name:<44}{record.wall_s:>7.2f} s{record.cpu_s:>7.2f} s{peak:>11}{rows_in:>10}{rows_out:>10}")
+        return None
+
+
+def profiled_stage(name: str = None):
+    """
+    Decorator timing a FileProcessor method as a stage of self.profiler, the returned Status is kept
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self.profiler.stage(name or method.__name__) as record:
+                result = method(self, *args, **kwargs)
+                if record is not None and isinstance(result, str):
+                    record.status = result
+                elif record is not None and hasattr(result, 'columns') and record.rows_out is None:
+                    record.rows_out = len(result)
+                return result
+        return wrapper
+    return decorator
@@ -0,0 +1,116 @@
+import os
+import pandas as pd
+from ItemUOMIndex import ItemUOMIndex
+
+class ReferenceData:
+    """
+    Registry for the lookup files under SHARED_DATA (UOM.csv, Manufacturers.csv, Suppliers.csv, ItemUOM.csv).
+    Each file is parsed once into a dictionary (ItemUOM.csv into an ItemUOMIndex) and shared by every
+    FileProcessor in the process, a table is reloaded automatically as soon as the file on disk
+    changes (size or mtime).
+    """
+
+    # (file path, table name) -> ((size, mtime_ns), lookup dictionary)
+    _tables = {}
+
+    def __init__(self,
+                 shared_folder: str,
+                 uom_file: str = 'UOM.csv',
+                 manufacturer_file: str = 'Manufacturers.csv',
+                 vendor_file: str = 'Suppliers.csv',
+                 item_uom_file: str = 'ItemUOM.csv'):
+        self.shared_folder = shared_folder
+        self.uom_file = uom_file
+        self.manufacturer_file = manufacturer_file
+        self.vendor_file = vendor_file
+        self.item_uom_file = item_uom_file
+
+    @classmethod
+    def reset_cache(cls):
+        cls._tables = {}
+
+    def get_table(self,
+                  file_name: str,
+                  table_name: str,
+                  builder):
+        """
+        Return the lookup built by builder(file_path), only rebuilt when the file changed on disk
+        """
+        file_path = os.path.join(self.shared_folder, file_name)
+        stat = os.stat(file_path)
+        stamp = (stat.st_size, stat.st_mtime_ns)
+        key = (file_path, table_name)
+        cached = ReferenceData._tables.get(key)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        table = builder(file_path)
+        ReferenceData._tables[key] = (stamp, table)
+        return table
+
+    def uom_map(self):
+        """
+        UOM translation, key is the raw UOM ('see UOM'), value is the standard UOM ('use UOM')
+        """
+        def builder(file_path):
+            return pd.read_csv(file_path).set_index('see UOM').to_dict()['use UOM']
+        return self.get_table(self.uom_file, 'uom', builder)
+
+    def manufacturer_map(self):
+        """
+        Manufacturer code to manufacturer name
+        """
+        def builder(file_path):
+            mfn_map_df = pd.read_csv(file_path, dtype = str)
+            return mfn_map_df.set_index('Manufacturer')['Description'].to_dict()
+        return self.get_table(self.manufacturer_file, 'manufacturer', builder)
+
+    def vendor_map(self):
+        """
+        Vendor code to [vendor name, representative text (supplier)]
+        """
+        def builder(file_path):
+            vendor_map_df = pd.read_csv(file_path, dtype = str)
+            vendor_map_df = vendor_map_df[['Vendor', 'Vendor.VendorName', 'RepresentativeText']].copy()
+            vendor_map_df.loc[:, 'Vendor'] = vendor_map_df['Vendor'].fillna('unknown_vendorID')
+            return {k: [v, r] for k, v, r in zip(vendor_map_df['Vendor'],
+                                                 vendor_map_df['Vendor.VendorName'],
+                                                 vendor_map_df['RepresentativeText'])}
+        return self.get_table(self.vendor_file, 'vendor', builder)
+
+    def vendor_name_map(self):
+        return self.get_table(self.vendor_file, 'vendor_name',
+                              lambda file_path: {k: v[0] for k, v in self.vendor_map().items()})
+
+    def supplier_map(self):
+        return self.get_table(self.vendor_file, 'supplier',
+                              lambda file_path: {k: v[-1] for k, v in self.vendor_map().items()})
+
+    def item_uom_index(self):
+        """
+        ItemUOMIndex of the valid buying units of every item, loaded from the index saved next to
+        ItemUOM.csv when it was built from the same file, built (and saved) otherwise
+        """
+        def builder(file_path):
+            stat = os.stat(file_path)
+            fingerprint = f'{stat.st_size}-{stat.st_mtime_ns}'
+            index_path = os.path.splitext(file_path)[0] + '.uomidx.npz'
+            index = ItemUOMIndex.load(index_path, fingerprint)
+            if index is None:
+                print("indexing ItemUOM ......")
+                item_uom = pd.read_csv(file_path, dtype = str,
+                                       usecols = ['Item', 'UnitOfMeasure', 'UOMConversion', 'ValidForBuying'])
+                index = ItemUOMIndex.build(item_uom, fingerprint)
+                index.save(index_path)
+            return index
+        return self.get_table(self.item_uom_file, 'item_uom', builder)
+
+    def map_series(self,
+                   values: pd.Series,
+                   mapping: dict,
+                   default: str = 'TBD'):
+        """
+        Bulk lookup of a whole column, values not in the mapping get the default
+        (same as dict.get(value, default) cell by cell)
+        """
+        mapped = values.map(mapping)
+        return mapped.where(values.isin(list(mapping.keys())), default).astype(object)
@@ -1,7 +1,9 @@
-import pandas as pd
 import os
-from typing import Dict
-from datetime import datetime
+import numpy as np
+import pandas as pd
+import xlsxwriter
+from datetime import datetime, date, timedelta
+from pandas.api.types import is_bool, is_float, is_integer, is_scalar
 from FolderManager import FolderManager
 
 class ReportFurnishing:
@@ -92,6 +94,7 @@ class ReportFurnishing:
                                    'replace': ['Contract Number',
                                                'Mfg Part Num',
                                                'Vendor Part Num',
+                                               'Buyer Part Num',
                                                'Description',
                                                'Contract Price',
                                                'UOM',
@@ -108,59 +111,178 @@ class ReportFurnishing:
                                                       'Overlapping Line Count']
                                                       }
 
+    # DataFrame.to_excel defaults, the reports keep them for the cells they do not style
+    default_header_format = {'bold': True, 'border': 1, 'align': 'center', 'valign': 'top'}
+    date_format = 'YYYY-MM-DD'
+    datetime_format = 'YYYY-MM-DD HH:MM:SS'
+
+    def new_workbook(self, file_name: str):
+        """
+        xlsxwriter workbook in constant_memory mode: a row is flushed to disk as soon as the next one
+        starts, so memory stays flat whatever the report size but every sheet has to be written top to
+        bottom (header first) in one go.
+        Returns the workbook and its formats by name.
+        """
+        workbook = xlsxwriter.Workbook(os.path.join(self.output_file_path, file_name), {'constant_memory': True})
+        formats = {'ccx': self.header_format_ccx,
+                   'tp': self.header_format_tp,
+                   'custom': self.header_format_custom,
+                   'clear': self.header_format_clear,
+                   'default': self.default_header_format,
+                   'warning': self.cell_format_warning,
+                   'date': {'num_format': self.date_format},
+                   'datetime': {'num_format': self.datetime_format},
+                   'days': {'num_format': '0'}}
+        return workbook, {name: workbook.add_format(fmt) for name, fmt in formats.items()}
+
+    @staticmethod
+    def excel_cell(value):
+        """
+        (value, number format name, write kind) of a cell as DataFrame.to_excel writes it, value None
+        for a blank. Plain strings (no formula, url or blank, see Worksheet.write) can go straight to
+        write_string, anything else goes through write.
+        """
+        if is_scalar(value) and pd.isna(value):
+            return None, None, None
+        if is_integer(value):
+            return int(value), None, 'number'
+        if is_float(value):
+            value = float(value)
+            return ('inf' if value > 0 else '-inf', None, None) if np.isinf(value) else (value, None, 'number')
+        if is_bool(value):
+            return bool(value), None, 'boolean'
+        if isinstance(value, datetime):
+            return value, 'datetime', None
+        if isinstance(value, date):
+            return value, 'date', None
+        if isinstance(value, timedelta):
+            return value.total_seconds() / 86400, 'days', 'number'
+        value = str(value)
+        if value == '':
+            return None, None, None
+        return value, None, 'string' if value[0] not in '={' and ':' not in value else None
+
+    @staticmethod
+    def excel_serial(values: pd.Series):
+        """
+        Excel serial date numbers of a datetime64 column, computed as xlsxwriter does for each datetime
+        (days since 1899-12-31 plus the fraction of the day, one more for Excel's 1900 leap day).
+        None when a date falls before March 1900 or carries a time zone, those go cell by cell.
+        """
+        if values.dt.tz is not None or (values.notna() & (values < pd.Timestamp('1900-03-01'))).any():
+            return None
+        ns = (values - pd.Timestamp('1899-12-31')).to_numpy().astype('timedelta64[ns]').astype(np.int64)
+        day_ns = 86400 * 10**9
+        days, rest = np.divmod(ns, day_ns)
+        seconds, rest = np.divmod(rest, 10**9)
+        serial = days + (seconds.astype(float) + (rest // 1000).astype(float) / 1e6) / (60 * 60 * 24) + 1
+        return np.where(values.isna().to_numpy(), None, serial.astype(object)).tolist()
+
+    def excel_columns(self, df: pd.DataFrame):
+        """
+        Cells of every column converted once, as (values, format name(s), write kind(s)), so a frame
+        written in several sheets (one per contract) is not converted again per sheet.
+        Numeric and datetime columns are converted as whole columns, the rest cell by cell.
+        """
+        columns = []
+        for j in range(df.shape[1]):
+            col = df.iloc[:, j]
+            plain = isinstance(col.dtype, np.dtype)
+            if plain and pd.api.types.is_bool_dtype(col.dtype):
+                columns.append((col.tolist(), None, 'boolean'))
+                continue
+            if plain and pd.api.types.is_integer_dtype(col.dtype):
+                columns.append((col.tolist(), None, 'number'))
+                continue
+            if plain and pd.api.types.is_float_dtype(col.dtype):
+                values = col.to_numpy()
+                if not np.isinf(values).any():
+                    columns.append((np.where(np.isnan(values), None, values.astype(object)).tolist(), None, 'number'))
+                    continue
+            if pd.api.types.is_datetime64_any_dtype(col.dtype):
+                serial = self.excel_serial(col)
+                if serial is not None:
+                    columns.append((serial, 'datetime', 'number'))
+                    continue
+            cells = [self.excel_cell(value) for value in col.tolist()]
+            columns.append(([cell[0] for cell in cells], [cell[1] for cell in cells], [cell[2] for cell in cells]))
+        return columns
+
+    def write_sheet(self,
+                    workbook,
+                    formats: dict,
+                    sheet_name: str,
+                    header: list,
+                    columns: list,
+                    header_styles: dict = None,
+                    rows = None):
+        """
+        Stream a sheet: the header with its styles (format names by column position, the to_excel header
+        style elsewhere), then the rows (positions in columns, all of them when None) in order.
+        Blank cells are not written.
+        """
+        header_styles = header_styles or {}
+        worksheet = workbook.add_worksheet(sheet_name)
+        for col_num, name in enumerate(header):
+            worksheet.write(0, col_num, name, formats[header_styles.get(col_num, 'default')])
+        writers = {'number': worksheet.write_number,
+                   'string': worksheet.write_string,
+                   'boolean': worksheet.write_boolean,
+                   None: worksheet.write}
+        formats = {**formats, None: None}
+        n_rows = len(columns[0][0]) if len(columns) > 0 else 0
+        rows = range(n_rows) if rows is None else rows
+        for row_num, r in enumerate(rows, start = 1):
+            for col_num, (values, fmt, kind) in enumerate(columns):
+                value = values[r]
+                if value is None:
+                    continue
+                writers[kind[r] if kind.__class__ is list else kind](row_num, col_num, value,
+                                                                     formats[fmt[r] if fmt.__class__ is list else fmt])
+        return worksheet
+
     def make_dedup_report(self, 
-                          df_dedup: Dict[str, pd.DataFrame],
+                          df_dedup: pd.DataFrame,
                           df_summary: pd.DataFrame,
                           df_raw: pd.DataFrame):
-        
+        """
+        Summary tab, one tab per old contract of df_dedup (its 'Contract Number' column, in order of
+        appearance) and the raw reviewed lines. The contract tabs come from one groupby pass over the
+        converted cells, no per contract copy of the frame is made.
+        """
         file_name = f"dedup_output_{self.manufacturer}_{self.contract}_{self.datesig}.xlsx"
-        
-        df_summary.columns = self.report_header_dict['dedup_summary']   
-        with pd.ExcelWriter(os.path.join(self.output_file_path, file_name), engine='xlsxwriter') as writer:
-            df_summary.to_excel(writer, sheet_name='Summary', index=False)
-            workbook = writer.book
-            worksheet = writer.sheets['Summary']
-
-            header_format_ccx = workbook.add_format(self.header_format_ccx)
-            header_format_tp = workbook.add_format(self.header_format_tp)
-            header_format_custom = workbook.add_format(self.header_format_custom)
-            header_format_clear = workbook.add_format(self.header_format_clear)
+        workbook, formats = self.new_workbook(file_name)
 
-            header_styles_summary = {}
-            for col in range(0, 5):
-                header_styles_summary[col] = header_format_clear
+        summary_header = self.report_header_dict['dedup_summary']
+        worksheet = self.write_sheet(workbook, formats, 'Summary', summary_header, self.excel_columns(df_summary),
+                                     header_styles = {col: 'clear' for col in range(0, 5)})
+        worksheet.autofilter(0, 0, df_summary.shape[0], df_summary.shape[1]-1)
 
-            for col_num, fmt in header_styles_summary.items():
-                worksheet.write(0, col_num, df_summary.columns[col_num], fmt)
-            
-            worksheet.autofilter(0, 0, df_summary.shape[0], df_summary.shape[1]-1)
+        # optional trailing columns (fuzzy 'Match Type'/'Match Score') keep their names
+        header = self.report_header_dict['dedeup'] + list(df_dedup.columns[len(self.report_header_dict['dedeup']):])
+        header_styles = {}
+        for col in range(0, 11):
+            header_styles[col] = 'ccx'
+        for col in range(11, 13):
+            header_styles[col] = 'clear'
+        for col in range(13, 20):
+            header_styles[col] = 'tp'
+        for col in range(20, len(header)):
+            header_styles[col] = 'custom'
+        columns = self.excel_columns(df_dedup)
+        contract_col = df_dedup.iloc[:, header.index('Contract Number (Old)')]
+        groups = contract_col.groupby(contract_col, sort = False).indices
+        for key in contract_col.unique():
+            rows = groups[key]
+            worksheet = self.write_sheet(workbook, formats, key, header, columns, header_styles, rows)
+            worksheet.conditional_format(1, 0, len(rows), len(header)-1, {'type': 'cell',
+                                                                         'criteria': '==',
+                                                                         'value': '"Review"',
+                                                                         'format': formats['warning']})
+            worksheet.autofilter(0, 0, len(rows), len(header))
 
-            for key, df in df_dedup.items():
-                df.columns = self.report_header_dict['dedeup']
-                df.to_excel(writer, sheet_name=key, index=False)
-                worksheet = writer.sheets[key]
-                header_styles = {}
-                for col in range(0, 11):
-                    header_styles[col] = header_format_ccx
-                for col in range(11, 13):
-                    header_styles[col] = header_format_clear
-                for col in range(13, 20):
-                    header_styles[col] = header_format_tp
-                for col in range(20, 24):
-                    header_styles[col] = header_format_custom
-
-                for col_num, fmt in header_styles.items():
-                    worksheet.write(0, col_num, df.columns[col_num], fmt)
-            
-                cell_format_warning = workbook.add_format(self.cell_format_warning)
-                worksheet.conditional_format(1, 0, df.shape[0], df.shape[1]-1, {'type': 'cell',
-                                                                          'criteria': '==',
-                                                                          'value': '"Review"',
-                                                                          'format': cell_format_warning})
-                worksheet.autofilter(0, 0, df.shape[0], df.shape[1])
-            
-            df_raw.to_excel(writer, sheet_name='Raw', index=False)
-        
+        self.write_sheet(workbook, formats, 'Raw', list(df_raw.columns), self.excel_columns(df_raw))
+        workbook.close()
         return "Duplication report generated."
     
     
@@ -168,62 +290,43 @@ class ReportFurnishing:
                              df: pd.DataFrame,
                              sheet_name: str = "IM Match"):
         file_name = f"itemmast_match_{self.manufacturer}_{self.contract}_{self.datesig}.xlsx"
-        df.columns = self.report_header_dict['itemmast']
-        with pd.ExcelWriter(os.path.join(self.output_file_path, file_name), engine='xlsxwriter') as writer:
-            df.to_excel(writer, sheet_name=sheet_name, index=False)
-            workbook = writer.book
-            worksheet = writer.sheets[sheet_name]
-
-            header_format_tp = workbook.add_format(self.header_format_tp)
-            header_format_custom = workbook.add_format(self.header_format_custom)
-            header_format_clear = workbook.add_format(self.header_format_clear)
+        # optional trailing columns (description-first 'Match Type') keep their names
+        header = self.report_header_dict['itemmast'] + list(df.columns[len(self.report_header_dict['itemmast']):])
+        header_styles = {}
+        for col in range(0, 10):
+            header_styles[col] = 'tp'
+        for col in range(10, 14):
+            header_styles[col] = 'clear'
+        for col in range(14, len(header)):
+            header_styles[col] = 'custom'
 
-            header_styles = {}
-            for col in range(0, 10):
-                header_styles[col] = header_format_tp
-            for col in range(10, 14):
-                header_styles[col] = header_format_clear
-            for col in range(14, 21):
-                header_styles[col] = header_format_custom
-
-            for col_num, fmt in header_styles.items():
-                worksheet.write(0, col_num, df.columns[col_num], fmt)
-            
-            cell_format_warning = workbook.add_format(self.cell_format_warning)
-            worksheet.conditional_format(1, 0, df.shape[0], df.shape[1], {'type': 'cell',
-                                                                          'criteria': '==',
-                                                                          'value': '"Failed"',
-                                                                          'format': cell_format_warning})
-            worksheet.autofilter(0, 0, df.shape[0], df.shape[1]-1)
-        
+        workbook, formats = self.new_workbook(file_name)
+        worksheet = self.write_sheet(workbook, formats, sheet_name, header, self.excel_columns(df), header_styles)
+        worksheet.conditional_format(1, 0, df.shape[0], df.shape[1], {'type': 'cell',
+                                                                      'criteria': '==',
+                                                                      'value': '"Failed"',
+                                                                      'format': formats['warning']})
+        worksheet.autofilter(0, 0, df.shape[0], df.shape[1]-1)
+        workbook.close()
         return "Itemmast report generated."
     
     def make_replace_report(self,
                             df: pd.DataFrame,
                             sheet_name: str = "NoReplacement"):
         file_name = f"replacement_leftover_{self.manufacturer}_{self.contract}_{self.datesig}.xlsx"
-        df.columns = self.report_header_dict['replace']
-        with pd.ExcelWriter(os.path.join(self.output_file_path, file_name), engine='xlsxwriter') as writer:
-            df.to_excel(writer, sheet_name=sheet_name, index=False)
-            workbook = writer.book
-            worksheet = writer.sheets[sheet_name]
-
-            header_format_ccx = workbook.add_format(self.header_format_ccx)
-            header_format_clear = workbook.add_format(self.header_format_clear)
-
-            header_styles = {}
-            for col in range(0, 10):
-                header_styles[col] = header_format_ccx
-            for col in range(10, 13):
-                header_styles[col] = header_format_clear
+        header = self.report_header_dict['replace']
+        header_styles = {}
+        for col in range(0, 10):
+            header_styles[col] = 'ccx'
+        for col in range(10, 13):
+            header_styles[col] = 'clear'
 
-            for col_num, fmt in header_styles.items():
-                worksheet.write(0, col_num, df.columns[col_num], fmt)
-            
-            cell_format_warning = workbook.add_format(self.cell_format_warning)
-            worksheet.conditional_format(1, 0, df.shape[0], df.shape[1], {'type': 'cell',
-                                                                          'criteria': '==',
-                                                                          'value': '"Immast"',
-                                                                          'format': cell_format_warning})
-            worksheet.autofilter(0, 0, df.shape[0], df.shape[1]-1)
-        return "Replacement leftover report generated."
\ No newline at end of file
+        workbook, formats = self.new_workbook(file_name)
+        worksheet = self.write_sheet(workbook, formats, sheet_name, header, self.excel_columns(df), header_styles)
+        worksheet.conditional_format(1, 0, df.shape[0], df.shape[1], {'type': 'cell',
+                                                                      'criteria': '==',
+                                                                      'value': '"Immast"',
+                                                                      'format': formats['warning']})
+        worksheet.autofilter(0, 0, df.shape[0], df.shape[1]-1)
+        workbook.close()
+        return "Replacement leftover report generated."
@@ -0,0 +1,137 @@
+import os
+import json
+from TypesDefinition import CheckMode, ProcessType
+
+class RunSpec:
+    """
+    Run specification for headless (non-interactive) runs, loaded from a YAML or JSON file.
+    It names the project (manufacturer, contract), the process to run and supplies the answer
+    to every prompt FileProcessor would otherwise ask with input(). Example:
+
+        manufacturer: Bard Medical Division
+        contract: L0000000000052
+        process_type: full_process
+        check_mode: MFN RF
+        auto_accept_reviews: true
+        answers:
+          search_term: Bard|BD
+          replacement_contract: L0000000000031
+
+    Answers not given fall back to default_answers, a prompt with no answer at all stops the run.
+    With auto_accept_reviews on, the scoping and duplication review files are taken as reviewed
+    as they are generated, unless a reviewed file has already been put in the output folder.
+    profile_memory adds tracemalloc peaks to the run report, profile_cprofile dumps a cProfile per stage
+    (see Profiler.StageProfiler).
+    prefetch starts the heavy work of the next steps in the background while a review prompt waits
+    (see Prefetcher), interactive runs always do, headless prompts are answered right away.
+    fuzzy_match adds near-miss part numbers to the duplication search, efficient_similarity scores
+    identical and close descriptions without the model and description_match adds item master items
+    matched by description, all three off by default and never asked.
+    """
+
+    process_type_map = {'pre_check': ProcessType.pre_check,
+                        'scoping': ProcessType.scoping,
+                        'standardize_all_and_stack': ProcessType.standardize_all_and_stack,
+                        'dup_search_and_compare': ProcessType.dup_search_and_compare,
+                        'itemmast_search_and_compare': ProcessType.itemmast_search_and_compare,
+                        'replacement_contract_pair_check': ProcessType.replacement_contract_pair_check,
+                        'ccx_dup_search_and_itemmast_match': ProcessType.ccx_dup_search_and_itemmast_match,
+                        'full_process': ProcessType.full_process}
+
+    check_mode_map = {'MFN': CheckMode.MFN,
+                      'MFN RF': CheckMode.MFN_RF}
+
+    default_answers = {'file_ready': 'y',
+                       'pre_check_retry': 'e',
+                       'scoping_reviewed': 'y',
+                       'scoping_retry': 'e',
+                       'default_search_term': 'y',
+                       'search_term': None,
+                       're_scoping': 'n',
+                       'ccx_downloaded': 'y',
+                       'data_dump': 'n',
+                       'standard_dup_run': 'y',
+                       'base_set': 'TP',
+                       'search_set': 'CCX',
+                       'quarantine_hot_keys': 'n',
+                       'dup_review_completed': 'y',
+                       'replacement_contract': None,
+                       'resume': 'y'}
+
+    def __init__(self,
+                 manufacturer: str,
+                 contract: str,
+                 process_type: str = 'full_process',
+                 check_mode: str = 'MFN RF',
+                 data_caching: bool = True,
+                 auto_accept_reviews: bool = False,
+                 profile_memory: bool = False,
+                 profile_cprofile: bool = False,
+                 prefetch: bool = False,
+                 fuzzy_match: bool = False,
+                 efficient_similarity: bool = False,
+                 description_match: bool = False,
+                 answers: dict = None):
+        if process_type not in self.process_type_map:
+            raise ValueError(f"unknown process type '{process_type}', use one of {list(self.process_type_map)}")
+        if check_mode not in self.check_mode_map:
+            raise ValueError(f"unknown check mode '{check_mode}', use one of {list(self.check_mode_map)}")
+        unknown = set(answers or {}).difference(self.default_answers)
+        if len(unknown) > 0:
+            raise ValueError(f"unknown answer(s) {sorted(unknown)}, use any of {list(self.default_answers)}")
+        self.manufacturer = str(manufacturer).strip()
+        self.contract = str(contract).strip()
+        self.process_type_name = process_type
+        self.process_type = self.process_type_map[process_type]
+        self.check_mode = self.check_mode_map[check_mode]
+        self.data_caching = data_caching
+        self.auto_accept_reviews = auto_accept_reviews
+        self.profile_memory = profile_memory
+        self.profile_cprofile = profile_cprofile
+        self.prefetch = prefetch
+        self.fuzzy_match = fuzzy_match
+        self.efficient_similarity = efficient_similarity
+        self.description_match = description_match
+        self.answers = dict(self.default_answers)
+        self.answers.update(answers or {})
+
+    @classmethod
+    def from_dict(cls, spec: dict):
+        spec = dict(spec)
+        for key in ['manufacturer', 'contract']:
+            if key not in spec:
+                raise ValueError(f"run spec is missing '{key}'")
+        return cls(**spec)
+
+    @staticmethod
+    def load_file(file_path: str):
+        """
+        Read a .yaml/.yml or .json run spec (or batch manifest) into a dictionary
+        """
+        with open(file_path, 'r', encoding = 'utf-8') as f:
+            if os.path.splitext(file_path)[1].lower() in ['.yaml', '.yml']:
+                import yaml
+                return yaml.safe_load(f)
+            return json.load(f)
+
+    @classmethod
+    def from_file(cls, file_path: str):
+        """
+        Load a run spec from a .yaml/.yml or .json file
+        """
+        return cls.from_dict(cls.load_file(file_path))
+
+    def answer(self,
+               key: str,
+               prompt: str = ''):
+        """
+        Answer of a prompt as input() would return it (a string), booleans become 'y'/'n'
+        """
+        value = self.answers.get(key)
+        if value is None:
+            raise ValueError(f"run spec has no answer for '{key}' (prompt: {prompt.strip()})")
+        if isinstance(value, bool):
+            return 'y' if value else 'n'
+        if isinstance(value, (list, tuple)):
+            return ','.join(str(v) for v in value)
+        return str(value)
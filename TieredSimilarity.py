@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+
+class TieredSimilarity:
+    """
+    Description similarity of (desc1, desc2) pairs sending as few pairs as possible to the
+    embedding model. Every pair is scored by the first tier that can:
+    - exact: the same description once normalized (case, punctuation and spacing ignored), 1.0
+    - lexical: pairs the caller allows a lexical score (e.g. lines of the target manufacturer) whose
+      token Jaccard or character 3-gram Dice overlap reaches min_lexical_score and that carry the same
+      numbers (size 7 and size 8 overlap a lot but are other products), scored by the higher of the two
+    - model: everything else, cosine similarity of the description embeddings (EmbeddingEngine)
+    Pairs missing a description score 0 (tier 'missing') as they do in pair_similarity.
+    """
+
+    q = 3
+    min_lexical_score = 0.8
+
+    def __init__(self,
+                 engine,
+                 min_lexical_score: float = None):
+        self.engine = engine
+        self.min_lexical_score = min_lexical_score or self.min_lexical_score
+        self.counts = {}
+
+    @staticmethod
+    def normalize(descriptions: pd.Series):
+        """
+        upper case words and numbers separated by single spaces, NaN stays NaN
+        """
+        text = descriptions.astype(str).str.upper().str.replace(r'[\W_]+', ' ', regex = True).str.strip()
+        return text.where(descriptions.notna(), np.nan)
+
+    @classmethod
+    def grams(cls, text: str):
+        padded = f' {text} '
+        return {padded[i:i + cls.q] for i in range(len(padded) - cls.q + 1)}
+
+    @classmethod
+    def lexical_score(cls,
+                      text1: str,
+                      text2: str):
+        """
+        max(token Jaccard, character 3-gram Dice) of two normalized descriptions, 0 when their
+        tokens holding digits differ
+        """
+        tokens1, tokens2 = set(text1.split()), set(text2.split())
+        if {t for t in tokens1 if any(c.isdigit() for c in t)} != {t for t in tokens2 if any(c.isdigit() for c in t)}:
+            return 0.0
+        tokens = tokens1 | tokens2
+        token_score = len(tokens1 & tokens2) / len(tokens) if len(tokens) > 0 else 0.0
+        grams1, grams2 = cls.grams(text1), cls.grams(text2)
+        gram_score = 2 * len(grams1 & grams2) / (len(grams1) + len(grams2))
+        return max(token_score, gram_score)
+
+    def score(self,
+              left,
+              right,
+              lexical_ok = None):
+        """
+        Similarity and tier of each (left[i], right[i]) pair, lexical_ok (boolean per pair) tells which
+        pairs may take the lexical tier, none do without it
+        """
+        left = pd.Series(left, dtype = object).reset_index(drop = True)
+        right = pd.Series(right, dtype = object).reset_index(drop = True)
+        sims = np.zeros(len(left), dtype = np.float64)
+        tiers = np.full(len(left), 'missing', dtype = object)
+        norm_left, norm_right = self.normalize(left), self.normalize(right)
+        rest = (norm_left.notna() & norm_right.notna()).to_numpy()
+
+        # descriptions without a word or number (e.g. '--') say nothing, the model takes them
+        worded = rest & (norm_left != '').to_numpy() & (norm_right != '').to_numpy()
+        exact = worded & (norm_left == norm_right).to_numpy()
+        sims[exact] = 1.0
+        tiers[exact] = 'exact'
+        rest &= ~exact
+
+        if lexical_ok is not None:
+            candidates = np.flatnonzero(rest & worded & np.asarray(lexical_ok, dtype = bool))
+            lexical = np.array([self.lexical_score(text1, text2) for text1, text2 in
+                                zip(norm_left.to_numpy()[candidates], norm_right.to_numpy()[candidates])], dtype = np.float64)
+            strong = candidates[lexical >= self.min_lexical_score]
+            sims[strong] = lexical[lexical >= self.min_lexical_score]
+            tiers[strong] = 'lexical'
+            rest[strong] = False
+
+        model = np.flatnonzero(rest)
+        if len(model) > 0:
+            sims[model] = self.engine.pair_similarity(left[model], right[model])
+            tiers[model] = 'model'
+
+        present = (left.notna() & right.notna()).to_numpy()
+        self.counts = {tier: int((tiers == tier).sum()) for tier in ['exact', 'lexical', 'model', 'missing']}
+        self.counts['descriptions'] = len(set(left[present]) | set(right[present]))
+        self.counts['descriptions_encoded'] = len(set(left[model]) | set(right[model]))
+        print(f"description similarity of {len(left)} pair(s): {self.counts['exact']} identical, "
+              f"{self.counts['lexical']} lexical, {self.counts['model']} by the model, "
+              f"{self.counts['exact'] + self.counts['lexical']} model pair(s) avoided "
+              f"({self.counts['descriptions'] - self.counts['descriptions_encoded']} of "
+              f"{self.counts['descriptions']} distinct descriptions not encoded)")
+        return sims, tiers
@@ -0,0 +1,79 @@
+"""
+Benchmark for DescriptionIndex: top-k description neighbours of a batch of TP lines over an item
+master sized index of unit vectors (random vectors stand in for the sentence embeddings, the search
+does not care). Compares the blocked batch search with one query at a time and with scikit-learn
+NearestNeighbors (brute force cosine), and checks all three return the same neighbours.
+
+run from the repository root:
+    python -m benchmarks.bench_description_index --items 200000 --queries 2000 --dim 384
+"""
+import os
+import sys
+import time
+import argparse
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from DescriptionIndex import DescriptionIndex
+
+
+def unit_vectors(rows: int,
+                 dim: int,
+                 seed: int):
+    vectors = np.random.default_rng(seed).standard_normal((rows, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis = 1, keepdims = True)
+
+
+def one_at_a_time(index: DescriptionIndex,
+                  queries: np.ndarray,
+                  k: int):
+    positions = np.zeros((len(queries), k), dtype = np.int64)
+    for i, query in enumerate(queries):
+        scores = index.vectors @ query
+        top = np.argpartition(-scores, k - 1)[:k]
+        positions[i] = top[np.argsort(-scores[top], kind = 'stable')]
+    return positions
+
+
+def run(items: int = 200000,
+        queries: int = 2000,
+        dim: int = 384,
+        k: int = 5):
+    index = DescriptionIndex([str(i) for i in range(items)], unit_vectors(items, dim, 0))
+    query_vectors = unit_vectors(queries, dim, 1)
+    print(f"{items:,} item master descriptions, {queries:,} TP descriptions, dim {dim}, top {k}")
+
+    start = time.perf_counter()
+    positions, _ = index.search(query_vectors, k)
+    batch_s = time.perf_counter() - start
+    print(f"{'blocked batch search':<26}{batch_s:>8.2f} s")
+
+    sample = min(queries, 200)
+    start = time.perf_counter()
+    single = one_at_a_time(index, query_vectors[:sample], k)
+    single_s = (time.perf_counter() - start) * queries / sample
+    assert np.array_equal(single, positions[:sample])
+    print(f"{'one query at a time':<26}{single_s:>8.2f} s  (extrapolated from {sample})")
+
+    try:
+        from sklearn.neighbors import NearestNeighbors
+    except ImportError:
+        return None
+    start = time.perf_counter()
+    neighbours = NearestNeighbors(n_neighbors = k, metric = 'cosine', algorithm = 'brute').fit(index.vectors)
+    sk_positions = neighbours.kneighbors(query_vectors, return_distance = False)
+    sklearn_s = time.perf_counter() - start
+    print(f"{'sklearn NearestNeighbors':<26}{sklearn_s:>8.2f} s")
+    same = (sk_positions == positions).all(axis = 1).mean()
+    print(f"same neighbours as sklearn for {same:.1%} of the queries")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'description index benchmark')
+    parser.add_argument('--items', type = int, default = 200000)
+    parser.add_argument('--queries', type = int, default = 2000)
+    parser.add_argument('--dim', type = int, default = 384)
+    parser.add_argument('--k', type = int, default = 5)
+    args = parser.parse_args()
+    run(args.items, args.queries, args.dim, args.k)
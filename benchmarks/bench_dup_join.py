@@ -0,0 +1,95 @@
+"""
+Benchmark for JoinEngine on a skewed duplication search: TP lines against CCX lines where a share of
+the part numbers on both sides reduce to '0'/'1' (MFN_reformat of '000', '0-0', '001' ...), joined
+with a plain merge carrying every column the way dup_search_and_compare used to, with JoinEngine
+chunked (hot keys joined anyway, the ones over the join budget left out) and with all the hot keys
+quarantined. Each join runs in
+its own process so the peak RSS is its own.
+
+run from the repository root:
+    python -m benchmarks.bench_dup_join --tp 20000 --ccx 400000 --degenerate 0.01
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+import numpy as np
+import pandas as pd
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from JoinEngine import JoinEngine
+from FileProcessor import FileProcessor
+from Profiler import memory_status
+
+LEFT_COLS = ['Source System', 'Contract Number', 'MFN', 'VN', 'IN', 'Description', 'UnitCost', 'UOM', 'QOE',
+             'Effective Date', 'Expiration Date', 'seq', 'MFN RF']
+# stacked_std columns dup_search_and_compare no longer carries for the search set
+FLAG_COLS = ['Contract', 'OnHold', 'ActiveLine', 'ContractLineState', 'Contract.ContractStatus', 'ContractImport', 'count']
+
+
+def make_lines(rows: int,
+               source: str,
+               degenerate: float,
+               rng: np.random.Generator):
+    mfn = rng.integers(10**5, 2 * 10**5, rows).astype(str)
+    bad = rng.uniform(0, 1, rows) < degenerate
+    mfn[bad] = rng.choice(['0', '1'], bad.sum())
+    lines = pd.DataFrame({'Source System': source, 'Contract Number': np.char.add('L', rng.integers(0, 50, rows).astype(str)),
+                          'MFN': mfn, 'VN': np.char.add('V', mfn), 'IN': np.nan,
+                          'Description': np.char.add('CATHETER FR STERILE ', mfn), 'UnitCost': np.round(rng.uniform(1, 500, rows), 2),
+                          'UOM': rng.choice(['EA', 'BX', 'CS'], rows), 'QOE': rng.choice([1.0, 10.0, 100.0], rows),
+                          'Effective Date': '2024-01-01', 'Expiration Date': '2026-12-31',
+                          'Contract Line': rng.integers(1, 10**5, rows).astype(str), 'Manufacturer': 'Bench', 'Vendor': 'Bench',
+                          'ItemType': np.nan, 'FileName': 'Not Applicable', 'seq': [f'{source.lower()}{i}' for i in range(rows)],
+                          'MFN RF': mfn, 'ExpiredFlag': 'Non Expired', 'Active Rank': '1'})
+    for col in FLAG_COLS:
+        lines.loc[:, col] = 'Not Applicable' if col != 'count' else 1
+    return lines
+
+
+def run_one(mode: str, tp: int, ccx: int, degenerate: float):
+    rng = np.random.default_rng(0)
+    left = make_lines(tp, 'TP', degenerate, rng)[LEFT_COLS]
+    right = make_lines(ccx, 'CCX', degenerate, rng)
+    rss_before = memory_status()[0]
+    start = time.perf_counter()
+    if mode == 'merge':
+        rows = len(left.merge(right, on = ['MFN RF']))
+    else:
+        right = right[[col for col in right.columns if col in FileProcessor.dup_search_cols]]
+        engine = JoinEngine()
+        estimate = engine.estimate(left['MFN RF'], right['MFN RF'])
+        exclude = estimate.loc[estimate['Hot Key' if mode == 'quarantined' else 'Over Budget'], 'Key'].tolist()
+        rows = len(engine.join(left, right, 'MFN RF', exclude = exclude))
+    elapsed = time.perf_counter() - start
+    return {'mode': mode, 'rows': rows, 'seconds': elapsed, 'peak_rss': memory_status()[1], 'rss_before': rss_before}
+
+
+def run(tp: int = 20000,
+        ccx: int = 400000,
+        degenerate: float = 0.01):
+    print(f"{tp:,} TP lines against {ccx:,} CCX lines, {degenerate:.1%} of the part numbers reduce to '0'/'1'")
+    for mode in ['merge', 'chunked', 'quarantined']:
+        code = (f"import sys, json; sys.path.insert(0, {REPO_ROOT!r}); from benchmarks.bench_dup_join import run_one; "
+                f"print(json.dumps(run_one({mode!r}, {tp}, {ccx}, {degenerate})))")
+        result = subprocess.run([sys.executable, '-c', code], capture_output = True, text = True)
+        if result.returncode != 0:
+            # a join too big for the machine is killed by the kernel (SIGKILL)
+            print(f"{mode:<13}failed (exit code {result.returncode})")
+            continue
+        stats = json.loads(result.stdout.strip().splitlines()[-1])
+        print(f"{mode:<13}{stats['rows']:>12,} rows {stats['seconds']:8.1f} s   peak RSS {stats['peak_rss']/2**20:,.0f} MB "
+              f"(lines alone {stats['rss_before']/2**20:,.0f} MB)")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'duplication join benchmark')
+    parser.add_argument('--tp', type = int, default = 20000)
+    parser.add_argument('--ccx', type = int, default = 400000)
+    parser.add_argument('--degenerate', type = float, default = 0.01)
+    args = parser.parse_args()
+    run(args.tp, args.ccx, args.degenerate)
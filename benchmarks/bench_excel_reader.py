@@ -0,0 +1,87 @@
+"""
+Benchmark for ExcelReader: a folder of multi-tab TP workbooks (template columns plus the extra
+columns suppliers tend to leave in) read the way pre_check used to (pd.read_excel per file, every
+tab, every column) against ExcelReader serial and with its process pool. The frames are checked to
+be identical to pd.read_excel restricted to the template columns.
+
+run from the repository root:
+    python -m benchmarks.bench_excel_reader --files 12 --tabs 4 --rows 20000
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ExcelReader import ExcelReader
+from FileProcessor import FileProcessor
+
+EXTRA_COLS = ['Category', 'Notes', 'Country of Origin', 'GTIN', 'Pack Size', 'Supplier SKU']
+
+
+def write_workbook(path: str,
+                   tabs: int,
+                   rows: int,
+                   rng: np.random.Generator):
+    workbook = Workbook(write_only = True)
+    for t in range(tabs):
+        sheet = workbook.create_sheet(f'L{rng.integers(10**12):013d}')
+        sheet.append(FileProcessor.tp_template_cols + EXTRA_COLS)
+        mfn = rng.integers(10**5, 10**9, rows)
+        price = np.round(rng.uniform(1, 5000, rows), 2)
+        qoe = rng.choice([1, 10, 12, 100], rows)
+        uom = rng.choice(['EA', 'BX', 'CS', 'PK'], rows)
+        for i in range(rows):
+            sheet.append([f'AB-{mfn[i]}', f'V{mfn[i]}', None, f'CATHETER {mfn[i] % 997} FR STERILE',
+                          float(price[i]), uom[i], int(qoe[i]), '2024-01-01', '2026-12-31',
+                          'Medical', 'n/a', 'US', f'00{mfn[i]}{i % 10}', f'{qoe[i]}/{uom[i]}', f'S{i}'])
+    workbook.save(path)
+    return path
+
+
+def run(files: int = 12,
+        tabs: int = 4,
+        rows: int = 20000,
+        seed: int = 0):
+    folder = tempfile.mkdtemp(prefix = 'excel_bench_')
+    try:
+        rng = np.random.default_rng(seed)
+        paths = [write_workbook(os.path.join(folder, f'tp_{i:02d}.xlsx'), tabs, rows, rng) for i in range(files)]
+        size = sum(os.path.getsize(path) for path in paths)
+        print(f"{files} workbooks x {tabs} tabs x {rows:,} rows ({size/2**20:,.1f} MB)")
+
+        start = time.perf_counter()
+        expected = []
+        for path in paths:
+            for tab, df in pd.read_excel(path, sheet_name = None, dtype = str).items():
+                expected.append((path, tab, df[FileProcessor.tp_template_cols]))
+        read_excel_s = time.perf_counter() - start
+        print(f"pd.read_excel                 {read_excel_s:8.2f} s")
+
+        for name, reader in [('ExcelReader, 1 process', ExcelReader(max_workers = 1)),
+                             (f'ExcelReader, {ExcelReader().max_workers} processes', ExcelReader())]:
+            start = time.perf_counter()
+            got = reader.read(paths, usecols = FileProcessor.tp_template_cols, all_tabs = True)
+            elapsed = time.perf_counter() - start
+            assert [g[:2] for g in got] == [e[:2] for e in expected]
+            for (_, _, df), (_, _, ref) in zip(got, expected):
+                pd.testing.assert_frame_equal(df, ref)
+            print(f"{name:<30}{elapsed:8.2f} s  ({read_excel_s / elapsed:.2f}x, identical frames)")
+    finally:
+        shutil.rmtree(folder, ignore_errors = True)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'excel ingestion benchmark')
+    parser.add_argument('--files', type = int, default = 12)
+    parser.add_argument('--tabs', type = int, default = 4)
+    parser.add_argument('--rows', type = int, default = 20000)
+    parser.add_argument('--seed', type = int, default = 0)
+    args = parser.parse_args()
+    run(args.files, args.tabs, args.rows, args.seed)
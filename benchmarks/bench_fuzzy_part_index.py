@@ -0,0 +1,91 @@
+"""
+Benchmark for FuzzyPartIndex: near-miss lookup of TP part numbers (revision letter added, slash for
+dash, one transposed or mistyped character) against a catalog the size of Infor.
+Reports the one-off build time and the lookup time per TP item. On a smaller catalog the index
+results are checked against a brute force edit distance over every key, so no match is missed.
+
+run from the repository root:
+    python -m benchmarks.bench_fuzzy_part_index --rows 1000000 --keys 500
+"""
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from FuzzyPartIndex import FuzzyPartIndex
+
+
+def make_catalog(rows: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    mfn = np.char.add(rng.choice(['', '0', 'AB', 'RX-', 'K'], rows), rng.integers(10, 99999999, rows).astype(str))
+    mfn = np.char.add(mfn, rng.choice(['', '-1', '/A', '.5'], rows))
+    return pd.Series(mfn, dtype = object)
+
+
+def near_misses(catalog: pd.Series,
+                keys: int,
+                seed: int = 1):
+    rng = np.random.default_rng(seed)
+    out = []
+    for i, mfn in enumerate(catalog.sample(keys, random_state = seed)):
+        chars = list(mfn.replace('-', '/'))
+        p = int(rng.integers(0, len(chars) - 1))
+        kind = i % 4
+        if kind == 0:
+            chars.append('R')
+        elif kind == 1:
+            chars[p], chars[p + 1] = chars[p + 1], chars[p]
+        elif kind == 2:
+            chars[p] = '7' if chars[p] != '7' else '3'
+        out.append(''.join(chars))
+    return pd.Series(out, dtype = object)
+
+
+def check_against_brute_force(rows: int, keys: int):
+    catalog = make_catalog(rows, seed = 2)
+    index = FuzzyPartIndex.build(catalog)
+    for key in FuzzyPartIndex.fuzzy_key_series(near_misses(catalog, keys, seed = 3)).unique():
+        distance = index.allowed_distance(key)
+        expected = {k for k in index.keys if FuzzyPartIndex.edit_distance(key, k, distance) <= distance}
+        assert expected == {k for k, _ in index.search_key(key)}, key
+    return True
+
+
+def run(rows: int = 1000000,
+        keys: int = 500):
+    check_against_brute_force(20000, 50)
+    print("index results identical to a brute force search (20,000 part numbers, 50 queries)")
+
+    catalog = make_catalog(rows)
+    start = time.perf_counter()
+    index = FuzzyPartIndex.build(catalog)
+    build_s = time.perf_counter() - start
+
+    queries = near_misses(catalog, keys)
+    start = time.perf_counter()
+    matches = index.match(queries)
+    match_s = time.perf_counter() - start
+    found = matches['Fuzzy Key'].nunique()
+    per_item = [timeit(lambda: index.search(q)) for q in queries[:50]]
+
+    print(f"{rows:,} catalog part numbers ({len(index.keys):,} distinct keys), index build {build_s:.2f} s")
+    print(f"{keys} near-miss TP part numbers, {found} found, {len(matches)} key pairs")
+    print(f"lookup per TP item: mean {match_s/keys*1000:.1f} ms, worst {max(per_item)*1000:.1f} ms")
+
+
+def timeit(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'fuzzy part number index benchmark')
+    parser.add_argument('--rows', type = int, default = 1000000)
+    parser.add_argument('--keys', type = int, default = 500)
+    args = parser.parse_args()
+    run(args.rows, args.keys)
@@ -0,0 +1,80 @@
+"""
+Cold-start benchmark per process type.
+Every process type is timed in a fresh python interpreter: import FileProcessor (what main.py/App.py do
+at start up), and for the process types that compute description similarity also import the ML stack
+the way set_model/EmbeddingEngine does on first use. Wall time and peak RSS of the child are reported,
+together with the old eager behaviour (sentence_transformers imported at module load) as reference.
+
+run from the repository root:
+    python -m benchmarks.bench_import_time --repeat 3
+"""
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# process types (see main.py) and whether they ever touch the sentence transformer model
+PROCESS_TYPES = [('pre_check', False),
+                 ('scoping', False),
+                 ('standardize_all_and_stack', False),
+                 ('replacement_contract_pair_check', False),
+                 ('dup_search_and_compare', True),
+                 ('itemmast_search_and_compare', True),
+                 ('ccx_dup_search_and_itemmast_match', True),
+                 ('full_process', True)]
+
+CHILD_CODE = """
+import json, sys, time
+start = time.perf_counter()
+if {eager}:
+    import sentence_transformers
+import FileProcessor
+import_done = time.perf_counter()
+if {needs_model}:
+    import sentence_transformers
+ml_done = time.perf_counter()
+try:
+    import resource
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_rss = peak_rss if sys.platform == 'darwin' else peak_rss * 1024
+except ImportError:
+    peak_rss = None
+print(json.dumps({{'import_s': import_done - start,
+                  'total_s': ml_done - start,
+                  'peak_rss': peak_rss}}))
+"""
+
+
+def measure(needs_model: bool,
+            eager: bool = False):
+    code = CHILD_CODE.format(eager = eager, needs_model = needs_model)
+    result = subprocess.run([sys.executable, '-c', code], cwd = REPO_ROOT,
+                            capture_output = True, text = True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def run(repeat: int = 3):
+    rows = []
+    for process_type, needs_model in PROCESS_TYPES:
+        for mode, eager in [('lazy', False), ('eager', True)]:
+            samples = [measure(needs_model, eager) for _ in range(repeat)]
+            best = min(samples, key = lambda x: x['total_s'])
+            rows.append((process_type, mode, best))
+
+    print(f"{'process type':<38}{'mode':<8}{'import FileProcessor':>22}{'cold start':>12}{'peak RSS':>12}")
+    for process_type, mode, best in rows:
+        rss = f"{best['peak_rss']/2**20:,.0f} MB" if best['peak_rss'] else 'n/a'
+        print(f"{process_type:<38}{mode:<8}{best['import_s']:>20.2f} s{best['total_s']:>10.2f} s{rss:>12}")
+    return rows
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'cold start time per process type')
+    parser.add_argument('--repeat', type = int, default = 3)
+    args = parser.parse_args()
+    run(args.repeat)
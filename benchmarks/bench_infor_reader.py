@@ -0,0 +1,145 @@
+"""
+Benchmark for the Infor ContractLine reader (FileProcessor.read_csv_projected).
+A synthetic export as wide as the real one (the ~20 columns we use plus filler columns) is written
+to a temp folder, then read in a fresh interpreter per mode so peak RSS is comparable:
+    legacy    - pd.read_csv(dtype = str) of every column, then the projection
+    projected - usecols + categorical status/manufacturer/vendor columns
+    chunked   - the same, parsed in chunks (FileProcessor.csv_chunksize)
+The standardized output of the legacy and the projected read is checked to be identical.
+
+run from the repository root:
+    python -m benchmarks.bench_infor_reader --rows 300000 --extra-cols 45
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+import numpy as np
+import pandas as pd
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from FileProcessor import FileProcessor
+from FolderManager import FolderManager
+
+INFOR_COLS = ['Contract.WorkingContractID', 'ManufacturerNumber', 'VendorItem', 'ItemNumber',
+              'ItemDescription', 'BaseCost', 'UOM', 'DerivedUOMConversion', 'EffectiveDate', 'ExpirationDate',
+              'ContractLine', 'Manufacturer', 'Vendor', 'Contract', 'ItemType', 'OnHold', 'ActiveLine',
+              'ContractLineState', 'Contract.ContractStatus']
+
+CHILD_CODE = """
+import sys, json, time, resource
+sys.path.insert(0, {repo!r})
+import pandas as pd
+from FileProcessor import FileProcessor
+from FolderManager import FolderManager
+start = time.perf_counter()
+if {mode!r} == 'legacy':
+    df = pd.read_csv({path!r}, dtype = str)[{cols!r}].copy()
+else:
+    FileProcessor.csv_chunksize = {chunksize!r} if {mode!r} == 'chunked' else None
+    df = FileProcessor(FolderManager('bench', 'bench')).read_csv_projected({path!r}, {cols!r})
+elapsed = time.perf_counter() - start
+try:
+    # ru_maxrss keeps the parent's high water mark over exec on linux, VmHWM is this process only
+    with open('/proc/self/status') as f:
+        peak_rss = [int(l.split()[1]) * 1024 for l in f if l.startswith('VmHWM')][0]
+except OSError:
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_rss = peak_rss if sys.platform == 'darwin' else peak_rss * 1024
+print(json.dumps({{'elapsed_s': elapsed, 'peak_rss': peak_rss,
+                  'frame_bytes': int(df.memory_usage(deep = True).sum())}}))
+"""
+
+
+def write_export(path: str,
+                 rows: int,
+                 extra_cols: int,
+                 seed: int = 0):
+    rng = np.random.default_rng(seed)
+    def pick(values, p_null = 0.0):
+        out = rng.choice(np.array(values, dtype = object), rows)
+        out[rng.random(rows) < p_null] = np.nan
+        return out
+    dates = (pd.Timestamp('2020-01-01') + pd.to_timedelta(rng.integers(0, 3650, rows), unit = 'D')).strftime('%m/%d/%Y')
+    export = pd.DataFrame({'Contract.WorkingContractID': pick([f'L{i:06d}' for i in range(2000)]),
+                           'ManufacturerNumber': np.char.add(rng.choice(['', '0', '00'], rows),
+                                                             rng.integers(10, 999999, rows).astype(str)).astype(object),
+                           'VendorItem': pick([f'V{i}' for i in range(50000)], 0.05),
+                           'ItemNumber': pick([str(i) for i in range(20000)], 0.5),
+                           'ItemDescription': pick([f'ITEM {i} STERILE {i % 7} CT' for i in range(40000)], 0.01),
+                           'BaseCost': np.char.add('$', (rng.integers(1, 999999, rows) / 100).astype(str)).astype(object),
+                           'UOM': pick(['EA', 'BX', 'CS', 'PK ', ' EA']),
+                           'DerivedUOMConversion': pick(['1', '10', '12', '100']),
+                           'EffectiveDate': dates.to_numpy(dtype = object),
+                           'ExpirationDate': dates.to_numpy(dtype = object),
+                           'ContractLine': np.arange(rows).astype(str).astype(object),
+                           'Manufacturer': pick([f'M{i:03d}' for i in range(300)], 0.01),
+                           'Vendor': pick([f'{i:05d}' for i in range(200)], 0.01),
+                           'Contract': pick([f'C{i}' for i in range(2000)]),
+                           'ItemType': pick(['Inventory', 'Non-Stock', 'Special'], 0.3),
+                           'OnHold': pick(['No', 'Yes'], 0.2),
+                           'ActiveLine': pick(['Yes', 'No'], 0.2),
+                           'ContractLineState': pick(['Active', 'Inactive', 'Pending'], 0.1),
+                           'Contract.ContractStatus': pick(['Active', 'Expired', 'Draft'], 0.1)})
+    for i in range(extra_cols):
+        export.loc[:, f'Extra{i}'] = pick([f'value {j} of field {i}' for j in range(50)], 0.1)
+    export.to_csv(path, index = False)
+    return path
+
+
+def measure(path: str,
+            mode: str,
+            chunksize: int):
+    code = CHILD_CODE.format(repo = REPO_ROOT, path = path, mode = mode, cols = INFOR_COLS, chunksize = chunksize)
+    result = subprocess.run([sys.executable, '-c', code], capture_output = True, text = True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def check_parity(path: str):
+    fp = FileProcessor(FolderManager('bench', 'bench'))
+    legacy = pd.read_csv(path, dtype = str)[INFOR_COLS].copy()
+    projected = fp.read_csv_projected(path, INFOR_COLS)
+    std_cols = fp.std_cols[:len(INFOR_COLS)]
+    outputs = []
+    for df in [legacy, projected]:
+        for col in ['Vendor', 'Manufacturer', 'ManufacturerNumber', 'VendorItem']:
+            df[col] = fp.fillna_series(df[col], 'unknown')
+        df.columns = std_cols
+        for col in ['ContractImport', 'FileName']:
+            df.loc[:, col] = np.nan
+        df.loc[:, 'Source System'] = 'Infor'
+        df.loc[:, 'seq'] = ['i' + str(i) for i in range(len(df))]
+        outputs.append(fp.standardize_helper(df))
+    pd.testing.assert_frame_equal(outputs[0], outputs[1])
+    return True
+
+
+def run(rows: int = 300000,
+        extra_cols: int = 45,
+        chunksize: int = 50000,
+        repeat: int = 2):
+    with tempfile.TemporaryDirectory() as folder:
+        path = write_export(os.path.join(folder, 'ContractLine.csv'), rows, extra_cols)
+        print(f"export: {rows} rows, {len(INFOR_COLS) + extra_cols} columns, {os.path.getsize(path)/2**20:,.0f} MB")
+        check_parity(path)
+        print("standardized output identical for legacy and projected read")
+        print(f"{'mode':<12}{'read':>10}{'peak RSS':>12}{'frame':>10}")
+        for mode in ['legacy', 'projected', 'chunked']:
+            best = min([measure(path, mode, chunksize) for _ in range(repeat)], key = lambda x: x['elapsed_s'])
+            print(f"{mode:<12}{best['elapsed_s']:>8.2f} s{best['peak_rss']/2**20:>9,.0f} MB{best['frame_bytes']/2**20:>7,.0f} MB")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'Infor ContractLine reader benchmark')
+    parser.add_argument('--rows', type = int, default = 300000)
+    parser.add_argument('--extra-cols', type = int, default = 45)
+    parser.add_argument('--chunksize', type = int, default = 50000)
+    parser.add_argument('--repeat', type = int, default = 2)
+    args = parser.parse_args()
+    run(args.rows, args.extra_cols, args.chunksize, args.repeat)
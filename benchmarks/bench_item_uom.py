@@ -0,0 +1,91 @@
+"""
+Benchmark for ItemUOMIndex: the item master UOM validation of itemmast_search_and_compare, as the
+csv parse + per row conversion apply + groupby-apply buy UOM lists + two left merges it used to run
+on every call, against labeling the matched lines from the saved index. Also times the build / save /
+load of the index. Results of both ways are checked to be identical.
+
+run from the repository root:
+    python -m benchmarks.bench_item_uom --items 300000 --lines 5000
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ItemUOMIndex import ItemUOMIndex
+
+
+def make_item_uom(items: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    # one to four units per item, EA always there
+    per_item = rng.integers(1, 5, items)
+    item = np.repeat(np.char.add('I', np.arange(items).astype(str)), per_item)
+    within = np.arange(len(item)) - np.repeat(np.cumsum(per_item) - per_item, per_item)
+    uom = np.array(['EA', 'BX', 'CS', 'PK'], dtype = object)[within]
+    conversion = np.where(within == 0, '1', rng.choice(['10', '12', '100', '1,000'], len(item))).astype(object)
+    valid = rng.choice(['Valid', 'Not Valid'], len(item), p = [0.85, 0.15]).astype(object)
+    valid[rng.random(len(item)) < 0.02] = np.nan
+    return pd.DataFrame({'Item': item, 'UnitOfMeasure': uom, 'UOMConversion': conversion, 'ValidForBuying': valid,
+                         'Item.Active': 'Active'})
+
+
+def old_label(tp_im: pd.DataFrame, itemUOM: pd.DataFrame):
+    itemUOM = itemUOM[['Item', 'UnitOfMeasure', 'UOMConversion', 'ValidForBuying', 'Item.Active']].copy()
+    itemUOM.loc[:, 'UOMConversion'] = itemUOM['UOMConversion'].apply(lambda x: int(float(x.replace(',',''))) if not pd.isnull(x) else 0)
+    itemUOM.rename(columns = {'UnitOfMeasure': 'UOM'}, inplace = True)
+    valid_buyuom = itemUOM[itemUOM['ValidForBuying'] != 'Not Valid'].copy()
+    valid_buyuom.loc[:, 'AllValidBuyUOMandCF'] = valid_buyuom['UOM'].astype(str) + '*' + valid_buyuom['UOMConversion'].astype(int).astype(str)
+    all_buyuom = valid_buyuom.groupby(['Item'])['AllValidBuyUOMandCF'].apply(lambda x: ','.join(x)).to_frame().reset_index()
+    return tp_im.merge(valid_buyuom, on = ['Item', 'UOM'], how = 'left').\
+                 merge(all_buyuom, on = ['Item'], how = 'left')
+
+
+def timeit(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def run(items: int = 300000,
+        lines: int = 5000,
+        seed: int = 0):
+    rng = np.random.default_rng(seed + 1)
+    with tempfile.TemporaryDirectory() as folder:
+        csv_path = os.path.join(folder, 'ItemUOM.csv')
+        make_item_uom(items, seed).to_csv(csv_path, index = False)
+        tp_im = pd.DataFrame({'Item': np.char.add('I', rng.integers(0, int(items * 1.1), lines).astype(str)),
+                              'UOM': rng.choice(['EA', 'BX', 'CS'], lines),
+                              'QOE_x': rng.choice([1, 10, 12, 100], lines)})
+
+        old, old_s = timeit(lambda: old_label(tp_im, pd.read_csv(csv_path, dtype = str)))
+
+        item_uom, read_s = timeit(lambda: pd.read_csv(csv_path, dtype = str))
+        index, build_s = timeit(lambda: ItemUOMIndex.build(item_uom, 'bench'))
+        index_path = os.path.join(folder, 'ItemUOM.uomidx.npz')
+        _, save_s = timeit(lambda: index.save(index_path))
+        index, load_s = timeit(lambda: ItemUOMIndex.load(index_path, 'bench'))
+        size = os.path.getsize(index_path)
+
+    new, label_s = timeit(lambda: index.label(tp_im))
+    old = old.rename(columns = {'AllValidBuyUOMandCF_y': 'AllValidBuyUOMandCF'})
+    pd.testing.assert_frame_equal(old[new.columns], new)
+
+    print(f"{len(item_uom):,} ItemUOM rows ({items:,} items), {lines:,} matched lines -> {len(new):,} labeled rows (identical results)")
+    print(f"index build {read_s + build_s:.2f} s (csv read {read_s:.2f} s), save {save_s:.2f} s, load {load_s*1000:.1f} ms, "
+          f"{size/2**20:,.1f} MB on disk")
+    print(f"csv + apply + merges  {old_s*1000:>9.1f} ms")
+    print(f"index load + label    {(load_s + label_s)*1000:>9.1f} ms  ({old_s/(load_s + label_s):,.0f}x)")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'item UOM index benchmark')
+    parser.add_argument('--items', type = int, default = 300000)
+    parser.add_argument('--lines', type = int, default = 5000)
+    parser.add_argument('--seed', type = int, default = 0)
+    args = parser.parse_args()
+    run(args.items, args.lines, args.seed)
@@ -0,0 +1,85 @@
+"""
+Benchmark for PartNumberIndex: the scoping lookup of TP part numbers in Infor, as the four isin
+scans over the whole frame against index lookups, plus the one-off cost to build / save / load the
+index. Results of both ways are checked to be identical.
+
+run from the repository root:
+    python -m benchmarks.bench_part_number_index --rows 2000000 --keys 500
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PartNumberIndex import PartNumberIndex
+
+
+def make_frame(rows: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    mfn = np.char.add(rng.choice(['', '0', '00'], rows), rng.integers(10, 9999999, rows).astype(str))
+    mfn = np.char.add(mfn, rng.choice(['', '-1', '-A'], rows)).astype(object)
+    mfn[rng.random(rows) < 0.01] = np.nan
+    frame = pd.DataFrame({'MFN': mfn})
+    frame.loc[:, 'MFN RF'] = frame['MFN'].str.replace('-', '', regex = False).fillna('')
+    frame.loc[:, 'VN'] = np.where(rng.random(rows) < 0.5, frame['MFN'], 'V' + pd.Series(rng.integers(0, 999999, rows)).astype(str))
+    frame.loc[:, 'Active Rank'] = rng.choice(['1', '2'], rows)
+    return frame
+
+
+def scan(frame, mfn_to_check, mfn_rf_to_check):
+    return np.flatnonzero((frame['MFN'].isin(mfn_to_check) |
+                           frame['MFN RF'].isin(mfn_rf_to_check) |
+                           frame['VN'].isin(mfn_to_check) |
+                           frame['VN'].isin(mfn_rf_to_check)).to_numpy())
+
+
+def run(rows: int = 2000000,
+        keys: int = 500,
+        repeat: int = 5):
+    frame = make_frame(rows)
+    tp = frame.sample(keys, random_state = 1)
+    mfn_to_check, mfn_rf_to_check = set(tp['MFN']), set(tp['MFN RF'])
+    queries = [('MFN', mfn_to_check), ('MFN RF', mfn_rf_to_check), ('VN', mfn_to_check | mfn_rf_to_check)]
+
+    start = time.perf_counter()
+    index = PartNumberIndex.build(frame, fingerprint = 'bench')
+    build_s = time.perf_counter() - start
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, 'bench.pnidx.npz')
+        start = time.perf_counter()
+        index.save(path)
+        save_s = time.perf_counter() - start
+        start = time.perf_counter()
+        index = PartNumberIndex.load(path, 'bench')
+        load_s = time.perf_counter() - start
+        size = os.path.getsize(path)
+
+    expected = scan(frame, mfn_to_check, mfn_rf_to_check)
+    assert np.array_equal(expected, index.lookup_any(frame, queries))
+    scan_s = min(timeit(lambda: scan(frame, mfn_to_check, mfn_rf_to_check)) for _ in range(repeat))
+    lookup_s = min(timeit(lambda: index.lookup_any(frame, queries)) for _ in range(repeat))
+
+    print(f"{rows:,} lines, {keys} TP part numbers, {len(expected):,} candidate lines (identical results)")
+    print(f"index build {build_s:.2f} s, save {save_s:.2f} s, load {load_s:.3f} s, {size/2**20:,.0f} MB on disk")
+    print(f"isin scans    {scan_s*1000:>9.1f} ms")
+    print(f"index lookup  {lookup_s*1000:>9.1f} ms  ({scan_s/lookup_s:,.0f}x)")
+
+
+def timeit(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'part number index benchmark')
+    parser.add_argument('--rows', type = int, default = 2000000)
+    parser.add_argument('--keys', type = int, default = 500)
+    parser.add_argument('--repeat', type = int, default = 5)
+    args = parser.parse_args()
+    run(args.rows, args.keys, args.repeat)
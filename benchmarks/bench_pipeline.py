@@ -0,0 +1,147 @@
+"""
+End to end benchmark of the pre-processing pipeline on synthetic data (see synthetic_data.py).
+A project is generated at the requested scale, then the process runs headless (RunSpec, reviews
+auto-accepted) in a fresh interpreter per run, so every run starts with an empty process and its
+peak RSS is its own. The first run is cold (no standardized Infor cache on disk), the following
+ones warm. Per stage wall/CPU time, rows/second and peak RSS come from the run's StageProfiler.
+
+The dup/itemmast stages encode descriptions with the sentence transformer model, it has to be
+installed (and downloaded once) for those stages to run.
+
+run from the repository root:
+    python -m benchmarks.bench_pipeline --lines 100000 --runs 2
+    python -m benchmarks.bench_pipeline --lines 1000000 --save after.json --baseline before.json
+"""
+import os
+import sys
+import json
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from benchmarks.synthetic_data import SyntheticData
+
+CHILD_CODE = """
+import os, sys, json, contextlib
+sys.path.insert(0, {repo!r})
+os.chdir({root!r})
+from FileProcessor import FileProcessor
+from FolderManager import FolderManager
+from RunSpec import RunSpec
+run_spec = RunSpec.from_dict({spec!r})
+folder_manager = FolderManager(run_spec.manufacturer, run_spec.contract)
+with open({log!r}, 'w', encoding = 'utf-8') as log, contextlib.redirect_stdout(log):
+    folder_manager.create_folders()
+    preprocessor = FileProcessor(folder_manager, check_mode = run_spec.check_mode, run_spec = run_spec)
+    status = preprocessor.process_files(process_type = run_spec.process_type)
+print(json.dumps({{'status': status, 'stages': [record.to_dict() for record in preprocessor.profiler.records]}}, default = str))
+"""
+
+
+def run_once(data: SyntheticData,
+             spec: dict,
+             log_path: str):
+    data.write_tp()
+    code = CHILD_CODE.format(repo = REPO_ROOT, root = data.root, spec = spec, log = log_path)
+    result = subprocess.run([sys.executable, '-c', code], capture_output = True, text = True)
+    if result.returncode != 0:
+        raise RuntimeError(f"run failed, see {log_path}\n{result.stderr.strip()}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def stage_rows(stage: dict):
+    return stage['rows_in'] if stage['rows_in'] is not None else stage['rows_out']
+
+
+def print_run(name: str,
+              run: dict,
+              depth: int):
+    print(f"--- {name}: {run['status']}")
+    print(f"{'stage':<58}{'wall':>9}{'cpu':>9}{'rows':>11}{'rows/s':>12}{'peak RSS':>11}")
+    for stage in run['stages']:
+        if stage['depth'] > depth:
+            continue
+        rows = stage_rows(stage)
+        rate = f"{rows / stage['wall_s']:,.0f}" if rows and stage['wall_s'] else ''
+        peak = f"{stage['peak_rss']/2**20:,.0f} MB" if stage['peak_rss'] is not None else 'n/a'
+        label = '  ' * stage['depth'] + stage['name']
+        print(f"{label:<58}{stage['wall_s']:>7.2f} s{stage['cpu_s']:>7.2f} s{'' if rows is None else f'{rows:,}':>11}{rate:>12}{peak:>11}")
+    total = sum(stage['wall_s'] for stage in run['stages'] if stage['depth'] == 0)
+    print(f"{'total':<58}{total:>7.2f} s")
+    return total
+
+
+def compare(runs: dict,
+            baseline: dict):
+    """
+    Wall time of the top level stages against a saved baseline (same scale expected)
+    """
+    print(f"--- against baseline ({baseline['lines']:,} lines)")
+    for name, run in runs.items():
+        if name not in baseline['runs']:
+            continue
+        before = {stage['path']: stage['wall_s'] for stage in baseline['runs'][name]['stages'] if stage['depth'] == 0}
+        for stage in run['stages']:
+            if stage['depth'] == 0 and before.get(stage['path']):
+                print(f"{name:<6}{stage['path']:<40}{before[stage['path']]:>8.2f} s ->{stage['wall_s']:>8.2f} s"
+                      f"  ({before[stage['path']] / max(stage['wall_s'], 1e-6):.2f}x)")
+    return None
+
+
+def run(lines: int = 100000,
+        tp_lines: int = None,
+        runs: int = 2,
+        seed: int = 0,
+        process_type: str = 'full_process',
+        depth: int = 1,
+        root: str = None,
+        save: str = None,
+        baseline: str = None,
+        keep: bool = False):
+    folder = root or tempfile.mkdtemp(prefix = 'preprocessor_bench_')
+    data = SyntheticData(folder, lines, tp_lines, seed)
+    info = data.generate()
+    print(f"synthetic project in {folder}: {lines:,} Infor lines, {data.tp_lines:,} TP lines, "
+          f"{len(info['ccx_contracts'])} CCX contracts")
+    spec = {'manufacturer': data.manufacturer,
+            'contract': data.contract,
+            'process_type': process_type,
+            'auto_accept_reviews': True,
+            'answers': {'replacement_contract': info['ccx_contracts'][0]}}
+    results = {}
+    for i in range(runs):
+        name = 'cold' if i == 0 else f'warm{i}'
+        log_path = os.path.join(folder, f'bench_{name}.log')
+        results[name] = run_once(data, spec, log_path)
+        print_run(name, results[name], depth)
+
+    if baseline is not None:
+        with open(baseline, 'r', encoding = 'utf-8') as f:
+            compare(results, json.load(f))
+    if save is not None:
+        with open(save, 'w', encoding = 'utf-8') as f:
+            json.dump({'lines': lines, 'tp_lines': data.tp_lines, 'seed': seed, 'runs': results}, f, indent = 2)
+        print(f"results saved to {save}")
+    if root is None and not keep:
+        shutil.rmtree(folder, ignore_errors = True)
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'pre-processor pipeline benchmark on synthetic data')
+    parser.add_argument('--lines', type = int, default = 100000, help = 'Infor ContractLine lines (10k to 5M)')
+    parser.add_argument('--tp-lines', type = int, default = None)
+    parser.add_argument('--runs', type = int, default = 2, help = 'first run cold, the others warm')
+    parser.add_argument('--seed', type = int, default = 0)
+    parser.add_argument('--process-type', default = 'full_process')
+    parser.add_argument('--depth', type = int, default = 1, help = 'sub-step levels to show')
+    parser.add_argument('--root', default = None, help = 'project folder (default: a temp folder, removed afterwards)')
+    parser.add_argument('--keep', action = 'store_true', help = 'keep the temp project folder and run logs')
+    parser.add_argument('--save', default = None, help = 'save the results as JSON')
+    parser.add_argument('--baseline', default = None, help = 'compare with results saved by --save')
+    args = parser.parse_args()
+    run(args.lines, args.tp_lines, args.runs, args.seed, args.process_type, args.depth, args.root, args.save, args.baseline, args.keep)
@@ -0,0 +1,110 @@
+"""
+Benchmark for the background prefetch of full_process (see Prefetcher): how long the analyst waits
+on the program once the scoping and duplication reviews are confirmed, with prefetching off and on.
+The process runs on a synthetic project (synthetic_data.py) in a fresh interpreter per run, the
+analyst is simulated by the review prompts taking --review-seconds each before they are answered.
+Waiting time is the run's wall time less the time spent in those prompts. The embedding cache and
+the ItemUOM index are removed before every run (first time descriptions), the standardized Infor
+cache is warmed by an untimed first run.
+
+The dup/itemmast stages encode descriptions with the sentence transformer model, it has to be
+installed (and downloaded once) for those stages to run.
+
+run from the repository root:
+    python -m benchmarks.bench_prefetch --lines 100000 --review-seconds 20
+"""
+import os
+import sys
+import glob
+import json
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from benchmarks.synthetic_data import SyntheticData
+
+CHILD_CODE = """
+import os, sys, time, json, contextlib
+sys.path.insert(0, {repo!r})
+os.chdir({root!r})
+from FileProcessor import FileProcessor
+from FolderManager import FolderManager
+from RunSpec import RunSpec
+run_spec = RunSpec.from_dict({spec!r})
+folder_manager = FolderManager(run_spec.manufacturer, run_spec.contract)
+# the analyst takes review_seconds on each review before answering
+review_seconds, reviewing = {review_seconds!r}, []
+answer = FileProcessor.ask
+def ask(self, key, prompt):
+    if key in ['scoping_reviewed', 'dup_review_completed']:
+        start = time.perf_counter()
+        time.sleep(review_seconds)
+        reviewing.append(time.perf_counter() - start)
+    return answer(self, key, prompt)
+FileProcessor.ask = ask
+with open({log!r}, 'w', encoding = 'utf-8') as log, contextlib.redirect_stdout(log):
+    folder_manager.create_folders()
+    preprocessor = FileProcessor(folder_manager, check_mode = run_spec.check_mode, run_spec = run_spec)
+    start = time.perf_counter()
+    status = preprocessor.process_files(process_type = run_spec.process_type)
+    wall = time.perf_counter() - start
+print(json.dumps({{'status': status, 'wall': wall, 'reviewing': sum(reviewing),
+                  'stages': [record.to_dict() for record in preprocessor.profiler.records]}}, default = str))
+"""
+
+
+def run_once(data: SyntheticData,
+             spec: dict,
+             review_seconds: float,
+             log_path: str):
+    data.write_tp()
+    cache_folder = os.path.join(data.shared_folder, 'cache')
+    shutil.rmtree(os.path.join(cache_folder, 'embeddings'), ignore_errors = True)
+    for path in glob.glob(os.path.join(data.shared_folder, '*.uomidx.npz')):
+        os.remove(path)
+    code = CHILD_CODE.format(repo = REPO_ROOT, root = data.root, spec = spec, review_seconds = review_seconds, log = log_path)
+    result = subprocess.run([sys.executable, '-c', code], capture_output = True, text = True)
+    if result.returncode != 0:
+        raise RuntimeError(f"run failed, see {log_path}\n{result.stderr.strip()}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def run(lines: int = 100000,
+        review_seconds: float = 20.0,
+        seed: int = 0,
+        keep: bool = False):
+    folder = tempfile.mkdtemp(prefix = 'preprocessor_prefetch_')
+    data = SyntheticData(folder, lines, None, seed)
+    info = data.generate()
+    print(f"synthetic project: {lines:,} Infor lines, {data.tp_lines:,} TP lines, {len(info['ccx_contracts'])} CCX contracts, "
+          f"{review_seconds:.0f} s per review")
+    spec = {'manufacturer': data.manufacturer,
+            'contract': data.contract,
+            'process_type': 'full_process',
+            'auto_accept_reviews': True,
+            'answers': {'replacement_contract': info['ccx_contracts'][0]}}
+    run_once(data, spec, 0, os.path.join(folder, 'bench_warmup.log'))
+    for prefetch in [False, True]:
+        spec['prefetch'] = prefetch
+        name = 'prefetch' if prefetch else 'no prefetch'
+        stats = run_once(data, spec, review_seconds, os.path.join(folder, f"bench_{name.replace(' ', '_')}.log"))
+        background = sum(stage['wall_s'] for stage in stats['stages'] if stage['depth'] == 0 and stage['name'].startswith('prefetch'))
+        print(f"{name:<13} {stats['status']:<8} waiting {stats['wall'] - stats['reviewing']:7.2f} s "
+              f"(run {stats['wall']:.2f} s, reviews {stats['reviewing']:.2f} s, background work {background:.2f} s)")
+    if not keep:
+        shutil.rmtree(folder, ignore_errors = True)
+    return None
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'background prefetch benchmark on synthetic data')
+    parser.add_argument('--lines', type = int, default = 100000, help = 'Infor ContractLine lines')
+    parser.add_argument('--review-seconds', type = float, default = 20.0, help = 'time the analyst takes per review')
+    parser.add_argument('--seed', type = int, default = 0)
+    parser.add_argument('--keep', action = 'store_true', help = 'keep the project folder and run logs')
+    args = parser.parse_args()
+    run(args.lines, args.review_seconds, args.seed, args.keep)
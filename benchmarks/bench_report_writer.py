@@ -0,0 +1,120 @@
+"""
+Benchmark for the streamed ReportFurnishing reports: a dedup report of a large manufacturer (one
+tab per old contract plus the raw lines) written through pd.ExcelWriter the way the reports used
+to be (one sliced copy per contract, xlsxwriter keeping the whole workbook in memory) against
+make_dedup_report in constant_memory mode. Each writer runs in its own process so the peak RSS
+is its own.
+
+run from the repository root:
+    python -m benchmarks.bench_report_writer --rows 300000 --contracts 40
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+import numpy as np
+import pandas as pd
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from ReportFurnishing import ReportFurnishing
+from Profiler import memory_status
+
+
+class Folders:
+    """
+    Stand in for FolderManager, the reports only need the output folder
+    """
+
+    def __init__(self, output: str):
+        self.manufacturer = 'Bench'
+        self.contract = 'L0000000000001'
+        self.output = output
+
+    def get_folder_path(self, name: str):
+        return self.output
+
+
+def make_frames(rows: int,
+                contracts: int,
+                seed: int = 0):
+    """
+    Dedup lines as the report gets them (reviewed file read back as strings, numbers rounded),
+    the raw reviewed lines and the per contract summary
+    """
+    rng = np.random.default_rng(seed)
+    mfn = rng.integers(10**5, 10**9, rows).astype(str)
+    contract = np.char.add('L', rng.integers(0, contracts, rows).astype(str))
+    uom = rng.choice(['EA', 'BX', 'CS'], rows)
+    dedup = pd.DataFrame({'MFN_y': mfn, 'VN_y': np.char.add('V', mfn), 'IN_y': rng.integers(10**5, 10**6, rows).astype(str),
+                          'Description_y': np.char.add('CATHETER FR STERILE ', mfn), 'UnitCost_y': np.round(rng.uniform(1, 500, rows), 2),
+                          'UOM_y': uom, 'QOE_y': rng.choice([1, 10, 100], rows),
+                          'Effective Date_y': '2024-01-01 00:00:00', 'Expiration Date_y': '2026-12-31 00:00:00',
+                          'Contract Number_y': contract, 'Contract Line': rng.integers(1, 10**5, rows).astype(str),
+                          'Source System_y': 'CCX', 'Action': rng.choice(['Deactivate', 'Review'], rows),
+                          'MFN_x': mfn, 'VN_x': np.char.add('V', mfn), 'Description_x': np.char.add('CATHETER STERILE ', mfn),
+                          'UnitCost_x': np.round(rng.uniform(1, 500, rows), 2), 'UOM_x': uom, 'QOE_x': rng.choice([1, 10, 100], rows),
+                          'Contract Number_x': 'L0000000000001', 'Same UOM': 'True', 'Same QOE': rng.choice(['True', 'False'], rows),
+                          'EACostDiff': np.round(rng.uniform(0.3, 3, rows), 2), 'Description Similarity': np.round(rng.uniform(0.5, 1, rows), 2)})
+    raw = dedup.assign(**{f'extra_{i}': 'x' for i in range(16)})
+    summary = dedup.groupby('Contract Number_y').size().reset_index(name = 'Overlapping Line Count')
+    summary.insert(0, 'Source System', 'CCX')
+    summary.insert(2, 'Manufacturer', 'Bench')
+    summary.insert(3, 'Total Line Count', summary['Overlapping Line Count'] * 3)
+    return dedup, summary, raw
+
+
+def excel_writer_report(report: ReportFurnishing, dedup, summary, raw):
+    """
+    The former make_dedup_report: pd.ExcelWriter in normal mode, one copy of the lines per contract
+    """
+    to_output = {contract: dedup[dedup['Contract Number_y'] == contract] for contract in dedup['Contract Number_y'].unique()}
+    summary.columns = report.report_header_dict['dedup_summary']
+    path = os.path.join(report.output_file_path, 'excel_writer.xlsx')
+    with pd.ExcelWriter(path, engine = 'xlsxwriter') as writer:
+        summary.to_excel(writer, sheet_name = 'Summary', index = False)
+        for key, df in to_output.items():
+            df.columns = report.report_header_dict['dedeup']
+            df.to_excel(writer, sheet_name = key, index = False)
+        raw.to_excel(writer, sheet_name = 'Raw', index = False)
+
+
+def run_one(writer: str, rows: int, contracts: int, output: str):
+    dedup, summary, raw = make_frames(rows, contracts)
+    report = ReportFurnishing(Folders(output))
+    rss_before = memory_status()[0]
+    start = time.perf_counter()
+    if writer == 'excel_writer':
+        excel_writer_report(report, dedup, summary, raw)
+    else:
+        report.make_dedup_report(dedup, summary, raw)
+    elapsed = time.perf_counter() - start
+    return {'writer': writer, 'seconds': elapsed, 'peak_rss': memory_status()[1], 'rss_before': rss_before}
+
+
+def run(rows: int = 300000,
+        contracts: int = 40):
+    output = tempfile.mkdtemp(prefix = 'report_bench_')
+    print(f"dedup report, {rows:,} lines over {contracts} contract tabs plus the raw tab")
+    for writer in ['excel_writer', 'streamed']:
+        code = (f"import sys, json; sys.path.insert(0, {REPO_ROOT!r}); from benchmarks.bench_report_writer import run_one; "
+                f"print(json.dumps(run_one({writer!r}, {rows}, {contracts}, {output!r})))")
+        result = subprocess.run([sys.executable, '-c', code], capture_output = True, text = True, check = True)
+        stats = json.loads(result.stdout.strip().splitlines()[-1])
+        print(f"{writer:<14}{stats['seconds']:8.1f} s   peak RSS {stats['peak_rss']/2**20:,.0f} MB "
+              f"(frames alone {stats['rss_before']/2**20:,.0f} MB)")
+    for file in os.listdir(output):
+        os.remove(os.path.join(output, file))
+    os.rmdir(output)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'report writer benchmark')
+    parser.add_argument('--rows', type = int, default = 300000)
+    parser.add_argument('--contracts', type = int, default = 40)
+    args = parser.parse_args()
+    run(args.rows, args.contracts)
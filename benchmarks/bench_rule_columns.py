@@ -0,0 +1,137 @@
+"""
+Parity check and timing of the vectorized rule columns of the duplication and item master stages
+against the row by row versions they replace, on synthetic joined lines:
+- EACostDiff of dup_search_and_compare (row wise apply before)
+- the rounding/casting of the reviewed duplication lines (per cell round(float(x), 2) / int(x))
+- IM_check of itemmast_search_and_compare (row wise apply before)
+The old versions run on the lines they can handle (a search set QOE of 0 stopped them with a
+ZeroDivisionError), the results have to be identical value for value.
+
+run from the repository root:
+    python -m benchmarks.bench_rule_columns --rows 1000000
+"""
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from FileProcessor import FileProcessor
+
+
+def make_lines(rows: int,
+               seed: int = 0):
+    rng = np.random.default_rng(seed)
+    # prices sitting on a half cent (2.675, 0.285 ...) are where np.round and round() part ways
+    cost_x = np.where(rng.uniform(0, 1, rows) < 0.2, np.round(rng.uniform(0, 500, rows), 2) + 0.005, np.round(rng.uniform(0, 500, rows), 2))
+    cost_y = np.round(rng.uniform(0, 500, rows), 3)
+    cost_y[rng.uniform(0, 1, rows) < 0.01] = 0
+    cost_x[rng.uniform(0, 1, rows) < 0.01] = np.nan
+    qoe_x = rng.choice([0.0, 1.0, 10.0, 12.0, 100.0], rows, p = [0.01, 0.5, 0.2, 0.09, 0.2])
+    qoe_y = rng.choice([1.0, 10.0, 12.0, 100.0, np.nan], rows, p = [0.5, 0.2, 0.09, 0.2, 0.01])
+    lines = pd.DataFrame({'MFN_x': rng.integers(10**5, 10**9, rows).astype(str), 'UnitCost_x': cost_x, 'QOE_x': qoe_x,
+                          'UOM_x': rng.choice(['EA', 'BX', 'CS'], rows), 'UnitCost_y': cost_y, 'QOE_y': qoe_y,
+                          'UOM_y': rng.choice(['EA', 'BX', 'CS'], rows), 'Manufacturer': 'Bench'})
+    item_master = pd.DataFrame({'QOE_x': qoe_x, 'UOMConversion': np.where(rng.uniform(0, 1, rows) < 0.1, np.nan, rng.choice([1, 10, 12, 100], rows)),
+                                'ValidForBuying': rng.choice(['Valid', np.nan], rows, p = [0.9, 0.1]), 'Item': 'I'})
+    return lines, item_master
+
+
+def reviewed(lines: pd.DataFrame):
+    """
+    The joined lines as they come back from the review file (pd.read_excel(dtype = str))
+    """
+    reviewed = lines.astype(str).where(lines.notna(), np.nan)
+    reviewed.loc[:, 'QOE_x'] = lines['QOE_x'].map(lambda x: str(int(x)) if not pd.isnull(x) else np.nan)
+    reviewed.loc[:, 'QOE_y'] = lines['QOE_y'].map(lambda x: str(int(x)) if not pd.isnull(x) else np.nan)
+    reviewed.loc[:, 'EACostDiff'] = lines['EACostDiff'].astype(str)
+    reviewed.loc[:, 'Description Similarity'] = '0.8765'
+    return reviewed
+
+
+def old_ea_cost_diff(dup_found: pd.DataFrame):
+    return dup_found.apply(lambda x: (x['UnitCost_x']/x['QOE_x'])/(x['UnitCost_y']/x['QOE_y'])
+                           if ((x['UnitCost_y']/x['QOE_y']) != 0 and x['QOE_x'] != 0)
+                           else -1, axis = 1)
+
+
+def old_clean(dup_found_clean: pd.DataFrame):
+    for col in ['EACostDiff', 'UnitCost_x', 'UnitCost_y', 'Description Similarity']:
+        dup_found_clean.loc[:, col] = dup_found_clean[col].apply(lambda x: round(float(x),2) if not pd.isnull(x) else np.nan)
+    for col in ['QOE_x', 'QOE_y']:
+        dup_found_clean.loc[:, col] = dup_found_clean[col].apply(lambda x: int(x) if not pd.isnull(x) else 0)
+    return dup_found_clean
+
+
+def new_clean(processor: FileProcessor, dup_found_clean: pd.DataFrame):
+    for col in ['EACostDiff', 'UnitCost_x', 'UnitCost_y', 'Description Similarity']:
+        dup_found_clean.loc[:, col] = processor.round_series(dup_found_clean[col])
+    for col in ['QOE_x', 'QOE_y']:
+        dup_found_clean.loc[:, col] = dup_found_clean[col].fillna(0).astype(np.int64)
+    return dup_found_clean
+
+
+def old_im_check(im_label: pd.DataFrame):
+    im_label.loc[:, 'IM_check'] = im_label['ValidForBuying'].apply(lambda x: 'Failed' if pd.isnull(x) else 'Passed')
+    im_label.loc[:, 'IM_check'] = im_label.apply(lambda x: 'Failed'
+                                                 if x['QOE_x'] != x['UOMConversion']
+                                                 else x['IM_check'], axis = 1)
+    return im_label['IM_check']
+
+
+def new_im_check(im_label: pd.DataFrame):
+    im_label.loc[:, 'IM_check'] = np.where(im_label['ValidForBuying'].isna() |
+                                           (im_label['QOE_x'] != im_label['UOMConversion']), 'Failed', 'Passed')
+    return im_label['IM_check']
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def assert_same(old, new, name: str):
+    """
+    value for value, element types included (the reports write ints and floats differently)
+    """
+    old, new = pd.Series(old), pd.Series(new)
+    pd.testing.assert_series_equal(old.astype(object), new.astype(object), check_names = False, obj = name)
+    assert [type(v) for v in old] == [type(v) for v in new], name
+
+
+def run(rows: int = 1000000,
+        seed: int = 0):
+    # the rule helpers do not need a project
+    processor = FileProcessor.__new__(FileProcessor)
+    lines, item_master = make_lines(rows, seed)
+    print(f"{rows:,} joined lines")
+
+    new_diff, new_s = timed(processor.ea_cost_diff_series, lines)
+    computable = lines['QOE_y'] != 0
+    old_diff, old_s = timed(old_ea_cost_diff, lines[computable])
+    pd.testing.assert_series_equal(old_diff.astype(float), new_diff[computable], check_names = False)
+    print(f"EACostDiff        row apply {old_s:7.2f} s   vectorized {new_s:6.3f} s  ({old_s / new_s:,.0f}x, identical)")
+
+    lines.loc[:, 'EACostDiff'] = new_diff
+    old_reviewed, old_s = timed(old_clean, reviewed(lines))
+    new_reviewed, new_s = timed(new_clean, processor, reviewed(lines))
+    for col in ['EACostDiff', 'UnitCost_x', 'UnitCost_y', 'Description Similarity', 'QOE_x', 'QOE_y']:
+        assert_same(old_reviewed[col], new_reviewed[col], col)
+    print(f"review rounding   per cell  {old_s:7.2f} s   vectorized {new_s:6.3f} s  ({old_s / new_s:,.0f}x, identical)")
+
+    old_check, old_s = timed(old_im_check, item_master.copy())
+    new_check, new_s = timed(new_im_check, item_master.copy())
+    assert_same(old_check, new_check, 'IM_check')
+    print(f"IM_check          row apply {old_s:7.2f} s   vectorized {new_s:6.3f} s  ({old_s / new_s:,.0f}x, identical)")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'rule column benchmark')
+    parser.add_argument('--rows', type = int, default = 1000000)
+    parser.add_argument('--seed', type = int, default = 0)
+    args = parser.parse_args()
+    run(args.rows, args.seed)
@@ -0,0 +1,134 @@
+"""
+Micro-benchmark for FileProcessor.standardize_helper.
+Runs the previous row-by-row implementation and the current vectorized one on the same
+synthetic Infor-like frame, checks both outputs are identical and reports rows/second.
+
+run from the repository root:
+    python -m benchmarks.bench_standardize --rows 200000
+"""
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from FileProcessor import FileProcessor
+from FolderManager import FolderManager
+
+
+def make_std_frame(rows: int, seed: int = 0):
+    """
+    Synthetic frame shaped like the projected Infor ContractLine columns (std_cols) before
+    standardize_helper runs, with the usual dirt: padded strings, '$' and ',' in prices,
+    missing values and part numbers with dashes and leading zeros
+    """
+    rng = np.random.default_rng(seed)
+    def pick(values, p_null = 0.0):
+        out = rng.choice(np.array(values, dtype = object), rows)
+        out[rng.random(rows) < p_null] = np.nan
+        return out
+    mfn = np.char.add(np.char.add(rng.choice(['', '0', '00'], rows), rng.integers(10, 999999, rows).astype(str)),
+                      rng.choice(['', '-1', '-A', ' '], rows)).astype(object)
+    mfn[rng.random(rows) < 0.01] = np.nan
+    cost = np.char.add(np.char.add(rng.choice(['', '$', '$ '], rows), rng.integers(1, 99999, rows).astype(str)),
+                       np.char.add('.', rng.integers(0, 99, rows).astype(str))).astype(object)
+    dates = (pd.Timestamp('2020-01-01') + pd.to_timedelta(rng.integers(0, 3650, rows), unit = 'D')).strftime('%Y-%m-%d').to_numpy(dtype = object)
+    dates[rng.random(rows) < 0.03] = np.nan
+    std_df = pd.DataFrame({'Contract Number': pick([' l0001 ', 'L0002', 'c-77', 'L0003 '], 0.001),
+                           'MFN': mfn,
+                           'VN': pick(['V-1', ' 002', 'AB12'], 0.3),
+                           'IN': pick(['100200', '300400'], 0.5),
+                           'Description': pick([' GLOVE EXAM  ', 'SUTURE 4-0', 'TUBE, ET 7.5 '], 0.01),
+                           'UnitCost': cost,
+                           'UOM': pick(['EA', ' BX', 'CS '], 0.0),
+                           'QOE': pick(['1', '10', '1,000'], 0.0),
+                           'Effective Date': pick(['2024-01-01', '2024-06-30 00:00:00'], 0.01),
+                           'Expiration Date': dates,
+                           'Contract Line': np.arange(rows).astype(str).astype(object),
+                           'Manufacturer': pick(['M001', 'M002', 'unknown']),
+                           'Vendor': pick(['V01', 'V02', 'unknown']),
+                           'Contract': pick(['C1', 'C2'], 0.2),
+                           'ItemType': pick(['Itemmast', 'Special'], 0.2),
+                           'OnHold': pick(['No', 'Yes'], 0.2),
+                           'ActiveLine': pick(['Yes', 'No'], 0.2),
+                           'ContractLineState': pick(['Active', 'Inactive'], 0.2),
+                           'Contract.ContractStatus': pick(['Active', 'Closed'], 0.2),
+                           'ContractImport': np.nan,
+                           'FileName': np.nan})
+    std_df.loc[:, 'Source System'] = 'Infor'
+    std_df.loc[:, 'seq'] = ['i' + str(i) for i in range(len(std_df))]
+    return std_df
+
+
+def legacy_standardize_helper(fp: FileProcessor, 
+                              std_df: pd.DataFrame):
+    """
+    The row-by-row standardize_helper as it was before vectorization, kept as the reference
+    for the parity check
+    """
+    for col in std_df.columns:
+        std_df.loc[:, col] = std_df[col].apply(lambda x: x.strip() if isinstance(x, str) else x)
+        std_df.loc[:, col] = std_df[col].apply(lambda x: '' if (isinstance(x, str) and pd.isnull(x)) else x)
+    std_df.loc[:, 'OnHold'] = std_df['OnHold'].fillna('No')
+    std_df.loc[:, 'ActiveLine'] = std_df['ActiveLine'].fillna('Yes')
+    std_df.loc[:, 'ContractLineState'] = std_df['ContractLineState'].fillna('Active')
+    std_df.loc[:, 'Contract.ContractStatus'] = std_df['Contract.ContractStatus'].fillna('Active')
+    std_df.loc[:, 'FileName'] = std_df['FileName'].fillna('Not Applicable')
+    std_df.loc[:, 'Contract'] = std_df['Contract'].fillna('Not Applicable')
+    std_df.loc[:, 'ContractImport'] = std_df['ContractImport'].fillna('Not Applicable')
+    std_df.loc[:, 'ItemType'] = std_df['ItemType'].fillna('')
+    std_df.loc[:, 'IN'] = std_df['IN'].fillna('')
+    std_df.loc[:, 'VN'] = std_df['VN'].fillna(std_df['MFN'])
+    for col in ['UnitCost', 'QOE']:
+        std_df.loc[:, col] = std_df[col].apply(lambda x: float(str(x).replace('$','').replace(',','')))
+    for col in ['Effective Date', 'Expiration Date']:
+        std_df.loc[:, col] = pd.to_datetime(std_df[col], errors = 'coerce')
+        std_df.loc[:, col] = std_df[col].apply(lambda x: x.strftime('%Y-%m-%d') if not pd.isnull(x) else '1900-01-01')
+    std_df.loc[:, 'Contract Line'] = std_df['Contract Line'].astype(str)
+    std_df.loc[:, 'Contract Number'] = std_df['Contract Number'].apply(lambda x: str(x).upper() if not pd.isnull(x) else '')
+    std_df.loc[:, 'MFN RF'] = std_df['MFN'].apply(lambda x: fp.MFN_reformat(x) if isinstance(x, str) else '')
+    std_df.loc[:, 'count'] = 1
+    std_df.loc[:, 'ExpiredFlag'] = std_df['Expiration Date'].apply(lambda x: 'Expired' if x < fp.today
+                                                                   else 'Non Expired')
+    ind_active = \
+    std_df[(std_df['OnHold'] == 'No') &
+            (std_df['ActiveLine'] == 'Yes') &
+            (std_df['ContractLineState'] == 'Active') &
+            (std_df['Contract.ContractStatus'] == 'Active') &
+            (std_df['ExpiredFlag'] == 'Non Expired')].index
+    std_df.loc[ind_active, 'Active Rank'] = '1'
+    std_df.loc[:, 'Active Rank'] = std_df['Active Rank'].fillna('2')
+    return std_df
+
+
+def run(rows: int, repeat: int = 1):
+    fp = FileProcessor(FolderManager('benchmark', 'benchmark'), data_caching = False)
+    raw = make_std_frame(rows)
+    results = {}
+    for name, func in [('legacy', lambda df: legacy_standardize_helper(fp, df)),
+                       ('vectorized', fp.standardize_helper)]:
+        timings = []
+        for _ in range(repeat):
+            std_df = raw.copy()
+            start = time.perf_counter()
+            out = func(std_df)
+            timings.append(time.perf_counter() - start)
+        results[name] = (out, min(timings))
+
+    pd.testing.assert_frame_equal(results['legacy'][0], results['vectorized'][0], check_exact = True)
+    print(f"parity check passed on {rows} rows, outputs are identical")
+    for name, (_, elapsed) in results.items():
+        print(f"{name:<12} {elapsed:>8.3f} s {rows/elapsed:>14,.0f} rows/s")
+    print(f"speed up: {results['legacy'][1]/results['vectorized'][1]:.1f}x")
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'standardize_helper micro-benchmark')
+    parser.add_argument('--rows', type = int, default = 200000)
+    parser.add_argument('--repeat', type = int, default = 1)
+    args = parser.parse_args()
+    run(args.rows, args.repeat)
@@ -0,0 +1,284 @@
+"""
+Seeded synthetic data for the pre-processor, shaped like the real inputs:
+    SHARED_DATA/ContractLine.csv, ContractLineImport.csv, Manufacturers.csv, Suppliers.csv,
+    ItemUOM.csv, ContractOrganization.xlsx (UOM.csv is copied from the repository)
+    Preprocessor_Data/<manufacturer>/ccx/ccx_<contract>.xlsx   one workbook per in-scope contract
+    Preprocessor_Data/<manufacturer>/<contract>/to_process/TP_INPUT.xlsx
+The same seed and scale always give the same files. Part numbers come in the usual shapes (dashes,
+leading zeros, letter prefixes), about a third of the Infor lines are item master lines, and the TP
+workbook passes pre_check: half of it is already on the manufacturer's contracts (duplicates to
+find), the other half is new.
+
+run from the repository root:
+    python -m benchmarks.synthetic_data /tmp/synthetic --lines 100000
+"""
+import os
+import shutil
+import argparse
+import numpy as np
+import pandas as pd
+from datetime import datetime, timedelta
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MANUFACTURER = 'Acme Medical'
+CONTRACT = 'L0000000000001'
+UOMS = np.array(['EA', 'BX', 'CA', 'PK', 'CT'], dtype = object)
+QOES = np.array(['10', '12', '24', '50', '100'], dtype = object)
+WORDS = np.array(['GLOVE', 'SUTURE', 'CATHETER', 'TUBE', 'GAUZE', 'SYRINGE', 'NEEDLE', 'DRAPE', 'SPONGE',
+                  'BANDAGE', 'MASK', 'GOWN', 'SCALPEL', 'CLAMP', 'DRESSING', 'TRAY', 'VALVE', 'FILTER'], dtype = object)
+ADJECTIVES = np.array(['STERILE', 'NITRILE', 'LATEX FREE', 'DISPOSABLE', 'ABSORBABLE', 'SILICONE',
+                       'PEDIATRIC', 'ADULT', 'LARGE', 'SMALL', 'MEDIUM', 'CLEAR'], dtype = object)
+
+
+def str_join(*parts):
+    out = np.asarray(parts[0]).astype(str)
+    for part in parts[1:]:
+        out = np.char.add(out, np.asarray(part).astype(str))
+    return out.astype(object)
+
+
+class SyntheticData:
+    """
+    Generator of one synthetic project at a given scale (number of Infor ContractLine lines)
+    """
+
+    def __init__(self,
+                 root: str,
+                 lines: int = 100000,
+                 tp_lines: int = None,
+                 seed: int = 0,
+                 manufacturer: str = MANUFACTURER,
+                 contract: str = CONTRACT):
+        self.root = root
+        self.lines = lines
+        self.tp_lines = tp_lines or int(min(5000, max(200, lines // 200)))
+        self.seed = seed
+        self.manufacturer = manufacturer
+        self.contract = contract
+        self.shared_folder = os.path.join(root, 'SHARED_DATA')
+        self.ccx_folder = os.path.join(root, 'Preprocessor_Data', manufacturer, 'ccx')
+        self.tp_folder = os.path.join(root, 'Preprocessor_Data', manufacturer, contract, 'to_process')
+        self.today = datetime.today()
+        rng = np.random.default_rng(seed)
+
+        # manufacturers (4 character codes, ContractLineImport packs code + part number in one field)
+        self.n_manufacturers = int(min(999, max(10, lines // 2000)))
+        self.manufacturer_codes = np.array([f'M{i:03d}' for i in range(self.n_manufacturers)], dtype = object)
+        self.manufacturer_names = np.array([manufacturer] + [f'Manufacturer {i}' for i in range(1, self.n_manufacturers)], dtype = object)
+        self.n_vendors = max(5, self.n_manufacturers // 3)
+        self.vendor_codes = np.array([f'{i:05d}' for i in range(self.n_vendors)], dtype = object)
+        self.vendor_names = np.array([f'Vendor {i}' for i in range(self.n_vendors)], dtype = object)
+        self.manufacturer_vendor = rng.integers(0, self.n_vendors, self.n_manufacturers)
+
+        # contracts, the first few belong to the project's manufacturer
+        self.n_contracts = int(max(20, lines // 2000))
+        self.contract_numbers = np.array([f'L{i + 100:013d}' for i in range(self.n_contracts)], dtype = object)
+        self.n_target_contracts = int(max(3, min(20, self.n_contracts // 50)))
+        self.contract_manufacturer = rng.integers(1, self.n_manufacturers, self.n_contracts)
+        self.contract_manufacturer[:self.n_target_contracts] = 0
+
+        # product catalog, grouped by manufacturer
+        n_products = max(1000, lines // 3)
+        product_manufacturer = np.sort(np.concatenate([np.arange(self.n_manufacturers),
+                                                       rng.integers(0, self.n_manufacturers, n_products - self.n_manufacturers)]))
+        base = rng.choice(9000000, n_products, replace = False) + 1000000
+        style = rng.integers(0, 4, n_products)
+        mfn = np.where(style == 0, base.astype(str).astype(object),
+              np.where(style == 1, str_join(base // 100, '-', base % 100),
+              np.where(style == 2, str_join('00', base), str_join(np.array(['AB', 'RX', 'K'])[base % 3], base))))
+        self.products = pd.DataFrame({'manufacturer': product_manufacturer,
+                                      'MFN': mfn,
+                                      'VN': str_join('V', base + 7),
+                                      'Item': np.where(rng.random(n_products) < 0.35, (base + 3).astype(str), None),
+                                      'Description': str_join(rng.choice(ADJECTIVES, n_products), ' ',
+                                                              rng.choice(WORDS, n_products), ' ',
+                                                              rng.integers(1, 40, n_products), ' CT SZ ',
+                                                              base % 997),
+                                      'UOM': rng.choice(UOMS, n_products),
+                                      'cost': rng.integers(100, 500000, n_products) / 100})
+        self.products.loc[:, 'QOE'] = np.where(self.products['UOM'] == 'EA', '1', rng.choice(QOES, n_products))
+        counts = np.bincount(product_manufacturer, minlength = self.n_manufacturers)
+        self.product_start = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        self.product_count = counts
+        self.rng = rng
+
+    def pick_products(self, contracts: np.ndarray):
+        """
+        One product of the contract's manufacturer for every contract line
+        """
+        manufacturer = self.contract_manufacturer[contracts]
+        offset = (self.rng.random(len(contracts)) * self.product_count[manufacturer]).astype(np.int64)
+        return self.product_start[manufacturer] + offset
+
+    def dates(self, n: int):
+        effective = self.today - pd.to_timedelta(self.rng.integers(30, 1500, n), unit = 'D')
+        # about 10% already expired
+        expiration = self.today + pd.to_timedelta(self.rng.integers(-300, 2000, n), unit = 'D')
+        expiration = np.where(self.rng.random(n) < 0.1, self.today - timedelta(days = 5), expiration)
+        return pd.DatetimeIndex(effective).strftime('%Y-%m-%d'), pd.DatetimeIndex(expiration).strftime('%Y-%m-%d')
+
+    def contract_line(self, n: int):
+        rng = self.rng
+        # the manufacturer's contracts are among the bigger ones
+        weights = np.ones(self.n_contracts)
+        weights[:self.n_target_contracts] = 5
+        contracts = rng.choice(self.n_contracts, n, p = weights / weights.sum())
+        products = self.products.iloc[self.pick_products(contracts)].reset_index(drop = True)
+        effective, expiration = self.dates(n)
+        def status(active, other, p_other):
+            return np.where(rng.random(n) < p_other, other, active).astype(object)
+        lines = pd.DataFrame({'Contract.WorkingContractID': self.contract_numbers[contracts],
+                              'ManufacturerNumber': products['MFN'],
+                              'VendorItem': products['VN'].where(rng.random(n) > 0.05, None),
+                              'ItemNumber': products['Item'],
+                              'ItemDescription': products['Description'],
+                              'BaseCost': str_join('$', np.round(products['cost'] * rng.choice([1, 1, 1, 0.9, 1.2], n), 2)),
+                              'UOM': products['UOM'],
+                              'DerivedUOMConversion': products['QOE'],
+                              'EffectiveDate': effective,
+                              'ExpirationDate': expiration,
+                              'ContractLine': np.arange(1, n + 1).astype(str),
+                              'Manufacturer': self.manufacturer_codes[products['manufacturer']],
+                              'Vendor': self.vendor_codes[self.manufacturer_vendor[products['manufacturer']]],
+                              'Contract': rng.choice(np.array(['Price Agreement', 'Local', None], dtype = object), n),
+                              'ItemType': np.where(products['Item'].notna(), 'Itemmast',
+                                                   rng.choice(np.array(['Special', 'Non-Stock'], dtype = object), n)),
+                              'OnHold': status('No', 'Yes', 0.03),
+                              'ActiveLine': status('Yes', 'No', 0.05),
+                              'ContractLineState': status('Active', 'Inactive', 0.05),
+                              'Contract.ContractStatus': status('Active', 'Closed', 0.02)})
+        # the real export carries many more columns we never read
+        for i in range(8):
+            lines.loc[:, f'Attribute{i}'] = rng.choice(np.array([f'value {j}' for j in range(20)], dtype = object), n)
+        return lines
+
+    def contract_line_import(self, n: int):
+        lines = self.contract_line(n)
+        return pd.DataFrame({'ContractImport.WorkingContractID': lines['Contract.WorkingContractID'],
+                             'ManufacturerInformation': lines['Manufacturer'] + lines['ManufacturerNumber'],
+                             'VendorItem': lines['VendorItem'],
+                             'ItemNumber': lines['ItemNumber'],
+                             'ItemDescription': lines['ItemDescription'],
+                             'BaseCost': lines['BaseCost'],
+                             'UOM': lines['UOM'],
+                             'UOMConversion': lines['DerivedUOMConversion'],
+                             'EffectiveDate': lines['EffectiveDate'],
+                             'ExpirationDate': lines['ExpirationDate'],
+                             'ContractLineImport': lines['ContractLine'],
+                             'ContractImport.Vendor': lines['Vendor'],
+                             'ContractRel.Contract': lines['Contract'],
+                             'ContractImport': [f'CI{i % 50}' for i in range(n)]})
+
+    def item_uom(self):
+        items = self.products[self.products['Item'].notna()]
+        buy = pd.DataFrame({'Item': items['Item'], 'UnitOfMeasure': items['UOM'], 'UOMConversion': items['QOE'],
+                            'ValidForBuying': np.where(self.rng.random(len(items)) < 0.9, 'Valid', 'Not Valid'),
+                            'Item.Active': 'Yes'})
+        each = pd.DataFrame({'Item': items['Item'], 'UnitOfMeasure': 'EA', 'UOMConversion': '1',
+                             'ValidForBuying': 'Not Valid', 'Item.Active': 'Yes'})
+        each = each[items['UOM'].to_numpy() != 'EA']
+        return pd.concat([buy, each], ignore_index = True).sort_values('Item', kind = 'stable')
+
+    def write_shared(self, contract_line: pd.DataFrame):
+        os.makedirs(self.shared_folder, exist_ok = True)
+        shutil.copyfile(os.path.join(REPO_ROOT, 'SHARED_DATA', 'UOM.csv'), os.path.join(self.shared_folder, 'UOM.csv'))
+        contract_line.to_csv(os.path.join(self.shared_folder, 'ContractLine.csv'), index = False)
+        self.contract_line_import(max(1000, self.lines // 4)).to_csv(os.path.join(self.shared_folder, 'ContractLineImport.csv'),
+                                                                     index = False)
+        pd.DataFrame({'Manufacturer': self.manufacturer_codes,
+                      'Description': self.manufacturer_names}).to_csv(os.path.join(self.shared_folder, 'Manufacturers.csv'),
+                                                                       index = False)
+        pd.DataFrame({'Vendor': self.vendor_codes,
+                      'Vendor.VendorName': self.vendor_names,
+                      'RepresentativeText': [f'Supplier {i}' for i in range(self.n_vendors)]}).\
+            to_csv(os.path.join(self.shared_folder, 'Suppliers.csv'), index = False)
+        self.item_uom().to_csv(os.path.join(self.shared_folder, 'ItemUOM.csv'), index = False)
+        contract_vendor = self.manufacturer_vendor[self.contract_manufacturer]
+        pd.DataFrame({'Contract Number': self.contract_numbers,
+                      'Manufacturer': self.manufacturer_names[self.contract_manufacturer],
+                      'Vendor': self.vendor_names[contract_vendor],
+                      'ERP Vendor Number': np.where(self.rng.random(self.n_contracts) < 0.9,
+                                                   self.vendor_codes[contract_vendor], '')}).\
+            to_excel(os.path.join(self.shared_folder, 'ContractOrganization.xlsx'), index = False)
+        return None
+
+    def write_ccx(self, contract_line: pd.DataFrame):
+        """
+        CCX download of each of the manufacturer's contracts, as CCX shows the Infor lines
+        """
+        os.makedirs(self.ccx_folder, exist_ok = True)
+        for file in os.listdir(self.ccx_folder):
+            os.remove(os.path.join(self.ccx_folder, file))
+        for contract in self.contract_numbers[:self.n_target_contracts]:
+            lines = contract_line[contract_line['Contract.WorkingContractID'] == contract]
+            pd.DataFrame({'Contract Number': contract,
+                          'Mfg Part Num': lines['ManufacturerNumber'],
+                          'Vendor Part Num': lines['VendorItem'],
+                          'Buyer Part Num': '',
+                          'Description': lines['ItemDescription'],
+                          'Contract Price': lines['BaseCost'].str.replace('$', '', regex = False),
+                          'UOM': lines['UOM'],
+                          'QOE': lines['DerivedUOMConversion'],
+                          'Effective Date': lines['EffectiveDate'],
+                          'Expiration Date': lines['ExpirationDate'],
+                          'Manufacturer': self.manufacturer,
+                          'Vendor': 'Vendor 0'}).to_excel(os.path.join(self.ccx_folder, f'ccx_{contract}.xlsx'), index = False)
+        return None
+
+    def write_tp(self):
+        """
+        The TP workbook (two contract tabs), half of its part numbers already on the manufacturer's
+        contracts, the other half new. Written again before every run, pre_check archives it.
+        """
+        rng = np.random.default_rng(self.seed + 1)
+        own = self.products.iloc[self.product_start[0]:self.product_start[0] + self.product_count[0]]
+        known = own.sample(min(len(own), self.tp_lines // 2), random_state = self.seed)
+        new_count = self.tp_lines - len(known)
+        base = rng.choice(900000, new_count, replace = False) + 100000
+        new = pd.DataFrame({'MFN': str_join('TP', base), 'VN': str_join('TV', base),
+                            'Description': str_join(rng.choice(ADJECTIVES, new_count), ' ', rng.choice(WORDS, new_count), ' NEW ', base % 97),
+                            'UOM': rng.choice(UOMS, new_count), 'cost': rng.integers(100, 500000, new_count) / 100})
+        new.loc[:, 'QOE'] = np.where(new['UOM'] == 'EA', '1', rng.choice(QOES, new_count))
+        tp = pd.concat([known, new], ignore_index = True)
+        effective = self.today.strftime('%Y-%m-%d')
+        expiration = (self.today + timedelta(days = 3 * 365)).strftime('%Y-%m-%d')
+        tp = pd.DataFrame({'Mfg Part Num': tp['MFN'],
+                           'Vendor Part Num': tp['VN'],
+                           'Buyer Part Num': '',
+                           'Description': tp['Description'],
+                           'Contract Price': np.round(tp['cost'] * 0.95, 2).astype(str),
+                           'UOM': tp['UOM'],
+                           'QOE': tp['QOE'],
+                           'Effective Date': effective,
+                           'Expiration Date': expiration}).sample(frac = 1, random_state = self.seed).reset_index(drop = True)
+        os.makedirs(self.tp_folder, exist_ok = True)
+        for file in os.listdir(self.tp_folder):
+            os.remove(os.path.join(self.tp_folder, file))
+        with pd.ExcelWriter(os.path.join(self.tp_folder, 'TP_INPUT.xlsx')) as writer:
+            half = len(tp) // 2
+            tp.iloc[:half].to_excel(writer, sheet_name = 'NEW CONTRACT A', index = False)
+            tp.iloc[half:].to_excel(writer, sheet_name = 'NEW CONTRACT B', index = False)
+        return len(tp)
+
+    def generate(self):
+        contract_line = self.contract_line(self.lines)
+        self.write_shared(contract_line)
+        self.write_ccx(contract_line)
+        self.write_tp()
+        return {'root': self.root,
+                'lines': self.lines,
+                'tp_lines': self.tp_lines,
+                'ccx_contracts': list(self.contract_numbers[:self.n_target_contracts]),
+                'manufacturer': self.manufacturer,
+                'contract': self.contract}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'write a synthetic pre-processor project')
+    parser.add_argument('root')
+    parser.add_argument('--lines', type = int, default = 100000)
+    parser.add_argument('--tp-lines', type = int, default = None)
+    parser.add_argument('--seed', type = int, default = 0)
+    args = parser.parse_args()
+    print(SyntheticData(args.root, args.lines, args.tp_lines, args.seed).generate())
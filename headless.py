@@ -0,0 +1,53 @@
+import os
+import sys
+import argparse
+from datetime import datetime
+from FileProcessor import FileProcessor
+from FolderManager import FolderManager
+from RunSpec import RunSpec
+from TypesDefinition import Status
+
+def run_headless(run_spec: RunSpec):
+    """
+    Run one pre-processing project end to end without a TTY, every prompt is answered by the run spec
+    """
+    folder_manager = FolderManager(run_spec.manufacturer, run_spec.contract)
+    folder_manager.create_folders()
+    preprocessor = FileProcessor(folder_manager,
+                                 check_mode = run_spec.check_mode,
+                                 data_caching = run_spec.data_caching,
+                                 run_spec = run_spec)
+    return preprocessor.process_files(process_type = run_spec.process_type)
+
+def run_batch(manifest: dict,
+              max_workers: int = None,
+              summary_path: str = None):
+    """
+    Run every job of a batch manifest in parallel, see BatchScheduler
+    """
+    from BatchScheduler import BatchScheduler
+    scheduler = BatchScheduler.from_manifest(manifest, max_workers = max_workers)
+    results = scheduler.run()
+    if summary_path is None:
+        summary_path = os.path.join(os.getcwd(), f"batch_summary_{datetime.today().strftime('%Y%m%d_%H%M%S')}.json")
+    scheduler.write_summary(summary_path)
+    return Status.SUCCESS if all(r['status'] == Status.SUCCESS for r in results) else Status.FAILED
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'run the pre-processor non-interactively from a YAML/JSON run spec or batch manifest')
+    parser.add_argument('spec', help = 'path to the run spec or batch manifest (.yaml, .yml or .json)')
+    parser.add_argument('--workers', type = int, default = None, help = 'number of worker processes for a batch manifest')
+    parser.add_argument('--summary', default = None, help = 'where to save the batch summary (JSON)')
+    args = parser.parse_args()
+
+    spec = RunSpec.load_file(args.spec)
+    if 'jobs' in spec:
+        print("Initiating headless batch run .......")
+        status = run_batch(spec, max_workers = args.workers, summary_path = args.summary)
+        sys.exit(0 if status == Status.SUCCESS else 1)
+
+    print("Initiating headless run .......")
+    run_spec = RunSpec.from_dict(spec)
+    status = run_headless(run_spec)
+    print(f"{run_spec.process_type_name} for '{run_spec.manufacturer}' / '{run_spec.contract}' finished: {status}")
+    sys.exit(0 if status == Status.SUCCESS else 1)
@@ -36,10 +36,10 @@ if __name__ == '__main__':
 
         if (process_to_run in process_type_map) and (process_type_map[process_to_run][1] != 'TBI'):
             process_name, version, process_type = process_type_map[process_to_run]
-            if process_type == '1':
+            # Infor/Import data is standardized lazily by the stages that need it
+            if process_type == ProcessType.pre_check:
                 preprocessor = FileProcessor(folder_manager, check_mode = CheckMode.MFN_RF, data_caching = False)
             else:
-                print("Loading Infor contract data, this will take a while ...")
                 preprocessor = FileProcessor(folder_manager, check_mode = CheckMode.MFN_RF)
 
             preprocessor.process_files(process_type = process_type)